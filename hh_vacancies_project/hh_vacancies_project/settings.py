@@ -1,13 +1,29 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = 'django-insecure-er!_8(&lx!7ic9%kcxge_6+^gcbpksv&^rl(-=lv_s9r-zfw9c'
+# Переменные окружения можно задать в файле .env рядом с manage.py
+load_dotenv(BASE_DIR / '.env')
+
+# Профиль запуска: development (по умолчанию) или production — без DEBUG,
+# с кэшированными шаблонами и прогревом процесса при старте
+PROFILE = os.environ.get('DJANGO_PROFILE', 'development')
+
+SECRET_KEY = os.environ.get('SECRET_KEY')
+if not SECRET_KEY:
+    # Ключ из репозитория годится только для разработки: в production
+    # с ним подделываются сессии и подписанные cookie
+    if PROFILE == 'production':
+        raise ImproperlyConfigured("В профиле production нужно задать переменную окружения SECRET_KEY")
+    SECRET_KEY = 'django-insecure-er!_8(&lx!7ic9%kcxge_6+^gcbpksv&^rl(-=lv_s9r-zfw9c'
 
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', '0' if PROFILE == 'production' else '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host.strip()]
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -26,6 +42,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'vacancies.middleware.ReplicaRoutingMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -48,15 +65,242 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Скомпилированные шаблоны живут в памяти процесса до перезапуска, без
+    # проверки изменений файлов (при DEBUG их перечитывает autoreload runserver)
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.template.context_processors.debug')
+
+# Прогрев при загрузке WSGI/ASGI-приложения (vacancies.warmup): импорт представлений
+# и компиляция шаблонов, справочные данные и счетчики в кэш (WARMUP_DATA),
+# индекс подбора по навыкам (WARMUP_MATCH_INDEX, занимает память)
+WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', '1' if PROFILE == 'production' else '0') == '1'
+WARMUP_DATA = os.environ.get('WARMUP_DATA', '1') == '1'
+WARMUP_MATCH_INDEX = os.environ.get('WARMUP_MATCH_INDEX', '0') == '1'
+
 WSGI_APPLICATION = 'hh_vacancies_project.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Профиль базы данных выбирается переменной окружения DB_ENGINE:
+# sqlite (по умолчанию) или postgresql
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'hh_vacancies'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
+    }
+    INSTALLED_APPS.append('django.contrib.postgres')
+else:
+    DATABASES = {
+        'default': {
+            # Обычный sqlite3, но транзакции начинаются с BEGIN IMMEDIATE
+            'ENGINE': 'vacancies.sqlite_backend',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Сколько секунд ждать снятия блокировки перед "database is locked"
+                'timeout': 20,
+            },
+        }
     }
+
+# Реплики только для чтения: DB_REPLICAS="host1,host2" для PostgreSQL
+# или пути к файлам-копиям для SQLite (см. manage.py sync_sqlite_replicas)
+REPLICA_DATABASES = []
+for index, replica_name in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    replica = dict(DATABASES['default'])
+    if DB_ENGINE == 'postgresql':
+        replica['HOST'] = replica_name.strip()
+    else:
+        replica['NAME'] = replica_name.strip()
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{index}'] = replica
+    REPLICA_DATABASES.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['vacancies.routers.ReplicaRouter']
+
+# Максимальное отставание реплики (сек.), после которого чтение идет с основной базы
+REPLICA_MAX_LAG = int(os.environ.get('REPLICA_MAX_LAG', 5))
+
+# Сколько секунд после записи клиент читает только с основной базы
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 15))
+
+# Представления (имена маршрутов), которые можно обслуживать с реплик
+REPLICA_READ_VIEWS = [
+    'home',
+    'vacancy_list',
+    'vacancy_detail',
+    'statistics',
+    'api_search',
+    'api_stats',
+    'api_vacancies',
+    'api_vacancy_lookup',
+    'api_changes',
+    'match',
+    'api_match',
+    'trends',
+    'api_trends',
+    'api_area_breakdown',
+    'api_related_skills',
+    'api_vacancy_related_skills',
+]
+
+# Кэш: CACHE_BACKEND = locmem (по умолчанию), file или redis.
+# locmem живет внутри одного процесса; при нескольких воркерах
+# используйте file или redis, чтобы инвалидация была общей
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / '.cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'hh-vacancies',
+        }
+    }
+
+# Корзины токенов ограничения частоты API (vacancies.throttle) — всегда в памяти
+# процесса: они меняются на каждый запрос, и сетевой кэш здесь не нужен
+CACHES['throttle'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'hh-throttle',
+    'OPTIONS': {'MAX_ENTRIES': 100000},
 }
 
+# Время жизни закэшированных страниц и данных (сек.). Кроме того, кэш
+# сбрасывается после каждого импорта и очистки базы
+CACHE_PAGE_TIMEOUT = int(os.environ.get('CACHE_PAGE_TIMEOUT', 3600))
+
+# Очистка HTML описаний при импорте: число процессов и минимальный
+# размер пачки, начиная с которого используется пул процессов
+DESCRIPTION_WORKERS = int(os.environ.get('DESCRIPTION_WORKERS', min(4, os.cpu_count() or 1)))
+DESCRIPTION_POOL_MIN_BATCH = int(os.environ.get('DESCRIPTION_POOL_MIN_BATCH', 50))
+
+# Порог похожести (оценка Жаккара по MinHash), начиная с которого
+# вакансия считается повторной публикацией
+DEDUP_THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD', 0.8))
+
+# Сохраненные поиски: общий лимит запросов к HH API в секунду
+# и число поисков, выполняемых параллельно
+HH_REQUESTS_PER_SECOND = float(os.environ.get('HH_REQUESTS_PER_SECOND', 5))
+SYNC_WORKERS = int(os.environ.get('SYNC_WORKERS', 4))
+
+# Вакансии старше стольких дней переносятся в архив (manage.py archive_vacancies)
+VACANCY_MAX_AGE_DAYS = int(os.environ.get('VACANCY_MAX_AGE_DAYS', 60))
+
+# Сколько секунд кэшируются вакансии, загруженные с HH через /api/vacancies/lookup/,
+# и отметки о вакансиях, которых на HH нет
+LOOKUP_CACHE_TIMEOUT = int(os.environ.get('LOOKUP_CACHE_TIMEOUT', 3600))
+LOOKUP_NOT_FOUND_TIMEOUT = int(os.environ.get('LOOKUP_NOT_FOUND_TIMEOUT', 300))
+
+# Ограничение нагрузки на JSON API (vacancies.throttle): корзина токенов на клиента
+# (API_THROTTLE_RATE токенов в секунду, не больше API_THROTTLE_BURST подряд), не больше
+# API_MAX_CONCURRENT запросов API одновременно в процессе, остальным — 429 и Retry-After.
+# API_THROTTLE_CLIENT_HEADER — заголовок с адресом клиента за прокси (HTTP_X_FORWARDED_FOR;
+# берется последний адрес — тот, что дописал прокси)
+API_THROTTLE_ENABLED = os.environ.get('API_THROTTLE_ENABLED', '1') == '1'
+API_THROTTLE_RATE = float(os.environ.get('API_THROTTLE_RATE', 5))
+API_THROTTLE_BURST = float(os.environ.get('API_THROTTLE_BURST', 30))
+API_MAX_CONCURRENT = int(os.environ.get('API_MAX_CONCURRENT', 8))
+API_SHED_RETRY_AFTER = int(os.environ.get('API_SHED_RETRY_AFTER', 2))
+API_THROTTLE_CLIENT_HEADER = os.environ.get('API_THROTTLE_CLIENT_HEADER', '')
+
+# Адреса, которым доступны метрики /api/metrics/throttle/ без входа в админку
+INTERNAL_IPS = [ip.strip() for ip in os.environ.get('INTERNAL_IPS', '127.0.0.1').split(',') if ip.strip()]
+
+# Поток обновлений /api/events/ (только под ASGI, vacancies.events): как часто общий
+# издатель проверяет счетчики и прогресс импорта, интервал пингов и максимальная
+# длительность потока (сек.), предельное число потоков на процесс
+EVENTS_INTERVAL = float(os.environ.get('EVENTS_INTERVAL', 2))
+EVENTS_KEEPALIVE = int(os.environ.get('EVENTS_KEEPALIVE', 15))
+EVENTS_MAX_DURATION = int(os.environ.get('EVENTS_MAX_DURATION', 300))
+EVENTS_MAX_CLIENTS = int(os.environ.get('EVENTS_MAX_CLIENTS', 1000))
+
+# Админка больших таблиц: до скольких строк считается отфильтрованный список
+# и сколько самых частых значений показывается в фильтрах по фасетам
+ADMIN_COUNT_LIMIT = int(os.environ.get('ADMIN_COUNT_LIMIT', 10000))
+ADMIN_FILTER_CHOICES = int(os.environ.get('ADMIN_FILTER_CHOICES', 30))
+
+# Массовые операции из админки (vacancies.batch_ops): с BATCH_OPERATIONS_IN_WEB
+# операция сразу выполняется в потоке веб-процесса, иначе — командой
+# run_batch_operations. Операция без новой пачки дольше BATCH_OPERATION_STALE_SECONDS
+# считается прерванной, и run_batch_operations ее продолжает
+BATCH_OPERATIONS_IN_WEB = os.environ.get('BATCH_OPERATIONS_IN_WEB', '0' if PROFILE == 'production' else '1') == '1'
+BATCH_OPERATION_STALE_SECONDS = int(os.environ.get('BATCH_OPERATION_STALE_SECONDS', 300))
+
+# Подбор вакансий по навыкам (vacancies.matching): индекс в памяти процесса
+# перестраивается после импорта, но не чаще раза в MATCH_INDEX_MIN_AGE секунд
+MATCH_INDEX_MIN_AGE = int(os.environ.get('MATCH_INDEX_MIN_AGE', 60))
+
+# Журнал изменений (/api/changes/): сколько дней хранятся записи и, для PostgreSQL,
+# на сколько секунд задерживаются свежие изменения (пока фиксируются параллельные транзакции)
+CHANGES_RETENTION_DAYS = int(os.environ.get('CHANGES_RETENTION_DAYS', 30))
+CHANGES_SETTLE_SECONDS = int(os.environ.get('CHANGES_SETTLE_SECONDS', 5))
+
+# Распределенный импорт (plan_harvest / run_harvest_worker): на сколько секунд воркер
+# арендует единицу (продлевается, пока он работает) и сколько раз единицу пробуют загрузить
+HARVEST_LEASE_SECONDS = int(os.environ.get('HARVEST_LEASE_SECONDS', 120))
+HARVEST_MAX_ATTEMPTS = int(os.environ.get('HARVEST_MAX_ATTEMPTS', 3))
+
+# История поисковых запросов пишется из буфера в памяти пачками (vacancies.search_log):
+# раз в SEARCH_LOG_FLUSH_INTERVAL секунд или при накоплении SEARCH_LOG_MAX_BUFFER записей.
+# 0 — писать сразу при каждом запросе. Пока база недоступна, записи остаются в буфере,
+# но не больше SEARCH_LOG_MAX_PENDING (самые старые отбрасываются)
+SEARCH_LOG_FLUSH_INTERVAL = float(os.environ.get('SEARCH_LOG_FLUSH_INTERVAL', 5))
+SEARCH_LOG_MAX_BUFFER = int(os.environ.get('SEARCH_LOG_MAX_BUFFER', 200))
+SEARCH_LOG_MAX_PENDING = int(os.environ.get('SEARCH_LOG_MAX_PENDING', 10000))
+# Сколько секунд кэшируются виджеты «Недавние/Популярные запросы»
+SEARCH_LOG_WIDGET_TIMEOUT = int(os.environ.get('SEARCH_LOG_WIDGET_TIMEOUT', 300))
+
+# PRAGMA, которые выполняются на каждом новом соединении с SQLite
+# (см. vacancies.db.configure_sqlite_connection)
+SQLITE_PRAGMAS = {
+    # Действует для новых баз; существующую переводит archive_vacancies --full-vacuum
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+# Начиная с какого размера таблицы на PostgreSQL использовать оценку
+# количества строк из pg_class вместо точного COUNT(*)
+COUNT_ESTIMATE_THRESHOLD = int(os.environ.get('COUNT_ESTIMATE_THRESHOLD', 100000))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
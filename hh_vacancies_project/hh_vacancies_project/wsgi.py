@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hh_vacancies_project.settings')
 
 application = get_wsgi_application()
+
+from vacancies.warmup import on_startup  # noqa: E402  (нужен настроенный Django)
+
+on_startup()
@@ -1,19 +1,29 @@
-# Создайте файл refresh_templates.py в корне проекта:
+"""Проверка шаблонов и сброс закэшированных страниц после их изменения
+
+Под runserver измененные шаблоны перечитываются автоматически. В профиле
+production скомпилированные шаблоны живут в памяти процессов сервера до
+перезапуска: скрипт компилирует все шаблоны проекта заново (ошибка в
+шаблоне всплывет здесь, а не на первом запросе) и сбрасывает кэш страниц,
+отрендеренных со старыми шаблонами. После этого перезапустите сервер.
+
+    python refresh_templates.py
+"""
 import os
-import shutil
+
 import django
-from django.conf import settings
 
-# Настройка Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hh_vacancies_project.settings')
 django.setup()
 
-# Очистка кэша шаблонов
-from django.template.loaders.filesystem import Loader
-from django.template.loaders.app_directories import Loader as AppLoader
+from django.template import engines  # noqa: E402
+
+from vacancies.cache import bump_data_version  # noqa: E402
+from vacancies.warmup import compile_templates  # noqa: E402
 
-# Принудительная перезагрузка шаблонов
-for loader in [Loader(settings), AppLoader()]:
-    loader.reset()
+for backend in engines.all():
+    for loader in getattr(backend, 'engine', backend).template_loaders:
+        loader.reset()
 
-print("Кэш шаблонов очищен")
\ No newline at end of file
+compiled = compile_templates()
+bump_data_version()
+print(f"Шаблоны проверены ({compiled}), кэш страниц сброшен")
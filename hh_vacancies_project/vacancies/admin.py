@@ -1,16 +1,198 @@
-from django.contrib import admin
-from .models import Vacancy, SearchQuery
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.paginator import Paginator
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+
+from .models import Vacancy, SearchQuery, SavedSearch, ArchivedVacancy, PopularSearch, HarvestUnit, BatchOperation, FacetValue
+from .cache import bump_data_version, get_or_compute
+from .db import estimated_count, text_search_q
+from . import batch_ops, retention
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор без полного COUNT(*) по большой таблице
+
+    Без фильтров берется оценка estimated_count (мгновенно на PostgreSQL),
+    с фильтрами строки считаются не дальше ADMIN_COUNT_LIMIT.
+    """
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return estimated_count(queryset)
+        return queryset.order_by()[:settings.ADMIN_COUNT_LIMIT].count()
+
+
+class FacetListFilter(admin.SimpleListFilter):
+    """Фильтр по значениям фасета из индекса FacetValue
+
+    Варианты — самые частые значения с готовыми счетчиками (без DISTINCT
+    по таблице вакансий), список кэшируется до следующего импорта.
+    Отбор идет по индексированной таблице связей Vacancy.facets.
+    """
+    facet = None
+    
+    def lookups(self, request, model_admin):
+        def compute():
+            values = FacetValue.objects.filter(facet=self.facet, vacancy_count__gt=0).order_by('-vacancy_count')
+            return [
+                (str(pk), f"{value} ({count})")
+                for pk, value, count in values.values_list('pk', 'value', 'vacancy_count')[:settings.ADMIN_FILTER_CHOICES]
+            ]
+        return get_or_compute(f'admin:facet:{self.facet}', compute)
+    
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(facets=int(self.value()))
+        return queryset
+
+
+class AreaFilter(FacetListFilter):
+    title = 'Регион'
+    parameter_name = 'area_value'
+    facet = 'area'
+
+
+class ExperienceFilter(FacetListFilter):
+    title = 'Опыт'
+    parameter_name = 'experience_value'
+    facet = 'experience'
+
+
+class ScheduleFilter(FacetListFilter):
+    title = 'График'
+    parameter_name = 'schedule_value'
+    facet = 'schedule'
 
 
 @admin.register(Vacancy)
 class VacancyAdmin(admin.ModelAdmin):
     list_display = ('name', 'employer_name', 'area', 'published_at')
-    list_filter = ('area', 'published_at')
+    list_filter = (AreaFilter, ExperienceFilter, ScheduleFilter, 'published_at')
     search_fields = ('name', 'employer_name')
+    search_help_text = "ID вакансии на HH или часть названия / работодателя"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['archive_in_background', 'delete_in_background']
+    
+    def get_search_results(self, request, queryset, search_term):
+        """hh_id — по уникальному индексу, текст — через text_search_q (pg_trgm на PostgreSQL)"""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(hh_id=int(term)), False
+        return queryset.filter(text_search_q(term, ['name', 'employer_name'])), False
+    
+    def get_actions(self, request):
+        # Стандартное удаление загружает все объекты и обходит индексы навыков и фасетов
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+    
+    def delete_model(self, request, obj):
+        retention.remove(Vacancy.objects.filter(pk=obj.pk))
+        bump_data_version()
+    
+    def delete_queryset(self, request, queryset):
+        retention.remove(queryset)
+        bump_data_version()
+    
+    @admin.action(description="Архивировать в фоне (все отобранные фильтром или выбранные)", permissions=['delete'])
+    def archive_in_background(self, request, queryset):
+        return self._run_in_background(request, queryset, 'archive')
+    
+    @admin.action(description="Удалить в фоне (все отобранные фильтром или выбранные)", permissions=['delete'])
+    def delete_in_background(self, request, queryset):
+        return self._run_in_background(request, queryset, 'delete')
+    
+    def _run_in_background(self, request, queryset, action):
+        """Подтверждение и запуск пакетной операции (BatchOperation)"""
+        if queryset.query.where:
+            count = queryset.order_by()[:settings.ADMIN_COUNT_LIMIT].count()
+        else:
+            count = estimated_count(queryset)
+        
+        if request.POST.get('confirm') != 'yes':
+            return TemplateResponse(request, 'admin/vacancies/vacancy/batch_confirm.html', {
+                **self.admin_site.each_context(request),
+                'title': "Подтверждение массовой операции",
+                'opts': self.model._meta,
+                'action': f'{action}_in_background',
+                'action_label': dict(BatchOperation.ACTION_CHOICES)[action],
+                'count': count,
+                'count_capped': count >= settings.ADMIN_COUNT_LIMIT,
+                'select_across': request.POST.get('select_across') == '1',
+                'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            })
+        
+        filters = request.GET.urlencode()
+        if request.POST.get('select_across') == '1':
+            description = f"Фильтр: {filters or 'все вакансии'}"
+        else:
+            description = f"Выбрано вручную: {len(request.POST.getlist(helpers.ACTION_CHECKBOX_NAME))}"
+        operation = batch_ops.start(
+            action, queryset, description=description, user=request.user.get_username(), total=count
+        )
+        self.message_user(
+            request,
+            f"{operation.get_action_display()} "
+            f"{'запущено в фоне' if operation.status == 'running' else 'поставлено в очередь run_batch_operations'} "
+            f"(операция №{operation.pk}), ход выполнения — в разделе «Массовые операции»",
+            messages.SUCCESS,
+        )
+        return None
 
 
 @admin.register(SearchQuery)
 class SearchQueryAdmin(admin.ModelAdmin):
     list_display = ('query', 'search_date', 'results_count')
     list_filter = ('search_date',)
-    search_fields = ('query',)
\ No newline at end of file
+    search_fields = ('query',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(BatchOperation)
+class BatchOperationAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'action', 'status', 'processed', 'total', 'user', 'started_at', 'heartbeat_at', 'finished_at')
+    list_filter = ('action', 'status')
+    exclude = ('query',)
+    readonly_fields = [field.name for field in BatchOperation._meta.fields if field.name != 'query']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PopularSearch)
+class PopularSearchAdmin(admin.ModelAdmin):
+    list_display = ('query', 'kind', 'area', 'experience', 'employment', 'hit_count', 'last_seen')
+    list_filter = ('kind',)
+    search_fields = ('query',)
+    readonly_fields = ('key', 'first_seen', 'last_seen')
+
+
+@admin.register(HarvestUnit)
+class HarvestUnitAdmin(admin.ModelAdmin):
+    list_display = ('job', 'page', 'status', 'lease_owner', 'lease_expires_at', 'attempts', 'fetched', 'created')
+    list_filter = ('job', 'status')
+    readonly_fields = ('lease_owner', 'lease_expires_at', 'attempts', 'fetched', 'created', 'updated', 'finished_at')
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('name', 'query', 'interval_minutes', 'is_active', 'watermark', 'next_run_at', 'last_count', 'last_status')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'query')
+    readonly_fields = ('watermark', 'last_run_at', 'last_status', 'last_count')
+
+
+@admin.register(ArchivedVacancy)
+class ArchivedVacancyAdmin(admin.ModelAdmin):
+    list_display = ('name', 'employer_name', 'area', 'published_at', 'archived_at', 'reason')
+    list_filter = ('reason',)
+    search_fields = ('hh_id',)
+    exclude = ('payload',)
\ No newline at end of file
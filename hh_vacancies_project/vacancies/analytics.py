@@ -0,0 +1,267 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import get_or_compute
+from .db import chunked
+from .models import Vacancy
+
+# Сколько строк читать из базы за один раз
+CHUNK_SIZE = 5000
+
+# Границы корзин гистограммы зарплат (руб.)
+SALARY_HISTOGRAM_BINS = np.arange(0, 525000, 25000)
+
+# Границы зарплатных диапазонов для таблицы "зарплата × опыт"
+SALARY_BANDS = [50000, 100000, 150000, 200000, 300000]
+
+# Сколько самых частых навыков участвует в матрице совместной встречаемости
+COOCCURRENCE_TOP_SKILLS = 20
+
+# Сколько работодателей показывать в топе
+TOP_EMPLOYERS = 10
+
+
+class VacancyFrame:
+    """Колонки вакансий в виде массивов NumPy
+
+    Категориальные поля хранятся кодами (int32) и списком подписей,
+    навыки — парой параллельных массивов (номер вакансии, код навыка).
+    Зарплаты — в рублях: границы вилки и ее середина.
+    """
+
+    def __init__(self, salary, salary_from, salary_to, area, experience, employment, employer,
+                 skill_rows, skill_codes, labels):
+        self.salary = salary
+        self.salary_from = salary_from
+        self.salary_to = salary_to
+        self.area = area
+        self.experience = experience
+        self.employment = employment
+        self.employer = employer
+        self.skill_rows = skill_rows
+        self.skill_codes = skill_codes
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.salary)
+
+
+def _encode(values: List[str], vocabulary: Dict[str, int]) -> np.ndarray:
+    """Коды категорий для чанка с пополнением общего словаря"""
+    uniques, inverse = np.unique(np.array(values, dtype=object), return_inverse=True)
+    mapping = np.array([vocabulary.setdefault(value, len(vocabulary)) for value in uniques], dtype=np.int32)
+    return mapping[inverse] if len(values) else np.empty(0, dtype=np.int32)
+
+
+def _chunk_salary(salary_from, salary_to, currency) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Зарплата в рублях: (от, до, середина вилки), NaN если не указана"""
+    salary_from = np.array(salary_from, dtype=np.float64)
+    salary_to = np.array(salary_to, dtype=np.float64)
+    in_rubles = np.isin(np.array(currency, dtype=object), ['RUR', 'RUB'])
+    salary_from[~in_rubles] = np.nan
+    salary_to[~in_rubles] = np.nan
+    salary = np.where(
+        np.isnan(salary_from) | np.isnan(salary_to),
+        np.fmax(salary_from, salary_to),
+        (salary_from + salary_to) / 2,
+    )
+    return salary_from, salary_to, salary
+
+
+def load_frame(queryset=None, chunk_size: int = CHUNK_SIZE) -> VacancyFrame:
+    """Чтение нужных колонок чанками без создания объектов моделей"""
+    if queryset is None:
+        queryset = Vacancy.objects.filter(is_duplicate=False)
+
+    rows = queryset.order_by().values_list(
+        'salary_from', 'salary_to', 'currency', 'area', 'experience', 'employment', 'key_skills', 'employer_name'
+    )
+
+    vocabularies = {'area': {}, 'experience': {}, 'employment': {}, 'employer': {}, 'skill': {}}
+    salary, salary_from, salary_to, area, experience, employment, employer = [], [], [], [], [], [], []
+    skill_rows, skill_codes = [], []
+    offset = 0
+
+    for chunk in chunked(rows, chunk_size):
+        columns = list(zip(*chunk))
+
+        low, high, middle = _chunk_salary(columns[0], columns[1], columns[2])
+        salary_from.append(low)
+        salary_to.append(high)
+        salary.append(middle)
+        area.append(_encode(columns[3], vocabularies['area']))
+        experience.append(_encode(columns[4], vocabularies['experience']))
+        employment.append(_encode(columns[5], vocabularies['employment']))
+        employer.append(_encode(columns[7], vocabularies['employer']))
+
+        pairs = [
+            (offset + index, skill.strip())
+            for index, text in enumerate(columns[6])
+            for skill in dict.fromkeys(text.split(','))
+            if skill.strip()
+        ]
+        if pairs:
+            rows_index, names = zip(*pairs)
+            skill_rows.append(np.array(rows_index, dtype=np.int32))
+            skill_codes.append(_encode(list(names), vocabularies['skill']))
+
+        offset += len(chunk)
+
+    def concat(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    labels = {
+        name: np.array(sorted(vocabulary, key=vocabulary.get), dtype=object)
+        for name, vocabulary in vocabularies.items()
+    }
+    return VacancyFrame(
+        salary=concat(salary, np.float64),
+        salary_from=concat(salary_from, np.float64),
+        salary_to=concat(salary_to, np.float64),
+        area=concat(area, np.int32),
+        experience=concat(experience, np.int32),
+        employment=concat(employment, np.int32),
+        employer=concat(employer, np.int32),
+        skill_rows=concat(skill_rows, np.int32),
+        skill_codes=concat(skill_codes, np.int32),
+        labels=labels,
+    )
+
+
+def salary_percentiles(frame: VacancyFrame, quantiles=(10, 25, 50, 75, 90)) -> Dict[str, int]:
+    salary = frame.salary[~np.isnan(frame.salary)]
+    if not len(salary):
+        return {}
+    values = np.percentile(salary, quantiles)
+    return {f'p{q}': int(value) for q, value in zip(quantiles, values)}
+
+
+def _nan_stat(function, values: np.ndarray) -> Optional[float]:
+    values = values[~np.isnan(values)]
+    return float(function(values)) if len(values) else None
+
+
+def salary_totals(frame: VacancyFrame) -> Dict[str, Optional[float]]:
+    """Средняя нижняя граница и максимальная верхняя граница вилки (руб.)"""
+    return {
+        'avg_salary': _nan_stat(np.mean, frame.salary_from),
+        'max_salary': _nan_stat(np.max, frame.salary_to),
+    }
+
+
+def salary_histogram(frame: VacancyFrame) -> List[Dict]:
+    salary = frame.salary[~np.isnan(frame.salary)]
+    bins = np.append(SALARY_HISTOGRAM_BINS, np.inf)
+    counts, _ = np.histogram(salary, bins=bins)
+    return [
+        {'from': int(low), 'count': int(count)}
+        for low, count in zip(bins[:-1], counts)
+    ]
+
+
+def category_counts(frame: VacancyFrame, column: str, limit: int = None) -> List[tuple]:
+    """Количество вакансий по значениям категории (или навыка), по убыванию"""
+    labels = frame.labels[column]
+    codes = frame.skill_codes if column == 'skill' else getattr(frame, column)
+    counts = np.bincount(codes, minlength=len(labels))
+    order = np.argsort(-counts, kind='stable')[:limit]
+    return [(labels[code], int(counts[code])) for code in order if counts[code]]
+
+
+def salary_by_experience(frame: VacancyFrame) -> List[Dict]:
+    """Перцентили зарплаты и распределение по диапазонам для каждого опыта"""
+    labels = frame.labels['experience']
+    mask = ~np.isnan(frame.salary)
+    salary = frame.salary[mask]
+    codes = frame.experience[mask]
+
+    # Таблица "опыт × зарплатный диапазон" одним bincount
+    bands = np.digitize(salary, SALARY_BANDS)
+    band_count = len(SALARY_BANDS) + 1
+    crosstab = np.bincount(codes * band_count + bands, minlength=len(labels) * band_count)
+    crosstab = crosstab.reshape(len(labels), band_count)
+
+    # Группировка сортировкой: внутри каждой группы зарплаты упорядочены
+    order = np.lexsort((salary, codes))
+    salary, codes = salary[order], codes[order]
+    bounds = np.searchsorted(codes, np.arange(len(labels) + 1))
+
+    result = []
+    for code, label in enumerate(labels):
+        group = salary[bounds[code]:bounds[code + 1]]
+        if not len(group):
+            continue
+        p25, p50, p75 = np.percentile(group, [25, 50, 75])
+        result.append({
+            'experience': label,
+            'count': len(group),
+            'p25': int(p25),
+            'p50': int(p50),
+            'p75': int(p75),
+            'bands': [int(count) for count in crosstab[code]],
+        })
+    return result
+
+
+def salary_band_labels() -> List[str]:
+    bounds = [0] + SALARY_BANDS
+    labels = [f'{low // 1000}–{high // 1000}k' for low, high in zip(bounds, bounds[1:])]
+    return labels + [f'{SALARY_BANDS[-1] // 1000}k+']
+
+
+def skill_cooccurrence(frame: VacancyFrame, top: int = COOCCURRENCE_TOP_SKILLS) -> Dict:
+    """Матрица совместной встречаемости самых частых навыков
+
+    Равна Mᵀ·M, где M — булева матрица "вакансия × навык".
+    """
+    labels = frame.labels['skill']
+    if not len(frame.skill_codes):
+        return {'skills': [], 'matrix': []}
+
+    counts = np.bincount(frame.skill_codes, minlength=len(labels))
+    top_codes = np.argsort(-counts, kind='stable')[:top]
+    position = np.full(len(labels), -1, dtype=np.int32)
+    position[top_codes] = np.arange(len(top_codes))
+
+    selected = position[frame.skill_codes] >= 0
+    incidence = np.zeros((len(frame), len(top_codes)), dtype=bool)
+    incidence[frame.skill_rows[selected], position[frame.skill_codes[selected]]] = True
+
+    # Строка i матрицы — сумма строк M по вакансиям с навыком i,
+    # так не создается копия M в целочисленном типе
+    matrix = np.array([
+        incidence[incidence[:, column]].sum(axis=0, dtype=np.int64)
+        for column in range(len(top_codes))
+    ])
+
+    return {
+        'skills': [labels[code] for code in top_codes],
+        'matrix': matrix.tolist(),
+    }
+
+
+def compute_summary(queryset=None) -> Dict:
+    """Все показатели страницы статистики за один проход по таблице"""
+    frame = load_frame(queryset)
+    return {
+        'vacancy_count': len(frame),
+        'employer_count': len(frame.labels['employer']),
+        'top_employers': [
+            {'employer_name': name, 'count': count}
+            for name, count in category_counts(frame, 'employer', limit=TOP_EMPLOYERS)
+        ],
+        **salary_totals(frame),
+        'salary_percentiles': salary_percentiles(frame),
+        'salary_histogram': salary_histogram(frame),
+        'salary_by_experience': salary_by_experience(frame),
+        'salary_bands': salary_band_labels(),
+        'employment_stats': category_counts(frame, 'employment'),
+        'popular_skills': category_counts(frame, 'skill', limit=15),
+        'skill_cooccurrence': skill_cooccurrence(frame),
+    }
+
+
+def get_summary() -> Dict:
+    """Показатели статистики из кэша текущего поколения данных"""
+    return get_or_compute('analytics_summary', compute_summary)
@@ -3,4 +3,13 @@ from django.apps import AppConfig
 
 class VacanciesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'vacancies'
\ No newline at end of file
+    name = 'vacancies'
+
+    def ready(self):
+        from django.core import checks
+        from django.db.backends.signals import connection_created
+        from .db import configure_sqlite_connection
+        from .responses import check_codecs
+
+        connection_created.connect(configure_sqlite_connection)
+        checks.register(check_codecs)
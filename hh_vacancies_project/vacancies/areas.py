@@ -0,0 +1,140 @@
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .db import delete_in_batches
+from .models import Vacancy, Area, AreaClosure
+
+# Города для формы импорта (если справочник загружен)
+POPULAR_AREAS = ['Москва', 'Санкт-Петербург', 'Екатеринбург', 'Новосибирск', 'Казань', 'Нижний Новгород']
+
+
+def flatten_tree(tree: List[Dict]):
+    """Регионы и пары замыкания из дерева HH /areas
+
+    Возвращает (регионы, замыкание): регионы — список (id, name, parent_id,
+    depth) в порядке обхода (родитель раньше потомков), замыкание —
+    список (ancestor_id, descendant_id, depth), включая пары (id, id, 0).
+    """
+    areas, closure = [], []
+    stack = [(node, []) for node in reversed(tree)]
+    while stack:
+        node, ancestors = stack.pop()
+        area_id = int(node['id'])
+        areas.append((area_id, node['name'][:255], ancestors[-1] if ancestors else None, len(ancestors)))
+
+        path = ancestors + [area_id]
+        for index, ancestor_id in enumerate(path):
+            closure.append((ancestor_id, area_id, len(path) - 1 - index))
+
+        for child in reversed(node.get('areas') or []):
+            stack.append((child, path))
+    return areas, closure
+
+
+def sync_tree(tree: List[Dict]) -> Dict:
+    """Обновление справочника регионов и замыкания по дереву HH"""
+    areas, closure = flatten_tree(tree)
+    ids = [area_id for area_id, _, _, _ in areas]
+
+    with transaction.atomic():
+        # Родители идут раньше потомков, поэтому внешние ключи валидны
+        Area.objects.bulk_create(
+            [Area(id=area_id, name=name, parent_id=parent_id, depth=depth)
+             for area_id, name, parent_id, depth in areas],
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=['name', 'parent', 'depth'],
+            batch_size=1000,
+        )
+        removed = delete_in_batches(Area.objects.exclude(pk__in=ids))
+
+        AreaClosure.objects.all().delete()
+        AreaClosure.objects.bulk_create(
+            [AreaClosure(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+             for ancestor, descendant, depth in closure],
+            batch_size=1000,
+        )
+
+    return {'areas': len(areas), 'closure': len(closure), 'removed': removed}
+
+
+def link_vacancies() -> int:
+    """Привязка к справочнику вакансий, импортированных без id региона
+
+    Регион определяется по названию, если оно однозначно в справочнике.
+    """
+    linked = 0
+    names = Vacancy.objects.filter(area_ref__isnull=True).values_list('area', flat=True).distinct()
+    for name in names:
+        matches = list(Area.objects.filter(name=name).values_list('pk', flat=True)[:2])
+        if len(matches) == 1:
+            linked += Vacancy.objects.filter(area_ref__isnull=True, area=name).update(area_ref_id=matches[0])
+    return linked
+
+
+def known_ids(area_ids: Iterable[int]) -> set:
+    """Какие из id регионов есть в справочнике"""
+    area_ids = {area_id for area_id in area_ids if area_id is not None}
+    if not area_ids:
+        return set()
+    return set(Area.objects.filter(pk__in=area_ids).values_list('pk', flat=True))
+
+
+def in_region(region_id: int) -> Q:
+    """Условие «вакансия в регионе или любом его подрегионе»"""
+    return Q(area_ref__in=AreaClosure.objects.filter(ancestor_id=region_id).values('descendant'))
+
+
+def area_q(value: str) -> Q:
+    """Фильтр по региону: id из справочника или название
+
+    Название ищется в справочнике (с подрегионами, например
+    «Новосибирская область»); вакансии без привязки к справочнику
+    находятся по точному названию региона. Подстрока не подходит:
+    «Москва» совпала бы с «Московская область», а LIKE по всей
+    таблице заменил бы индексный join по замыканию.
+    """
+    value = value.strip()
+    if value.isdigit():
+        return in_region(int(value))
+
+    region_ids = Area.objects.filter(name__iexact=value).values('pk')
+    return (
+        Q(area_ref__in=AreaClosure.objects.filter(ancestor__in=region_ids).values('descendant'))
+        | Q(area_ref__isnull=True, area__iexact=value)
+    )
+
+
+def region_ids(value: str) -> List[int]:
+    """id регионов справочника по id или названию, вместе со всеми подрегионами"""
+    value = value.strip()
+    if value.isdigit():
+        ancestors = [int(value)]
+    else:
+        ancestors = Area.objects.filter(name__iexact=value).values('pk')
+    return list(AreaClosure.objects.filter(ancestor__in=ancestors).values_list('descendant_id', flat=True))
+
+
+def region_counts(queryset, parent_id: Optional[int] = None) -> List[Dict]:
+    """Количество вакансий по дочерним регионам parent_id (с их подрегионами)
+
+    Без parent_id — по странам (верхний уровень справочника).
+    """
+    children = Area.objects.filter(parent_id=parent_id) if parent_id else Area.objects.filter(parent__isnull=True)
+    rows = (
+        AreaClosure.objects
+        .filter(ancestor__in=children.values('pk'), descendant__vacancies__in=queryset.order_by().values('pk'))
+        .values('ancestor_id', 'ancestor__name')
+        .annotate(count=Count('descendant__vacancies'))
+        .order_by('-count', 'ancestor__name')
+    )
+    return [{'id': row['ancestor_id'], 'name': row['ancestor__name'], 'count': row['count']} for row in rows]
+
+
+def popular_areas() -> List[Dict]:
+    """Регионы для формы импорта из локального справочника"""
+    # Одинаковые названия на разных уровнях: побеждает верхний уровень
+    areas = {area.name: area for area in Area.objects.filter(name__in=POPULAR_AREAS).order_by('-depth')}
+    return [{'id': str(areas[name].pk), 'name': name} for name in POPULAR_AREAS if name in areas]
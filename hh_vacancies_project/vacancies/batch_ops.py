@@ -0,0 +1,125 @@
+import pickle
+import threading
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .models import BatchOperation, Vacancy
+from . import retention
+
+
+def _queryset(operation: BatchOperation):
+    """Отбор операции: сохраненный запрос поверх Vacancy.objects"""
+    queryset = Vacancy.objects.all()
+    queryset.query = pickle.loads(bytes(operation.query))
+    return queryset
+
+
+def claimable():
+    """Операции, которые можно взять в работу: в очереди или прерванные
+
+    Выполняющаяся операция обновляет heartbeat_at после каждой пачки.
+    Если отметки нет дольше BATCH_OPERATION_STALE_SECONDS, процесс,
+    который ее выполнял, перезапущен или упал.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.BATCH_OPERATION_STALE_SECONDS)
+    return BatchOperation.objects.filter(
+        Q(status='pending') | Q(status='running', heartbeat_at__lt=stale) | Q(status='running', heartbeat_at__isnull=True)
+    )
+
+
+def claim(pk: int) -> Optional[BatchOperation]:
+    """Захват операции условным UPDATE: из двух процессов ее получит один"""
+    operation = claimable().filter(pk=pk).first()
+    if operation is None:
+        return None
+    claimed = claimable().filter(pk=pk, heartbeat_at=operation.heartbeat_at).update(
+        status='running', heartbeat_at=timezone.now()
+    )
+    return BatchOperation.objects.get(pk=pk) if claimed else None
+
+
+def run(operation: BatchOperation, batch_size: int = 500):
+    """Выполнение захваченной операции до конца
+
+    Отбор выполняется заново на каждой пачке, поэтому продолжение
+    прерванной операции берет только оставшиеся вакансии.
+    """
+    processed_before = operation.processed
+
+    def progress(processed):
+        BatchOperation.objects.filter(pk=operation.pk).update(
+            processed=processed_before + processed, heartbeat_at=timezone.now()
+        )
+
+    try:
+        close_old_connections()
+        if operation.query is None:
+            raise RuntimeError("Отбор операции не сохранен, продолжить нельзя")
+        queryset = _queryset(operation)
+        if operation.action == 'archive':
+            retention.archive(queryset, 'manual', batch_size, progress=progress)
+        else:
+            retention.remove(queryset, batch_size, progress=progress)
+        BatchOperation.objects.filter(pk=operation.pk).update(status='done', finished_at=timezone.now())
+    except Exception as e:
+        print(f"Массовая операция {operation.pk} прервана: {e}")
+        BatchOperation.objects.filter(pk=operation.pk).update(
+            status='failed', error=str(e)[:1000], finished_at=timezone.now()
+        )
+    finally:
+        if BatchOperation.objects.filter(pk=operation.pk, processed__gt=processed_before).exists():
+            # Сбрасываем кэш страниц и API: данные изменились
+            bump_data_version()
+
+
+def _run_in_thread(operation: BatchOperation, batch_size: int):
+    try:
+        run(operation, batch_size)
+    finally:
+        connection.close()
+
+
+def start(action: str, queryset, description: str = '', user: str = '', total: int = 0,
+          batch_size: int = 500) -> BatchOperation:
+    """Постановка архивирования или удаления вакансий queryset в очередь
+
+    Объекты не загружаются целиком: отбор сохраняется запросом, и
+    выполняющий процесс выбирает по batch_size строк, пока условие
+    что-то находит, каждая пачка — своя транзакция. С
+    BATCH_OPERATIONS_IN_WEB операция сразу запускается в фоновом потоке
+    веб-процесса, иначе ее выполняет run_batch_operations. Прогресс
+    виден в админке (BatchOperation).
+    """
+    operation = BatchOperation.objects.create(
+        action=action, description=description, user=user, total=total,
+        query=pickle.dumps(queryset.query),
+    )
+    if settings.BATCH_OPERATIONS_IN_WEB:
+        claimed = claim(operation.pk)
+        if claimed is not None:
+            threading.Thread(
+                target=_run_in_thread, args=(claimed, batch_size),
+                name=f'batch-operation-{operation.pk}', daemon=True
+            ).start()
+            return claimed
+    return operation
+
+
+def run_pending(batch_size: int = 500, progress: Optional[Callable[[BatchOperation], None]] = None) -> int:
+    """Выполнение всех операций в очереди и прерванных; возвращает их количество"""
+    completed = 0
+    for pk in claimable().order_by('pk').values_list('pk', flat=True):
+        operation = claim(pk)
+        if operation is None:
+            continue
+        run(operation, batch_size)
+        completed += 1
+        if progress:
+            progress(BatchOperation.objects.get(pk=pk))
+    return completed
@@ -0,0 +1,103 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+# Номер поколения данных. Увеличивается после импорта и очистки базы,
+# все ключи кэша включают его, поэтому старые записи просто перестают читаться
+DATA_VERSION_KEY = 'vacancies:data_version'
+
+
+def get_data_version() -> int:
+    """Текущее поколение данных"""
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, 1, timeout=None)
+        version = cache.get(DATA_VERSION_KEY, 1)
+    return version
+
+
+def bump_data_version() -> int:
+    """Инвалидация всех закэшированных страниц и данных"""
+    try:
+        return cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        # Ключа еще нет (или он вытеснен из кэша)
+        cache.set(DATA_VERSION_KEY, 2, timeout=None)
+        return 2
+
+
+def normalized_query(request) -> str:
+    """GET-параметры без пустых значений, отсортированные по имени"""
+    items = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+        if value.strip()
+    )
+    return '&'.join(f'{key}={value}' for key, value in items)
+
+
+def request_fingerprint(request) -> str:
+    """Хэш пути и нормализованных параметров запроса"""
+    raw = f'{request.path}?{normalized_query(request)}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def get_or_compute(name: str, compute, timeout=None):
+    """Значение из кэша текущего поколения данных или результат compute()"""
+    key = f'data:{name}:{get_data_version()}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout or settings.CACHE_PAGE_TIMEOUT)
+    return value
+
+
+def json_etag(request, *args, **kwargs) -> str:
+    """ETag для JSON API: поколение данных + параметры запроса"""
+    return f'{get_data_version()}-{request_fingerprint(request)}'
+
+
+def is_cacheable(request) -> bool:
+    """Можно ли отдать запрос из кэша страниц"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Страница с одноразовыми сообщениями не должна попасть в кэш
+    if request.COOKIES.get('messages') or request.session.get('_messages'):
+        return False
+    return True
+
+
+class CachedPageMixin:
+    """Кэширование готовой страницы для анонимных пользователей
+
+    Ключ строится из поколения данных, пути и нормализованных
+    GET-параметров. При попадании в кэш не выполняются ни запросы
+    к базе, ни рендеринг шаблона.
+    """
+    cache_prefix = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = f'page:{self.cache_prefix}:{get_data_version()}:{request_fingerprint(request)}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key,
+                    (rendered.content, rendered['Content-Type']),
+                    settings.CACHE_PAGE_TIMEOUT
+                )
+            )
+        return response
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .db import is_postgresql
+from .models import Vacancy, VacancyChange
+
+# Сколько изменений читается из базы за один запрос
+PAGE_SIZE = 500
+
+
+def log(hh_ids: Iterable[int], op: str):
+    """Запись изменений в журнал (вызывается в транзакции, которая меняет вакансии)"""
+    now = timezone.now()
+    VacancyChange.objects.bulk_create(
+        [VacancyChange(hh_id=hh_id, op=op, changed_at=now) for hh_id in hh_ids],
+        batch_size=PAGE_SIZE
+    )
+
+
+def log_reset():
+    """Отметка об очистке базы: потребителю нужно удалить все у себя"""
+    VacancyChange.objects.create(op='reset')
+
+
+def oldest_cursor() -> int:
+    """Самый ранний курсор, с которого журнал еще полный"""
+    first = VacancyChange.objects.order_by('pk').values_list('pk', flat=True).first()
+    return first - 1 if first else 0
+
+
+def latest_cursor() -> int:
+    """Курсор после последнего изменения (с него начинают после полной синхронизации)"""
+    return VacancyChange.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def _settled(queryset):
+    # В PostgreSQL параллельные транзакции фиксируются не в порядке id:
+    # свежие изменения отдаются с задержкой, чтобы курсор не перескочил
+    # через еще не зафиксированные
+    if is_postgresql() and settings.CHANGES_SETTLE_SECONDS:
+        return queryset.filter(changed_at__lte=timezone.now() - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS))
+    return queryset
+
+
+def changes_since(since: int, limit: int, fields: List[str]) -> Tuple[List[Dict], int, bool]:
+    """Страница журнала после курсора since: (изменения, следующий курсор, есть ли еще)"""
+    rows = list(
+        _settled(VacancyChange.objects.filter(pk__gt=since))
+        .order_by('pk').values('pk', 'hh_id', 'op', 'changed_at')[:limit]
+    )
+    # Несколько изменений одной вакансии подряд — достаточно последнего:
+    # текущее состояние вакансии одно
+    last = {}
+    for row in rows:
+        if row['hh_id'] is not None:
+            last[row['hh_id']] = row['pk']
+
+    wanted = [row['hh_id'] for row in rows if row['op'] in ('insert', 'update')]
+    current = {
+        vacancy['hh_id']: vacancy
+        for vacancy in Vacancy.objects.filter(hh_id__in=wanted).values('hh_id', *fields)
+    }
+
+    changes = []
+    for row in rows:
+        hh_id = row['hh_id']
+        if hh_id is not None and last[hh_id] != row['pk']:
+            continue
+        change = {'id': row['pk'], 'op': row['op'], 'hh_id': hh_id, 'changed_at': row['changed_at']}
+        if row['op'] in ('insert', 'update'):
+            vacancy = current.get(hh_id)
+            if vacancy is None:
+                # Вакансию уже удалили, удаление будет дальше в журнале
+                continue
+            change['vacancy'] = vacancy
+        changes.append(change)
+    return changes, (rows[-1]['pk'] if rows else since), len(rows) == limit
+
+
+def iter_changes(since: int, limit: int, fields: List[str]) -> Iterator[Dict]:
+    """Все изменения после курсора (не больше limit) страницами по PAGE_SIZE
+
+    Последним элементом идет {'next': курсор}.
+    """
+    remaining = limit
+    while remaining > 0:
+        changes, since, has_more = changes_since(since, min(PAGE_SIZE, remaining), fields)
+        yield from changes
+        remaining -= PAGE_SIZE
+        if not has_more:
+            break
+    yield {'next': since}
+
+
+def prune(max_age_days: int) -> int:
+    """Удаление записей журнала старше max_age_days дней
+
+    Последняя запись сохраняется всегда, чтобы нумерация курсоров
+    не начиналась заново.
+    """
+    newest = VacancyChange.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if newest is None:
+        return 0
+    deleted, _ = VacancyChange.objects.filter(
+        changed_at__lt=timezone.now() - timedelta(days=max_age_days), pk__lt=newest
+    ).delete()
+    return deleted
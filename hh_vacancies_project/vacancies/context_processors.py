@@ -1,9 +1,30 @@
-from .models import Vacancy, SearchQuery
+from django.core.handlers.asgi import ASGIRequest
+
+from .models import Vacancy
+from .db import estimated_count
+from . import search_log
+
+
+def recent_searches():
+    return search_log.widgets()['recent'][:5]
+
+
+def popular_searches():
+    return search_log.widgets()['popular']
 
 
 def vacancy_context(request):
-    """Контекстный процессор для счетчика вакансий"""
+    """Контекстный процессор для счетчика вакансий и виджетов истории запросов
+
+    Виджеты передаются функциями: шаблон вызывает их, только если выводит
+    историю запросов. Кэшируемые страницы (CachedPageMixin) ее не выводят,
+    поэтому история в кэш страниц не попадает и не устаревает там до
+    следующего импорта, а ее обновление не сбрасывает кэш страниц.
+    """
     return {
-        'vacancy_count': Vacancy.objects.count(),
-        'recent_searches': SearchQuery.objects.all().order_by('-search_date')[:5]
-    }
\ No newline at end of file
+        'vacancy_count': estimated_count(Vacancy.objects.all()),
+        'recent_searches': recent_searches,
+        'popular_searches': popular_searches,
+        # Поток /api/events/ есть только под ASGI, под WSGI страницы опрашивают /api/stats/
+        'live_events': isinstance(request, ASGIRequest),
+    }
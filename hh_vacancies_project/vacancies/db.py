@@ -0,0 +1,133 @@
+from typing import Iterator, List
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Настройка нового соединения с SQLite (WAL, synchronous, mmap и т.д.)"""
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def is_postgresql(using: str = 'default') -> bool:
+    """Работает ли указанное подключение через PostgreSQL"""
+    return connections[using].vendor == 'postgresql'
+
+
+def estimated_count(queryset) -> int:
+    """Количество строк в queryset
+
+    Для нефильтрованных таблиц на PostgreSQL берется оценка из pg_class
+    (мгновенно), если таблица больше COUNT_ESTIMATE_THRESHOLD строк.
+    В остальных случаях выполняется обычный COUNT(*).
+    """
+    using = queryset.db
+    if is_postgresql(using) and not queryset.query.where:
+        table = queryset.model._meta.db_table
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [table]
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else -1
+        if estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+            return estimate
+    return queryset.count()
+
+
+def text_search_q(query: str, fields) -> Q:
+    """Условие поиска подстроки по нескольким полям
+
+    На PostgreSQL icontains превращается в UPPER(поле::text) LIKE ...,
+    и такие запросы обслуживаются GIN-индексами pg_trgm из миграции
+    0003_postgres_trigram_indexes и 0006_vacancy_description_text.
+    На SQLite выполняется обычный LIKE.
+    """
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': query})
+    return condition
+
+
+def chunked(queryset, chunk_size: int = 1000) -> Iterator[List]:
+    """Итерация по queryset пачками фиксированного размера
+
+    Строки читаются через iterator(): на PostgreSQL это серверный курсор,
+    на SQLite — постепенная выборка, кэш queryset не заполняется. В памяти
+    одновременно находится не больше chunk_size объектов, сколько бы
+    строк ни было в таблице. Работает и для values()/values_list().
+    """
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def delete_in_batches(queryset, batch_size: int = 1000) -> int:
+    """Удаление строк queryset пачками по первичному ключу
+
+    Обычный delete() собирает в память все удаляемые объекты (и связанные
+    по каскаду) ради сигналов. Здесь за раз выбирается не больше
+    batch_size ключей, каждая пачка удаляется в своей транзакции.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        with transaction.atomic(using=queryset.db):
+            model._base_manager.using(queryset.db).filter(pk__in=pks).only('pk').delete()
+        deleted += len(pks)
+
+
+def upsert_returning_inserted(objs: List, unique_field: str, update_fields: List[str],
+                              batch_size: int = 500) -> set:
+    """INSERT ... ON CONFLICT DO UPDATE для PostgreSQL; значения unique_field вставленных строк
+
+    Вставлена строка или обновлена, решает сама база: RETURNING (xmax = 0)
+    истинно только для новых версий, созданных вставкой. В отличие от
+    чтения до записи, ответ верен и при параллельных импортах тех же строк.
+    """
+    if not objs:
+        return set()
+    model = type(objs[0])
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    insert_fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    unique_column = quote(model._meta.get_field(unique_field).column)
+    columns = ', '.join(quote(field.column) for field in insert_fields)
+    updates = ', '.join(
+        f'{quote(column)} = EXCLUDED.{quote(column)}'
+        for column in (model._meta.get_field(name).column for name in update_fields)
+    )
+    row = '(' + ', '.join(['%s'] * len(insert_fields)) + ')'
+
+    inserted = set()
+    for start in range(0, len(objs), batch_size):
+        batch = objs[start:start + batch_size]
+        params = [
+            field.get_db_prep_save(field.pre_save(obj, True), connection)
+            for obj in batch for field in insert_fields
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES {", ".join([row] * len(batch))} '
+                f'ON CONFLICT ({unique_column}) DO UPDATE SET {updates} '
+                f'RETURNING {unique_column}, (xmax = 0)',
+                params
+            )
+            inserted.update(key for key, is_insert in cursor.fetchall() if is_insert)
+    return inserted
@@ -0,0 +1,146 @@
+import hashlib
+import re
+import zlib
+from typing import Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .db import chunked
+from .models import Vacancy, LshBucket
+
+# 64 хэш-функции = 16 полос по 4 строки. Пара с похожестью по Жаккару s
+# попадает в общую корзину хотя бы одной полосы с вероятностью
+# 1 - (1 - s^4)^16: ~0.99 при s = 0.8 и ~0.05 при s = 0.3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+SHINGLE_SIZE = 3
+MAX_TEXT_LENGTH = 3000
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_random = np.random.RandomState(20240501)
+_A = _random.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_B = _random.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def _shingles(vacancy: Vacancy) -> set:
+    text = ' '.join([vacancy.name, vacancy.employer_name, vacancy.description_text[:MAX_TEXT_LENGTH]])
+    words = WORD_RE.findall(text.casefold())
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(vacancy: Vacancy) -> Optional[np.ndarray]:
+    """MinHash-сигнатура по названию, работодателю и тексту описания"""
+    shingles = _shingles(vacancy)
+    if not shingles:
+        return None
+
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # Перестановки вида (a·x + b) mod p для всех хэш-функций сразу
+    permuted = (np.outer(hashes, _A) + _B) % _MERSENNE_PRIME
+    return (permuted.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def band_hashes(sig: np.ndarray):
+    """Хэши полос сигнатуры (ключи корзин LSH)"""
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+        yield band, int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), 'big', signed=True)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Оценка похожести по Жаккару — доля совпавших позиций сигнатур"""
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+def assign_clusters(vacancies: Iterable[Vacancy]):
+    """Назначение кластеров дубликатов новым и обновленным вакансиям
+
+    Кандидаты ищутся только среди вакансий, у которых совпала хотя бы
+    одна полоса сигнатуры (индексный поиск по LshBucket), затем
+    похожесть проверяется по сигнатурам. Без совпадений вакансия
+    открывает собственный кластер. Если головная вакансия после
+    изменения текста ушла в другой кластер, у прежнего назначается
+    новая голова.
+    """
+    threshold = settings.DEDUP_THRESHOLD
+
+    with transaction.atomic():
+        for vacancy in vacancies:
+            was_head = vacancy.cluster_id == vacancy.pk
+            sig = signature(vacancy)
+            LshBucket.objects.filter(vacancy=vacancy).delete()
+            if sig is None:
+                vacancy.minhash, vacancy.cluster_id, vacancy.is_duplicate = None, vacancy.pk, False
+                vacancy.save(update_fields=['minhash', 'cluster_id', 'is_duplicate'])
+                continue
+
+            buckets = list(band_hashes(sig))
+            condition = Q()
+            for band, bucket_hash in buckets:
+                condition |= Q(band=band, bucket_hash=bucket_hash)
+            candidate_ids = set(
+                LshBucket.objects.filter(condition).values_list('vacancy_id', flat=True)
+            )
+
+            best_cluster, best_score = None, threshold
+            candidates = Vacancy.objects.filter(pk__in=candidate_ids).values_list('cluster_id', 'minhash')
+            for cluster_id, minhash in candidates:
+                if minhash is None or cluster_id is None:
+                    continue
+                score = similarity(sig, np.frombuffer(minhash, dtype=np.uint32))
+                if score >= best_score:
+                    best_cluster, best_score = cluster_id, score
+
+            vacancy.minhash = sig.tobytes()
+            vacancy.cluster_id = best_cluster if best_cluster is not None else vacancy.pk
+            vacancy.is_duplicate = vacancy.cluster_id != vacancy.pk
+            vacancy.save(update_fields=['minhash', 'cluster_id', 'is_duplicate'])
+
+            LshBucket.objects.bulk_create([
+                LshBucket(band=band, bucket_hash=bucket_hash, vacancy=vacancy)
+                for band, bucket_hash in buckets
+            ])
+
+            if was_head and vacancy.is_duplicate:
+                reassign_heads([vacancy.pk])
+
+
+def rebuild(chunk_size: int = 1000) -> int:
+    """Пересчет кластеров для всех вакансий в порядке добавления"""
+    LshBucket.objects.all().delete()
+    Vacancy.objects.update(cluster_id=None, is_duplicate=False, minhash=None)
+
+    processed = 0
+    fields = ('pk', 'name', 'employer_name', 'description_text')
+    for chunk in chunked(Vacancy.objects.only(*fields).order_by('pk'), chunk_size):
+        assign_clusters(chunk)
+        processed += len(chunk)
+    return processed
+
+
+def reassign_heads(cluster_ids: Iterable[int]):
+    """Новая головная вакансия для кластеров, чья голова удалена или ушла в другой кластер
+
+    Головой становится самая ранняя из оставшихся вакансий кластера,
+    иначе весь кластер считался бы дубликатами и пропал из списка.
+    """
+    for cluster_id in set(cluster_ids):
+        if Vacancy.objects.filter(pk=cluster_id, cluster_id=cluster_id).exists():
+            continue
+        head = Vacancy.objects.filter(cluster_id=cluster_id).order_by('pk').values_list('pk', flat=True).first()
+        if head is None:
+            continue
+        Vacancy.objects.filter(cluster_id=cluster_id).update(cluster_id=head, is_duplicate=True)
+        Vacancy.objects.filter(pk=head).update(is_duplicate=False)
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Avg, Count, Max
+
+from .cache import get_or_compute
+from .db import estimated_count
+from .models import Vacancy, SearchQuery, HarvestUnit, BatchOperation
+from .responses import dumps
+from . import harvest_queue
+
+# Сколько заданий распределенного импорта показывать в прогрессе
+MAX_PROGRESS_JOBS = 5
+
+# Через сколько миллисекунд EventSource переподключается после закрытия потока
+RETRY_MS = 3000
+
+
+def site_stats() -> Dict:
+    """Счетчики для шапки сайта и /api/stats/"""
+    vacancy_stats = Vacancy.objects.aggregate(
+        total_employers=Count('employer_name', distinct=True),
+        avg_salary=Avg('salary_from'),
+    )
+    import_stats = SearchQuery.objects.aggregate(
+        recent_imports=Count('id'),
+        last_import=Max('search_date'),
+    )
+    return {
+        'total_vacancies': estimated_count(Vacancy.objects.all()),
+        'total_employers': vacancy_stats['total_employers'],
+        'avg_salary': int(vacancy_stats['avg_salary'] or 0),
+        'recent_imports': import_stats['recent_imports'],
+        'last_import': import_stats['last_import'].strftime('%d.%m.%Y %H:%M')
+            if import_stats['last_import'] else 'Нет данных'
+    }
+
+
+def import_progress() -> List[Dict]:
+    """Идущие импорты: задания распределенного импорта и массовые операции из админки"""
+    items = []
+    jobs = HarvestUnit.objects.filter(status__in=['pending', 'leased']).order_by('job').values_list('job', flat=True)
+    for job in jobs.distinct()[:MAX_PROGRESS_JOBS]:
+        status = harvest_queue.job_status(job)
+        items.append({
+            'kind': 'harvest',
+            'name': job,
+            'done': status['done'] + status['failed'],
+            'total': status['total'],
+            'created': status['created'],
+        })
+    for operation in BatchOperation.objects.filter(status__in=['pending', 'running']).order_by('pk').values('pk', 'action', 'processed', 'total'):
+        items.append({
+            'kind': operation['action'],
+            'name': f"#{operation['pk']}",
+            'done': operation['processed'],
+            'total': operation['total'],
+        })
+    return items
+
+
+def snapshot() -> Dict:
+    """Состояние, которое рассылается подписчикам
+
+    Счетчики берутся через get_or_compute: агрегаты пересчитываются
+    один раз на поколение данных (после импорта), а не на каждый опрос.
+    """
+    return {
+        'stats': get_or_compute('api_stats', site_stats),
+        'imports': import_progress(),
+    }
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+class Publisher:
+    """Общий источник обновлений для всех открытых потоков процесса
+
+    Пока есть хотя бы один подписчик, фоновый поток раз в
+    EVENTS_INTERVAL секунд строит snapshot() и, если состояние
+    изменилось, будит ожидающие потоки через future в их event loop.
+    N клиентов стоят одного запроса к базе за интервал. Без подписчиков
+    поток завершается.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._subscribers = 0
+        self._seq = 0
+        self._state: Optional[Dict] = None
+        self._event_id = ''
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    def subscribe(self):
+        with self._lock:
+            self._subscribers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='events-publisher', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self):
+        with self._lock:
+            self._subscribers -= 1
+
+    def current(self) -> Tuple[int, str, Optional[Dict]]:
+        """Номер версии, id события и последнее состояние"""
+        with self._lock:
+            return self._seq, self._event_id, self._state
+
+    async def wait_async(self, seq: int, timeout: float) -> bool:
+        """Ожидание новой версии в event loop, без отдельного потока на клиента"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if self._seq != seq:
+                return True
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def publish(self, state: Dict) -> bool:
+        """Новое состояние; подписчики будятся, только если оно изменилось"""
+        payload = dumps(state)
+        event_id = hashlib.md5(payload).hexdigest()[:16]
+        with self._lock:
+            if event_id == self._event_id:
+                return False
+            self._seq += 1
+            self._state, self._event_id = state, event_id
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+        return True
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if self._subscribers <= 0:
+                        self._thread = None
+                        return
+                try:
+                    close_old_connections()
+                    self.publish(snapshot())
+                except Exception as e:
+                    print(f"Ошибка обновления событий: {e}")
+                time.sleep(settings.EVENTS_INTERVAL)
+        finally:
+            connection.close()
+
+
+publisher = Publisher()
+
+
+def format_event(event_id: str, state: Dict) -> bytes:
+    return b'id: ' + event_id.encode() + b'\nevent: stats\ndata: ' + dumps(state) + b'\n\n'
+
+
+async def stream_async(last_event_id: str = ''):
+    """Поток для ASGI: события при каждом изменении, комментарий-пинг раз в EVENTS_KEEPALIVE секунд
+
+    Через EVENTS_MAX_DURATION секунд поток закрывается, и браузер
+    переподключается: так не копятся потоки отключившихся клиентов.
+    """
+    publisher.subscribe()
+    try:
+        yield f'retry: {RETRY_MS}\n\n'.encode()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.EVENTS_MAX_DURATION
+        seq, sent_id = -1, last_event_id
+        while loop.time() < deadline:
+            current_seq, event_id, state = publisher.current()
+            if current_seq != seq:
+                seq = current_seq
+                if state is not None and event_id != sent_id:
+                    sent_id = event_id
+                    yield format_event(event_id, state)
+                continue
+            if not await publisher.wait_async(seq, settings.EVENTS_KEEPALIVE):
+                yield b': ping\n\n'
+    finally:
+        publisher.unsubscribe()
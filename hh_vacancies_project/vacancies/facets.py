@@ -0,0 +1,154 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .db import chunked
+from .models import Vacancy, FacetValue
+
+FACETS = [facet for facet, _ in FacetValue.FACET_CHOICES]
+
+# Зарплатные диапазоны (руб., по середине вилки): значение фасета и границы
+SALARY_BANDS = [
+    ('до 50 000', 0, 50000),
+    ('50 000 – 100 000', 50000, 100000),
+    ('100 000 – 150 000', 100000, 150000),
+    ('150 000 – 200 000', 150000, 200000),
+    ('200 000 – 300 000', 200000, 300000),
+    ('от 300 000', 300000, None),
+]
+
+
+def salary_band(salary) -> str:
+    """Зарплатный диапазон для суммы в рублях"""
+    for label, low, high in SALARY_BANDS:
+        if salary >= low and (high is None or salary < high):
+            return label
+    return SALARY_BANDS[0][0]
+
+
+def facet_values(vacancy: Vacancy) -> List[Tuple[str, str]]:
+    """Пары (фасет, значение) для вакансии"""
+    values = [
+        (facet, getattr(vacancy, facet)[:100])
+        for facet in ('area', 'experience', 'employment', 'schedule')
+        if getattr(vacancy, facet)
+    ]
+    salary = vacancy.get_salary_value()
+    if salary:
+        values.append(('salary', salary_band(salary)))
+    return values
+
+
+def _load_values(pairs: set) -> Dict[Tuple[str, str], FacetValue]:
+    return {
+        (value.facet, value.value): value
+        for value in FacetValue.objects.filter(value__in={value for _, value in pairs})
+        if (value.facet, value.value) in pairs
+    }
+
+
+def _get_or_create_values(pairs) -> Dict[Tuple[str, str], FacetValue]:
+    """Значения фасетов по парам, недостающие создаются одним запросом"""
+    pairs = set(pairs)
+    values = _load_values(pairs)
+    missing = [FacetValue(facet=facet, value=value) for facet, value in pairs if (facet, value) not in values]
+    if missing:
+        FacetValue.objects.bulk_create(missing, ignore_conflicts=True)
+        values = _load_values(pairs)
+    return values
+
+
+def index_vacancies(vacancies: Iterable[Vacancy], remove: bool = False):
+    """Инкрементальное обновление списков вакансий по значениям фасетов
+
+    Как и индекс навыков, применяется только разница между текущими
+    значениями вакансии и уже учтенными. С remove=True вакансии
+    убираются из индекса.
+    """
+    vacancies = list(vacancies)
+    if not vacancies:
+        return
+
+    parsed = {vacancy.pk: set() if remove else set(facet_values(vacancy)) for vacancy in vacancies}
+    indexed = {vacancy.pk: {} for vacancy in vacancies}
+    through = Vacancy.facets.through
+    for link in through.objects.filter(vacancy_id__in=indexed).select_related('facetvalue'):
+        value = link.facetvalue
+        indexed[link.vacancy_id][(value.facet, value.value)] = value.pk
+
+    with transaction.atomic():
+        values = _get_or_create_values(pair for pairs in parsed.values() for pair in pairs)
+
+        count_deltas = Counter()
+        links_to_add, links_to_remove = [], []
+        for vacancy_id, pairs in parsed.items():
+            new_ids = {values[pair].pk for pair in pairs}
+            old_ids = set(indexed[vacancy_id].values())
+            for value_id in new_ids - old_ids:
+                count_deltas[value_id] += 1
+                links_to_add.append(through(vacancy_id=vacancy_id, facetvalue_id=value_id))
+            for value_id in old_ids - new_ids:
+                count_deltas[value_id] -= 1
+                links_to_remove.append((vacancy_id, value_id))
+
+        through.objects.bulk_create(links_to_add, ignore_conflicts=True, batch_size=500)
+        for vacancy_id, value_id in links_to_remove:
+            through.objects.filter(vacancy_id=vacancy_id, facetvalue_id=value_id).delete()
+
+        for value_id, delta in count_deltas.items():
+            if delta:
+                FacetValue.objects.filter(pk=value_id).update(vacancy_count=F('vacancy_count') + delta)
+
+
+def rebuild(chunk_size: int = 1000) -> int:
+    """Полная перестройка индекса фасетов"""
+    with transaction.atomic():
+        Vacancy.facets.through.objects.all().delete()
+        FacetValue.objects.all().delete()
+
+    processed = 0
+    fields = ('pk', 'area', 'experience', 'employment', 'schedule', 'salary_from', 'salary_to', 'currency')
+    for chunk in chunked(Vacancy.objects.only(*fields).order_by('pk'), chunk_size):
+        index_vacancies(chunk)
+        processed += len(chunk)
+    return processed
+
+
+def filter_by_value(queryset, facet: str, value: str):
+    """Вакансии queryset с выбранным значением фасета
+
+    Значение из индекса фасетов фильтруется через Vacancy.facets —
+    точно так же, как считаются количества в facet_counts, поэтому
+    число у варианта совпадает с числом найденных вакансий. Значение,
+    которого нет в индексе (ссылка с частью названия), ищется подстрокой.
+    """
+    value_id = FacetValue.objects.filter(facet=facet, value=value[:100]).values_list('pk', flat=True).first()
+    if value_id is None:
+        return queryset.filter(**{f'{facet}__icontains': value})
+    return queryset.filter(facets=value_id)
+
+
+def facet_counts(queryset, limit: int = 10) -> Dict[str, List[Dict]]:
+    """Количество вакансий по каждому значению всех фасетов для queryset
+
+    Один запрос: значения фасетов соединяются с таблицей связей,
+    отфильтрованной подзапросом по вакансиям из queryset.
+    """
+    rows = (
+        FacetValue.objects
+        .filter(vacancies__in=queryset.order_by().values('pk'))
+        .values('facet', 'value')
+        .annotate(count=Count('vacancies'))
+        .order_by('facet', '-count', 'value')
+    )
+
+    counts = {facet: [] for facet in FACETS}
+    for row in rows:
+        counts[row['facet']].append({'value': row['value'], 'count': row['count']})
+
+    # Зарплатные диапазоны — в порядке возрастания, остальные — по убыванию количества
+    order = {label: index for index, (label, _, _) in enumerate(SALARY_BANDS)}
+    counts['salary'].sort(key=lambda item: order.get(item['value'], len(order)))
+    return {facet: values if facet == 'salary' else values[:limit] for facet, values in counts.items()}
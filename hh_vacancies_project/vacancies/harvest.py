@@ -0,0 +1,113 @@
+import time
+from typing import Callable, Dict, Optional
+
+from .cache import bump_data_version
+from . import search_log
+from .services import HHApiService, RequestBudget
+
+# HH отдает не больше 2000 вакансий на один поисковый запрос
+MAX_DEPTH = 2000
+
+# HH отдает не больше 100 вакансий на страницу
+PAGE_SIZE = 100
+
+
+def harvest(search_params: Dict, max_pages: int = None, limit: int = None, workers: int = 1,
+            rate: float = None, batch_size: int = 100,
+            progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Многостраничный импорт по одному поисковому запросу
+
+    Страницы поиска читаются последовательно, детали вакансий
+    загружаются в пуле потоков с общим лимитом rate запросов в секунду,
+    сохранение идет пачками по batch_size. После каждой пачки
+    вызывается progress(stats).
+    """
+    service = HHApiService(budget=RequestBudget(rate) if rate else None)
+    per_page = min(search_params.get('per_page') or PAGE_SIZE, PAGE_SIZE)
+    max_pages = min(max_pages or MAX_DEPTH // per_page, MAX_DEPTH // per_page)
+    base_params = service.build_params({**search_params, 'per_page': per_page})
+
+    stats = {
+        'params': base_params,
+        'found': 0,
+        'target': 0,
+        'pages': 0,
+        'fetched': 0,
+        'created': 0,
+        'updated': 0,
+        'missing': 0,
+        'errors': [],
+        'elapsed': 0.0,
+        'rate': 0.0,
+        'eta': None,
+        'success': True,
+    }
+    started = time.monotonic()
+    seen = set()
+
+    def save(vacancy_ids):
+        details_list = service.fetch_details(vacancy_ids, workers=workers)
+        batch = service.save_batch(details_list)
+
+        stats['fetched'] += len(vacancy_ids)
+        stats['missing'] += len(vacancy_ids) - len(details_list)
+        stats['created'] += batch['created']
+        stats['updated'] += batch['updated']
+        stats['errors'].extend(batch['errors'])
+
+        stats['elapsed'] = time.monotonic() - started
+        stats['rate'] = stats['fetched'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        remaining = max(stats['target'] - stats['fetched'], 0)
+        stats['eta'] = remaining / stats['rate'] if stats['rate'] else None
+        if progress:
+            progress(stats)
+
+    pending = []
+    for page in range(max_pages):
+        data = service.search_vacancies({**base_params, 'page': page})
+        if data.get('error'):
+            stats['errors'].append(f"Ошибка HH API на странице {page}: {data['error']}")
+            stats['success'] = False
+            break
+
+        if page == 0:
+            stats['found'] = data.get('found', 0)
+            stats['target'] = min(
+                stats['found'], MAX_DEPTH, max_pages * per_page,
+                limit if limit else stats['found']
+            )
+        stats['pages'] += 1
+
+        for item in data.get('items', []):
+            vacancy_id = item.get('id')
+            if vacancy_id and vacancy_id not in seen and len(seen) < stats['target']:
+                seen.add(vacancy_id)
+                pending.append(vacancy_id)
+
+        while len(pending) >= batch_size:
+            save(pending[:batch_size])
+            pending = pending[batch_size:]
+
+        if len(seen) >= stats['target'] or page + 1 >= data.get('pages', 0):
+            break
+
+    if pending:
+        save(pending)
+
+    if stats['created'] or stats['updated']:
+        # Сбрасываем кэш страниц и API: данные изменились
+        bump_data_version()
+    if stats['created']:
+        search_log.record(
+            base_params['text'],
+            area=base_params.get('area', ''),
+            experience=base_params.get('experience', ''),
+            employment=base_params.get('employment', ''),
+            results_count=stats['created'],
+            kind='import'
+        )
+
+    stats['elapsed'] = time.monotonic() - started
+    stats['rate'] = stats['fetched'] / stats['elapsed'] if stats['elapsed'] else 0.0
+    stats['eta'] = 0
+    return stats
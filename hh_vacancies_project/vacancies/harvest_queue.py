@@ -0,0 +1,269 @@
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .harvest import MAX_DEPTH, PAGE_SIZE
+from .models import HarvestUnit
+from .services import HHApiService, RequestBudget
+
+# Интервал дат не делится мельче часа, даже если в нем больше 2000 вакансий
+MIN_SLICE = timedelta(hours=1)
+
+# Из скольких первых доступных единиц воркер случайно выбирает, какую захватить:
+# иначе все воркеры одновременно пытаются взять одну и ту же
+CLAIM_CANDIDATES = 20
+
+
+def default_owner() -> str:
+    """Имя воркера: хост и pid процесса"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _probe(service: HHApiService, params: Dict) -> Dict:
+    """Сколько вакансий найдено по параметрам (одна вакансия в ответе)"""
+    return service.search_vacancies({**params, 'page': 0, 'per_page': 1})
+
+
+def plan(job: str, search_params: Dict, area_ids: List[str], date_from: datetime, date_to: datetime,
+         slice_hours: int = 24, service: HHApiService = None) -> Dict:
+    """Разбиение задания на единицы: регион × интервал дат × страница
+
+    Для каждого региона и интервала координатор запрашивает у HH
+    количество вакансий. Интервал, в котором больше MAX_DEPTH вакансий
+    (глубже HH не отдает), делится пополам, пока половины не меньше
+    MIN_SLICE. Затем на каждую страницу создается HarvestUnit.
+    """
+    service = service or HHApiService(budget=RequestBudget(settings.HH_REQUESTS_PER_SECOND))
+    base_params = service.build_params({**search_params, 'per_page': PAGE_SIZE, 'order_by': 'publication_time'})
+    base_params.pop('page', None)
+
+    stats = {'job': job, 'slices': 0, 'units': 0, 'found': 0, 'truncated': 0, 'errors': []}
+    units = []
+    step = timedelta(hours=slice_hours)
+
+    for area_id in area_ids:
+        windows = []
+        start = date_from
+        while start < date_to:
+            windows.append((start, min(start + step, date_to)))
+            start += step
+
+        while windows:
+            start, end = windows.pop()
+            params = {
+                **base_params,
+                'area': area_id,
+                'date_from': start.isoformat(timespec='seconds'),
+                'date_to': end.isoformat(timespec='seconds'),
+            }
+            data = _probe(service, params)
+            if data.get('error'):
+                stats['errors'].append(f"Регион {area_id}, {params['date_from']}: {data['error']}")
+                continue
+
+            found = data.get('found', 0)
+            if found > MAX_DEPTH and (end - start) / 2 >= MIN_SLICE:
+                middle = start + (end - start) / 2
+                windows.extend([(start, middle), (middle, end)])
+                continue
+
+            stats['slices'] += 1
+            stats['found'] += found
+            stats['truncated'] += max(found - MAX_DEPTH, 0)
+            pages = -(-min(found, MAX_DEPTH) // PAGE_SIZE)
+            units.extend(HarvestUnit(job=job, params=params, page=page) for page in range(pages))
+
+    with transaction.atomic():
+        HarvestUnit.objects.bulk_create(units, batch_size=500)
+    stats['units'] = len(units)
+    return stats
+
+
+def reap_expired(job: str, max_attempts: int) -> int:
+    """Единицы с истекшей арендой и исчерпанными попытками — в ошибки"""
+    return HarvestUnit.objects.filter(
+        job=job, status='leased', lease_expires_at__lt=timezone.now(), attempts__gte=max_attempts
+    ).update(status='failed', lease_owner='', error='Аренда истекла, попытки исчерпаны')
+
+
+def claim(job: str, owner: str, lease_seconds: int, max_attempts: int) -> Optional[HarvestUnit]:
+    """Захват свободной единицы или единицы с истекшей арендой
+
+    Захват — условный UPDATE по числу попыток, которое растет при
+    каждом захвате: из двух воркеров, выбравших одну единицу, ее
+    получит только один, без блокировок на уровне базы.
+    """
+    now = timezone.now()
+    available = HarvestUnit.objects.filter(job=job, attempts__lt=max_attempts).filter(
+        Q(status='pending') | Q(status='leased', lease_expires_at__lt=now)
+    )
+    candidates = list(available.order_by('pk').values_list('pk', 'attempts')[:CLAIM_CANDIDATES])
+    random.shuffle(candidates)
+
+    for pk, attempts in candidates:
+        claimed = available.filter(pk=pk, attempts=attempts).update(
+            status='leased',
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return HarvestUnit.objects.get(pk=pk)
+    return None
+
+
+def _owned(unit: HarvestUnit, owner: str):
+    return HarvestUnit.objects.filter(pk=unit.pk, status='leased', lease_owner=owner)
+
+
+def complete(unit: HarvestUnit, owner: str, result: Dict) -> bool:
+    """Отметка о выполнении (только если аренда все еще у этого воркера)"""
+    return bool(_owned(unit, owner).update(
+        status='done', lease_expires_at=None, finished_at=timezone.now(), error='',
+        fetched=result['fetched'], created=result['created'], updated=result['updated'],
+    ))
+
+
+def release(unit: HarvestUnit, owner: str, error: str, max_attempts: int) -> bool:
+    """Возврат единицы в очередь после ошибки (или в ошибки, если попытки кончились)"""
+    status = 'failed' if unit.attempts >= max_attempts else 'pending'
+    return bool(_owned(unit, owner).update(
+        status=status, lease_owner='', lease_expires_at=None, error=error[:1000],
+    ))
+
+
+class Heartbeat(threading.Thread):
+    """Продление аренды, пока воркер обрабатывает единицу"""
+
+    def __init__(self, unit: HarvestUnit, owner: str, lease_seconds: int):
+        super().__init__(name=f'harvest-heartbeat-{unit.pk}', daemon=True)
+        self.unit = unit
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.lease_seconds / 3):
+                extended = _owned(self.unit, self.owner).update(
+                    lease_expires_at=timezone.now() + timedelta(seconds=self.lease_seconds)
+                )
+                if not extended:
+                    # Аренду забрал другой воркер: результат этого уже не засчитается
+                    self.lost = True
+                    return
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def process_unit(unit: HarvestUnit, service: HHApiService, workers: int = 1) -> Dict:
+    """Загрузка одной страницы поиска и сохранение ее вакансий"""
+    data = service.search_vacancies({**unit.params, 'page': unit.page})
+    if data.get('error'):
+        raise RuntimeError(f"Ошибка HH API: {data['error']}")
+
+    vacancy_ids = [item['id'] for item in data.get('items', []) if item.get('id')]
+    results = service.fetch_vacancies(vacancy_ids, workers=workers)
+    batch = service.save_batch([details for _, _, details in results if details])
+    # Вакансию, снятую с публикации (404), загружать нечего; а после ошибки
+    # запроса единица возвращается в очередь, и страница загружается снова
+    # (сохраненные вакансии при повторе не перезаписываются)
+    failed = [str(vacancy_id) for vacancy_id, status, _ in results if status == 'error']
+    if failed:
+        raise RuntimeError(f"Не загружены детали {len(failed)} вакансий: {', '.join(failed)}")
+    return {
+        'fetched': len(vacancy_ids),
+        'created': batch['created'],
+        'updated': batch['updated'],
+        'errors': batch['errors'],
+    }
+
+
+def job_status(job: str) -> Dict:
+    """Сводка по заданию: единицы по статусам и итоги загрузки"""
+    status = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+    units = HarvestUnit.objects.filter(job=job)
+    for row in units.values('status').annotate(count=Count('pk')):
+        status[row['status']] = row['count']
+    totals = units.aggregate(fetched=Sum('fetched'), created=Sum('created'), updated=Sum('updated'))
+    status.update({key: value or 0 for key, value in totals.items()})
+    status['total'] = status['pending'] + status['leased'] + status['done'] + status['failed']
+    return status
+
+
+def run_worker(job: str, owner: str = None, workers: int = 1, rate: float = None,
+               lease_seconds: int = None, max_attempts: int = None, poll_interval: float = 5.0,
+               progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Цикл воркера: захват, обработка и отметка единиц задания
+
+    Воркер завершается, когда в задании не остается ни свободных
+    единиц, ни единиц в работе у других воркеров: пока они есть, он
+    ждет и подхватывает единицы, чья аренда истекла.
+    """
+    owner = owner or default_owner()
+    lease_seconds = lease_seconds or settings.HARVEST_LEASE_SECONDS
+    max_attempts = max_attempts or settings.HARVEST_MAX_ATTEMPTS
+    service = HHApiService(budget=RequestBudget(rate) if rate else None)
+
+    stats = {'owner': owner, 'units': 0, 'lost': 0, 'failed': 0,
+             'fetched': 0, 'created': 0, 'updated': 0, 'errors': [], 'elapsed': 0.0, 'rate': 0.0}
+    started = time.monotonic()
+
+    while True:
+        reap_expired(job, max_attempts)
+        unit = claim(job, owner, lease_seconds, max_attempts)
+        if unit is None:
+            if not HarvestUnit.objects.filter(job=job, status__in=['pending', 'leased']).exists():
+                break
+            time.sleep(poll_interval)
+            continue
+
+        heartbeat = Heartbeat(unit, owner, lease_seconds)
+        heartbeat.start()
+        try:
+            result = process_unit(unit, service, workers=workers)
+        except Exception as e:
+            heartbeat.stop()
+            release(unit, owner, str(e), max_attempts)
+            stats['failed'] += 1
+            stats['errors'].append(f"{unit}: {e}")
+            continue
+        heartbeat.stop()
+
+        if heartbeat.lost or not complete(unit, owner, result):
+            # Единицу уже перезахватили; вакансии сохранены (upsert), но не засчитываем их дважды
+            stats['lost'] += 1
+        else:
+            stats['units'] += 1
+            stats['fetched'] += result['fetched']
+            stats['created'] += result['created']
+            stats['updated'] += result['updated']
+        stats['errors'].extend(result['errors'])
+
+        if result['created'] or result['updated']:
+            # Сбрасываем кэш страниц и API: данные изменились
+            bump_data_version()
+
+        stats['elapsed'] = time.monotonic() - started
+        stats['rate'] = stats['fetched'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        if progress:
+            progress(stats)
+
+    stats['elapsed'] = time.monotonic() - started
+    stats['rate'] = stats['fetched'] / stats['elapsed'] if stats['elapsed'] else 0.0
+    return stats
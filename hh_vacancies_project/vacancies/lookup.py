@@ -0,0 +1,99 @@
+from dataclasses import asdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Vacancy
+from .records import parse_vacancy
+from .services import HHApiService, RequestBudget
+
+# Общий лимит запросов к HH для всех запросов к /api/vacancies/lookup/ в процессе
+_budget = RequestBudget(settings.HH_REQUESTS_PER_SECOND)
+
+# Метка «вакансии нет на HH» в кэше (None означает отсутствие ключа)
+NOT_FOUND = 'not_found'
+
+
+def _cache_key(hh_id: int) -> str:
+    return f'hh:vacancy:{hh_id}'
+
+
+def _fetch_upstream(hh_ids: List[int]) -> Dict[int, Dict]:
+    """Параллельная загрузка недостающих вакансий с HH с кэшированием
+
+    Отсутствие кэшируется только для подтвержденного ответа 404: после
+    таймаута или ошибки HH вакансия запрашивается снова при следующем вызове.
+    """
+    service = HHApiService(budget=_budget)
+    fetched, not_found = {}, []
+    for hh_id, status, details in service.fetch_vacancies(hh_ids, workers=settings.SYNC_WORKERS):
+        if status == 'not_found':
+            not_found.append(hh_id)
+        if details is None:
+            continue
+        try:
+            record = parse_vacancy(details)
+        except (KeyError, TypeError, ValueError):
+            continue
+        fetched[record.hh_id] = asdict(record)
+
+    cache.set_many(
+        {_cache_key(hh_id): fetched[hh_id] for hh_id in fetched},
+        settings.LOOKUP_CACHE_TIMEOUT
+    )
+    cache.set_many(
+        {_cache_key(hh_id): NOT_FOUND for hh_id in not_found},
+        settings.LOOKUP_NOT_FOUND_TIMEOUT
+    )
+    return fetched
+
+
+def lookup_vacancies(hh_ids: List[int], fields: List[str], remote: bool = True) -> Dict:
+    """Вакансии по списку hh_id: из базы одним запросом, недостающие — с HH
+
+    Загруженные с HH вакансии в базу не сохраняются, а кэшируются на
+    LOOKUP_CACHE_TIMEOUT секунд (отсутствующие на HH — на
+    LOOKUP_NOT_FOUND_TIMEOUT). Порядок результата совпадает с порядком hh_ids.
+    """
+    hh_ids = list(dict.fromkeys(hh_ids))
+    found = {}
+    sources = {'local': 0, 'cache': 0, 'upstream': 0}
+
+    for row in Vacancy.objects.filter(hh_id__in=hh_ids).values('hh_id', *fields):
+        found[row['hh_id']] = (row, 'local')
+    sources['local'] = len(found)
+
+    missing = [hh_id for hh_id in hh_ids if hh_id not in found]
+    not_found = set()
+    if missing:
+        cached = cache.get_many([_cache_key(hh_id) for hh_id in missing])
+        for hh_id in missing:
+            value = cached.get(_cache_key(hh_id))
+            if value == NOT_FOUND:
+                not_found.add(hh_id)
+            elif value is not None:
+                found[hh_id] = (value, 'cache')
+                sources['cache'] += 1
+
+    missing = [hh_id for hh_id in missing if hh_id not in found and hh_id not in not_found]
+    if missing and remote:
+        for hh_id, data in _fetch_upstream(missing).items():
+            found[hh_id] = (data, 'upstream')
+            sources['upstream'] += 1
+
+    items = []
+    for hh_id in hh_ids:
+        if hh_id in found:
+            data, source = found[hh_id]
+            item = {field: data.get(field) for field in fields}
+            item['hh_id'] = hh_id
+            item['source'] = source
+            items.append(item)
+
+    return {
+        'items': items,
+        'count': len(items),
+        'missing': [hh_id for hh_id in hh_ids if hh_id not in found],
+        'sources': sources,
+    }
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from vacancies import changes, retention
+from vacancies.cache import bump_data_version
+from vacancies.models import Vacancy
+
+
+class Command(BaseCommand):
+    """Архивирование закрытых и устаревших вакансий"""
+    help = "Переносит закрытые на HH и старые вакансии в архив и сжимает базу"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age-days', type=int, default=settings.VACANCY_MAX_AGE_DAYS,
+                            help="Архивировать вакансии старше N дней")
+        parser.add_argument('--check-hh', action='store_true',
+                            help="Проверить на HH, не закрыты ли вакансии (флаг archived)")
+        parser.add_argument('--check-limit', type=int, default=500,
+                            help="Сколько вакансий проверять на HH за запуск (давно не проверявшиеся первыми)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Сколько вакансий переносить за одну транзакцию")
+        parser.add_argument('--changes-days', type=int, default=settings.CHANGES_RETENTION_DAYS,
+                            help="Удалять из журнала изменений записи старше N дней")
+        parser.add_argument('--no-vacuum', action='store_true',
+                            help="Не запускать сжатие базы после архивирования")
+        parser.add_argument('--full-vacuum', action='store_true',
+                            help="SQLite: перевести базу в режим auto_vacuum=INCREMENTAL (полный VACUUM)")
+
+    def handle(self, *args, **options):
+        total = 0
+
+        if options['check_hh']:
+            closed, checked = retention.closed_on_hh(retention.check_candidates(options['check_limit']))
+            retention.mark_checked(checked)
+            count = retention.archive(Vacancy.objects.filter(hh_id__in=closed), 'archived', options['batch_size'])
+            self.stdout.write(f"Закрыто на HH: {count}")
+            total += count
+
+        count = retention.archive(
+            retention.expired_vacancies(options['max_age_days']), 'expired', options['batch_size']
+        )
+        self.stdout.write(f"Старше {options['max_age_days']} дней: {count}")
+        total += count
+
+        if total:
+            bump_data_version()
+
+        pruned = changes.prune(options['changes_days'])
+        if pruned:
+            self.stdout.write(f"Из журнала изменений удалено записей: {pruned}")
+
+        if not options['no_vacuum']:
+            stats = retention.compact(full=options['full_vacuum'])
+            if stats:
+                self.stdout.write(
+                    f"Свободных страниц: {stats['free_pages_before']} → {stats['free_pages_after']}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"В архив перенесено {total} вакансий"))
@@ -0,0 +1,52 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from vacancies.sanitizer import process_description
+
+
+def make_description(index: int) -> str:
+    """Описание в стиле HH: абзацы, списки, выделение, ~4 КБ"""
+    items = ''.join(
+        f'<li>Опыт работы с <strong>технологией {index}-{item}</strong> &mdash; от 2 лет</li>'
+        for item in range(12)
+    )
+    return (
+        f'<p><strong>Компания {index}</strong> ищет разработчика в команду.</p>'
+        f'<p style="margin:0">Обязанности:</p><ul>{items}</ul>'
+        f'<p>Требования:</p><ol>{items}</ol>'
+        f'<p><em>Условия:</em> удаленная работа, ДМС, <a href="https://hh.ru/employer/{index}" '
+        f'onclick="track()">сайт компании</a>.</p><script>track({index})</script>'
+    )
+
+
+class Command(BaseCommand):
+    """Замер скорости очистки описаний: последовательно и в пуле процессов"""
+    help = "Бенчмарк очистки HTML описаний вакансий"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=5000, help="Количество описаний")
+        parser.add_argument('--workers', type=int, nargs='+',
+                            default=sorted({1, 2, os.cpu_count() or 1}),
+                            help="Число процессов для замеров")
+
+    def handle(self, *args, **options):
+        documents = [make_description(index) for index in range(options['count'])]
+        total_mb = sum(len(document.encode('utf-8')) for document in documents) / 1024 / 1024
+        self.stdout.write(f"{len(documents)} описаний, {total_mb:.1f} МБ HTML")
+
+        for workers in options['workers']:
+            started = time.perf_counter()
+            if workers == 1:
+                results = [process_description(document) for document in documents]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(process_description, documents, chunksize=64))
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"workers={workers}: {elapsed:.2f} с, "
+                f"{len(results) / elapsed:,.0f} описаний/с, {total_mb / elapsed:.1f} МБ/с"
+            )
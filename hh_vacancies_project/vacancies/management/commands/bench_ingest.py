@@ -0,0 +1,101 @@
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from vacancies import records
+
+DESCRIPTION = ('<p>Описание вакансии</p>', 'Описание вакансии')
+
+
+def make_payload(index: int) -> bytes:
+    """Детали вакансии в формате ответа HH API"""
+    return json.dumps({
+        'id': str(1000000 + index),
+        'name': f'Python разработчик {index}',
+        'area': {'id': '1', 'name': 'Москва', 'url': 'https://api.hh.ru/areas/1'},
+        'salary': {'from': 150000 + index % 1000, 'to': 250000, 'currency': 'RUR', 'gross': False},
+        'employer': {'id': str(index % 5000), 'name': f'Компания {index % 5000}',
+                     'alternate_url': f'https://hh.ru/employer/{index % 5000}'},
+        'description': DESCRIPTION[0],
+        'key_skills': [{'name': name} for name in ('Python', 'Django', 'PostgreSQL', 'Docker', 'Git')],
+        'experience': {'id': 'between1And3', 'name': 'От 1 года до 3 лет'},
+        'employment': {'id': 'full', 'name': 'Полная занятость'},
+        'schedule': {'id': 'remote', 'name': 'Удаленная работа'},
+        'alternate_url': f'https://hh.ru/vacancy/{1000000 + index}',
+        'published_at': '2024-05-01T10:00:00+0300',
+        'archived': False,
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def as_dict(data):
+    """Прежнее представление: словарь с цепочками .get(...).get(...)"""
+    salary = data.get('salary')
+    return {
+        'hh_id': data['id'],
+        'name': data.get('name', '')[:200],
+        'area': data.get('area', {}).get('name', 'Не указано')[:100],
+        'salary_from': salary.get('from') if salary else None,
+        'salary_to': salary.get('to') if salary else None,
+        'currency': salary.get('currency', 'RUR') if salary else None,
+        'employer_name': data.get('employer', {}).get('name', '')[:200],
+        'employer_url': data.get('employer', {}).get('alternate_url', ''),
+        'description': DESCRIPTION[0],
+        'description_text': DESCRIPTION[1],
+        'key_skills': ', '.join([skill['name'] for skill in data.get('key_skills', [])])[:500],
+        'experience': data.get('experience', {}).get('name', 'Не указано')[:100],
+        'employment': data.get('employment', {}).get('name', 'Не указано')[:100],
+        'schedule': data.get('schedule', {}).get('name', 'Не указано')[:100],
+        'alternate_url': data.get('alternate_url', ''),
+        'published_at': records._published_at(data.get('published_at')),
+    }
+
+
+def measure(function):
+    """Время выполнения (без tracemalloc) и память, которую занимает результат (МБ)"""
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    del result
+
+    tracemalloc.start()
+    result = function()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current / 1024 / 1024, result
+
+
+class Command(BaseCommand):
+    """Микробенчмарк разбора деталей вакансий: json/orjson, dict/VacancyRecord"""
+    help = "Бенчмарк скорости и памяти разбора ответов HH API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000, help="Количество вакансий")
+
+    def handle(self, *args, **options):
+        count = options['count']
+        payloads = [make_payload(index) for index in range(count)]
+        size_mb = sum(len(payload) for payload in payloads) / 1024 / 1024
+        self.stdout.write(f"{count} вакансий, {size_mb:.1f} МБ JSON")
+
+        loaders = [('json', json.loads)]
+        if records.orjson is not None:
+            loaders.append(('orjson', records.orjson.loads))
+        else:
+            self.stdout.write("orjson не установлен, замер только для json")
+
+        parsed = None
+        for name, loader in loaders:
+            elapsed, _, parsed = measure(lambda: [loader(payload) for payload in payloads])
+            self.stdout.write(f"{name + '.loads':<16} {count / elapsed:>10,.0f} вак./с")
+
+        for name, build in (
+            ('dict', lambda data: as_dict(data)),
+            ('VacancyRecord', lambda data: records.parse_vacancy(data, DESCRIPTION)),
+        ):
+            elapsed, memory, _ = measure(lambda: [build(data) for data in parsed])
+            self.stdout.write(
+                f"{name:<16} {count / elapsed:>10,.0f} вак./с, "
+                f"{memory:.1f} МБ ({memory * 100000 / count:.1f} МБ на 100 тыс.)"
+            )
@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from vacancies.matching import MatchIndex
+
+
+def synthetic_index(count: int, vocabulary: int, skills_per_vacancy: int, seed: int = 1) -> MatchIndex:
+    """Индекс по синтетическим вакансиям: популярность навыков по закону Ципфа"""
+    random = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, vocabulary + 1)
+    popularity /= popularity.sum()
+
+    skill_ids = random.choice(vocabulary, size=count * skills_per_vacancy, p=popularity).astype(np.int32)
+    vacancy_index = np.repeat(np.arange(count, dtype=np.int32), skills_per_vacancy)
+    # Повторы навыка в одной вакансии убираем, как в таблице связей
+    pairs = np.unique(vacancy_index.astype(np.int64) * vocabulary + skill_ids)
+    vacancy_index, skill_ids = (pairs // vocabulary).astype(np.int32), (pairs % vocabulary).astype(np.int32)
+
+    salaries = random.integers(0, 400, size=count, dtype=np.int32) * 1000
+    return MatchIndex(
+        np.arange(1, count + 1, dtype=np.int64),
+        salaries,
+        salaries + 50000,
+        random.integers(1, 200, size=count, dtype=np.int32),
+        skill_ids,
+        vacancy_index,
+    )
+
+
+class Command(BaseCommand):
+    """Замер подбора по навыкам на синтетическом индексе (без базы)"""
+    help = "Бенчмарк поиска top-k вакансий по навыкам"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000000, help="Количество вакансий")
+        parser.add_argument('--vocabulary', type=int, default=5000, help="Количество разных навыков")
+        parser.add_argument('--skills', type=int, default=6, help="Навыков в вакансии")
+        parser.add_argument('--queries', type=int, default=50, help="Количество запросов")
+        parser.add_argument('--limit', type=int, default=20, help="Сколько вакансий возвращать")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = synthetic_index(options['count'], options['vocabulary'], options['skills'])
+        self.stdout.write(f"Индекс: {len(index):,} вакансий, построен за {time.perf_counter() - started:.1f} с")
+
+        random = np.random.default_rng(2)
+        for label, constraints in (
+            ('только навыки', {}),
+            ('+ зарплата и регион', {'salary_min': 150000, 'area_ids': list(range(1, 40))}),
+        ):
+            timings = []
+            for _ in range(options['queries']):
+                # Запрос: пара популярных навыков и несколько случайных
+                skills = list(random.integers(0, 20, size=2)) + list(random.integers(0, options['vocabulary'], size=4))
+                started = time.perf_counter()
+                index.search([int(skill) for skill in skills], options['limit'], **constraints)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"{label:<22} p50 {np.percentile(timings, 50):6.1f} мс, "
+                f"p95 {np.percentile(timings, 95):6.1f} мс, max {max(timings):6.1f} мс"
+            )
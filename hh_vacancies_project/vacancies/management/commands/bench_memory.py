@@ -0,0 +1,139 @@
+import gc
+import sys
+import time
+from typing import Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows: нет ни resource, ни /proc
+    resource = None
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from vacancies.db import chunked, delete_in_batches
+from vacancies.models import Vacancy
+
+# Синтетические вакансии получают отрицательные hh_id, чтобы не пересечься с HH
+DESCRIPTION = 'Python, Django, PostgreSQL. ' * 80
+
+
+def populate(start: int, stop: int, batch_size: int = 1000):
+    """Добавление синтетических вакансий с номерами [start, stop)"""
+    now = timezone.now()
+    for offset in range(start, stop, batch_size):
+        Vacancy.objects.bulk_create([
+            Vacancy(
+                hh_id=-(index + 1),
+                name=f'Разработчик {index}',
+                area='Москва',
+                employer_name=f'Компания {index % 500}',
+                description=DESCRIPTION,
+                description_text=DESCRIPTION,
+                key_skills='Python, Django, SQL',
+                experience='От 1 года до 3 лет',
+                employment='Полная занятость',
+                schedule='Удаленная работа',
+                alternate_url='https://hh.ru/',
+                published_at=now,
+                is_duplicate=True,
+            )
+            for index in range(offset, min(offset + batch_size, stop))
+        ])
+
+
+def _status_kb(name: str) -> Optional[int]:
+    """Поле VmRSS/VmHWM из /proc/self/status (кБ) или None вне Linux"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(name + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _max_rss_kb() -> int:
+    if resource is None:
+        return 0
+    # ru_maxrss: на Linux в килобайтах, на macOS в байтах
+    value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return value // 1024 if sys.platform == 'darwin' else value
+
+
+def _reset_peak() -> bool:
+    """Сброс пика RSS процесса (VmHWM) записью «5» в /proc/self/clear_refs (Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def measure(function):
+    """Пиковый прирост RSS процесса (МБ) и время выполнения
+
+    Считается именно резидентная память процесса, а не только объекты
+    Python: буферы драйвера базы и фрагментация кучи тоже видны. На
+    Linux пик сбрасывается перед замером (VmHWM); без этого
+    используется ru_maxrss, и прирост виден, только если замер
+    превысил все предыдущие пики процесса.
+    """
+    gc.collect()
+    before = _status_kb('VmRSS') or _max_rss_kb()
+    reset = _reset_peak()
+    baseline = before if reset else _max_rss_kb()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    peak = (_status_kb('VmHWM') if reset else None) or _max_rss_kb()
+    return max(peak - baseline, 0) / 1024, elapsed, result
+
+
+class Command(BaseCommand):
+    """Замер памяти: полная загрузка queryset против итерации пачками
+
+    Таблица постепенно наполняется синтетическими вакансиями; для каждого
+    размера меряется пиковый прирост RSS процесса при обходе. После замеров синтетические
+    строки удаляются пачками.
+    """
+    help = "Бенчмарк памяти при обходе и удалении больших queryset"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000],
+                            help="Размеры таблицы для замеров")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Размер пачки")
+        parser.add_argument('--skip-naive', action='store_true',
+                            help="Не замерять полную загрузку (на больших размерах она съедает память)")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        synthetic = Vacancy.objects.filter(hh_id__lt=0)
+        if synthetic.exists():
+            self.stdout.write("Удаляем синтетические вакансии от прошлого запуска")
+            delete_in_batches(synthetic, chunk_size)
+
+        def naive():
+            return sum(len(vacancy.key_skills) for vacancy in list(synthetic.all()))
+
+        def batched():
+            return sum(len(vacancy.key_skills) for chunk in chunked(synthetic, chunk_size) for vacancy in chunk)
+
+        populated = 0
+        for size in sorted(options['sizes']):
+            populate(populated, size)
+            populated = size
+
+            line = f"{size:>8} строк: "
+            if not options['skip_naive']:
+                peak, elapsed, _ = measure(naive)
+                line += f"list(queryset) +{peak:7.1f} МБ RSS за {elapsed:.2f} с; "
+            peak, elapsed, _ = measure(batched)
+            line += f"chunked() +{peak:7.1f} МБ RSS за {elapsed:.2f} с"
+            self.stdout.write(line)
+
+        peak, elapsed, deleted = measure(lambda: delete_in_batches(synthetic, chunk_size))
+        self.stdout.write(f"delete_in_batches(): {deleted} строк, +{peak:.1f} МБ RSS за {elapsed:.2f} с")
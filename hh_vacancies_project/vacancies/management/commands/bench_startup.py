@@ -0,0 +1,89 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Выполняется в отдельном процессе: загрузка WSGI-приложения и первые запросы к нему
+CHILD_SCRIPT = r"""
+import json, sys, time
+from io import BytesIO
+
+started = time.perf_counter()
+from hh_vacancies_project.wsgi import application
+startup = time.perf_counter() - started
+
+
+def call(path):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+    }
+    statuses = []
+    started = time.perf_counter()
+    b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    return (time.perf_counter() - started) * 1000, statuses[0]
+
+
+result = {'startup': startup * 1000, 'first': {}, 'second': {}}
+for path in sys.argv[1:]:
+    result['first'][path], result.setdefault('status', {})[path] = call(path)
+    result['second'][path], _ = call(path)
+print(json.dumps(result))
+"""
+
+PROFILES = [
+    ('development', {'DJANGO_PROFILE': 'development', 'WARMUP_ON_STARTUP': '0'}),
+    ('production', {'DJANGO_PROFILE': 'production', 'WARMUP_ON_STARTUP': '0'}),
+    ('production + прогрев', {'DJANGO_PROFILE': 'production', 'WARMUP_ON_STARTUP': '1'}),
+]
+
+
+class Command(BaseCommand):
+    """Замер холодного старта и первых запросов в отдельных процессах"""
+    help = "Бенчмарк запуска процесса и задержки первого запроса по профилям"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help="Запусков процесса на профиль")
+        parser.add_argument('--urls', nargs='+', default=['/', '/vacancies/', '/statistics/', '/api/stats/'],
+                            help="Адреса для первых запросов")
+
+    def handle(self, *args, **options):
+        for label, overrides in PROFILES:
+            # DEBUG задается профилем
+            env = {key: value for key, value in os.environ.items() if key != 'DEBUG'}
+            env.update(overrides, ALLOWED_HOSTS='localhost')
+            runs = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                completed = subprocess.run(
+                    [sys.executable, '-c', CHILD_SCRIPT, *options['urls']],
+                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+                )
+                elapsed = (time.perf_counter() - started) * 1000
+                if completed.returncode != 0:
+                    self.stderr.write(completed.stderr)
+                    return
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                result['process'] = elapsed
+                runs.append(result)
+
+            def median(getter):
+                return statistics.median(getter(run) for run in runs)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{label} (медиана {len(runs)} запусков)"))
+            self.stdout.write(
+                f"  процесс целиком {median(lambda run: run['process']):7.0f} мс, "
+                f"загрузка приложения {median(lambda run: run['startup']):7.0f} мс"
+            )
+            for url in options['urls']:
+                self.stdout.write(
+                    f"  {url:<16} первый {median(lambda run: run['first'][url]):7.1f} мс, "
+                    f"второй {median(lambda run: run['second'][url]):6.1f} мс "
+                    f"({runs[-1]['status'][url]})"
+                )
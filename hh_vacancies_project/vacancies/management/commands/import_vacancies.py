@@ -0,0 +1,99 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from vacancies import services
+from vacancies.harvest import harvest, PAGE_SIZE
+
+
+class Command(BaseCommand):
+    """Импорт вакансий без веб-формы (для cron и пакетной загрузки)
+
+    Пример: python manage.py import_vacancies --text python --area 1
+    --max-pages 20 --workers 8 --summary import.json
+    """
+    help = "Импортирует вакансии с HH API по всем страницам поиска"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--text', default='', help="Поисковый запрос")
+        parser.add_argument('--area', default='113', help="ID региона HH (по умолчанию вся Россия)")
+        parser.add_argument('--experience', help="Опыт: noExperience, between1And3, between3And6, moreThan6")
+        parser.add_argument('--employment', help="Тип занятости: full, part, project, volunteer, probation")
+        parser.add_argument('--schedule', help="График: fullDay, shift, flexible, remote, flyInFly")
+        parser.add_argument('--salary', type=int, help="Желаемая зарплата")
+        parser.add_argument('--only-with-salary', action='store_true', help="Только вакансии с зарплатой")
+        parser.add_argument('--order-by', default='relevance', help="Сортировка: relevance, publication_time, ...")
+        parser.add_argument('--date-from', help="Только вакансии, опубликованные после даты (ISO 8601)")
+        parser.add_argument('--per-page', type=int, default=PAGE_SIZE, help="Вакансий на странице поиска (до 100)")
+        parser.add_argument('--max-pages', type=int, help="Сколько страниц поиска обходить (HH отдает до 2000 вакансий)")
+        parser.add_argument('--limit', type=int, help="Сколько вакансий загрузить всего")
+        parser.add_argument('--workers', type=int, default=settings.SYNC_WORKERS,
+                            help="Сколько деталей вакансий загружать параллельно")
+        parser.add_argument('--rps', type=float, default=settings.HH_REQUESTS_PER_SECOND,
+                            help="Общий лимит запросов к HH API в секунду")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Сколько вакансий сохранять за одну транзакцию")
+        parser.add_argument('--summary', help="Файл для итогов в JSON ('-' — вывести в stdout)")
+
+    def handle(self, *args, **options):
+        services.use_process_pool()
+        search_params = {
+            'text': options['text'],
+            'area': options['area'],
+            'per_page': options['per_page'],
+            'only_with_salary': options['only_with_salary'],
+            'order_by': options['order_by'],
+        }
+        for name in ('experience', 'employment', 'schedule', 'salary', 'date_from'):
+            if options[name]:
+                search_params[name] = options[name]
+
+        stats = harvest(
+            search_params,
+            max_pages=options['max_pages'],
+            limit=options['limit'],
+            workers=options['workers'],
+            rate=options['rps'],
+            batch_size=options['batch_size'],
+            progress=self.show_progress,
+        )
+
+        summary = {
+            'success': stats['success'],
+            'params': stats['params'],
+            'found': stats['found'],
+            'pages': stats['pages'],
+            'fetched': stats['fetched'],
+            'created': stats['created'],
+            'updated': stats['updated'],
+            'missing': stats['missing'],
+            'errors': len(stats['errors']),
+            'error_samples': stats['errors'][:10],
+            'elapsed_seconds': round(stats['elapsed'], 2),
+            'vacancies_per_second': round(stats['rate'], 2),
+        }
+
+        if options['summary'] == '-':
+            self.stdout.write(json.dumps(summary, ensure_ascii=False, indent=2))
+        elif options['summary']:
+            with open(options['summary'], 'w', encoding='utf-8') as file:
+                json.dump(summary, file, ensure_ascii=False, indent=2)
+
+        message = (
+            f"Загружено {stats['fetched']} из {stats['found']}: новых {stats['created']}, "
+            f"обновлено {stats['updated']}, ошибок {len(stats['errors'])} "
+            f"за {timedelta(seconds=round(stats['elapsed']))}"
+        )
+        if not stats['success']:
+            # CommandError: сообщение в stderr и код выхода 1
+            raise CommandError(message)
+        self.stderr.write(self.style.SUCCESS(message))
+
+    def show_progress(self, stats):
+        eta = f"{timedelta(seconds=round(stats['eta']))}" if stats['eta'] is not None else '?'
+        self.stderr.write(
+            f"[{stats['fetched']}/{stats['target']}] {stats['rate']:.1f} вак./с, "
+            f"новых {stats['created']}, обновлено {stats['updated']}, осталось ~{eta}"
+        )
@@ -0,0 +1,80 @@
+import json
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from vacancies import harvest_queue
+from vacancies.models import HarvestUnit
+
+
+class Command(BaseCommand):
+    """Координатор распределенного импорта
+
+    Пример: python manage.py plan_harvest --job python-may --text python
+    --area 1 2 --days 30, затем на каждом хосте
+    python manage.py run_harvest_worker --job python-may
+    """
+    help = "Делит импорт на единицы (регион × интервал дат × страница) для воркеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', required=True, help="Имя задания")
+        parser.add_argument('--text', default='', help="Поисковый запрос")
+        parser.add_argument('--area', nargs='+', default=['113'], help="ID регионов HH")
+        parser.add_argument('--experience', help="Опыт: noExperience, between1And3, between3And6, moreThan6")
+        parser.add_argument('--employment', help="Тип занятости: full, part, project, volunteer, probation")
+        parser.add_argument('--schedule', help="График: fullDay, shift, flexible, remote, flyInFly")
+        parser.add_argument('--days', type=int, default=30, help="За сколько последних дней загружать вакансии")
+        parser.add_argument('--date-from', help="Начало периода (ISO 8601), вместо --days")
+        parser.add_argument('--date-to', help="Конец периода (ISO 8601), по умолчанию сейчас")
+        parser.add_argument('--slice-hours', type=int, default=24,
+                            help="Начальный размер интервала дат (делится, если вакансий больше 2000)")
+        parser.add_argument('--replace', action='store_true', help="Удалить прежние единицы задания")
+        parser.add_argument('--status', action='store_true', help="Показать состояние задания и выйти")
+
+    def handle(self, *args, **options):
+        job = options['job']
+        if options['status']:
+            self.stdout.write(json.dumps(harvest_queue.job_status(job), ensure_ascii=False, indent=2))
+            return
+
+        existing = HarvestUnit.objects.filter(job=job)
+        if existing.exists():
+            if not options['replace']:
+                raise CommandError(f"Задание {job} уже запланировано (--replace, чтобы спланировать заново)")
+            existing.delete()
+
+        date_to = self.parse_date(options['date_to']) if options['date_to'] else timezone.now()
+        if options['date_from']:
+            date_from = self.parse_date(options['date_from'])
+        else:
+            date_from = date_to - timedelta(days=options['days'])
+        if date_from >= date_to:
+            raise CommandError("Начало периода должно быть раньше конца")
+
+        search_params = {'text': options['text']}
+        for name in ('experience', 'employment', 'schedule'):
+            if options[name]:
+                search_params[name] = options[name]
+
+        stats = harvest_queue.plan(
+            job, search_params, options['area'], date_from.replace(microsecond=0), date_to.replace(microsecond=0),
+            slice_hours=options['slice_hours'],
+        )
+        for error in stats['errors']:
+            self.stderr.write(self.style.ERROR(error))
+
+        message = (
+            f"Задание {job}: {stats['units']} единиц, {stats['slices']} интервалов, "
+            f"найдено {stats['found']} вакансий"
+        )
+        if stats['truncated']:
+            message += f" (недоступно из-за лимита глубины HH: {stats['truncated']})"
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def parse_date(self, value):
+        try:
+            date = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Неверная дата: {value}")
+        return timezone.make_aware(date) if timezone.is_naive(date) else date
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from vacancies import dedup
+from vacancies.cache import bump_data_version
+
+
+class Command(BaseCommand):
+    """Пересчет кластеров дубликатов (MinHash/LSH) для всех вакансий"""
+    help = "Заново находит повторные публикации вакансий"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Сколько вакансий обрабатывать за раз")
+
+    def handle(self, *args, **options):
+        processed = dedup.rebuild(chunk_size=options['chunk_size'])
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(f"Кластеры пересчитаны для {processed} вакансий"))
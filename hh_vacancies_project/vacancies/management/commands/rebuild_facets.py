@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from vacancies import facets
+from vacancies.cache import bump_data_version
+
+
+class Command(BaseCommand):
+    """Полная перестройка индекса фасетов (FacetValue, Vacancy.facets)"""
+    help = "Перестраивает значения фасетов и списки вакансий по ним"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Сколько вакансий обрабатывать за раз")
+
+    def handle(self, *args, **options):
+        processed = facets.rebuild(chunk_size=options['chunk_size'])
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(f"Индекс фасетов построен по {processed} вакансиям"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from vacancies import rollups
+from vacancies.cache import bump_data_version
+
+
+class Command(BaseCommand):
+    """Полный пересчет агрегатов динамики (VacancyRollup)"""
+    help = "Пересчитывает дневные и недельные агрегаты по всем вакансиям"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Сколько вакансий обрабатывать за раз")
+
+    def handle(self, *args, **options):
+        processed = rollups.rebuild(chunk_size=options['chunk_size'])
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(f"Агрегаты пересчитаны по {processed} вакансиям"))
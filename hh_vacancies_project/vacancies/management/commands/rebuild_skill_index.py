@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from vacancies import skills
+from vacancies.cache import bump_data_version
+
+
+class Command(BaseCommand):
+    """Полная перестройка индекса навыков (Skill, SkillPair)"""
+    help = "Перестраивает справочник навыков и матрицу их совместной встречаемости"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Сколько вакансий обрабатывать за раз")
+
+    def handle(self, *args, **options):
+        processed = skills.rebuild(chunk_size=options['chunk_size'])
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(f"Индекс навыков построен по {processed} вакансиям"))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vacancies import batch_ops
+
+
+class Command(BaseCommand):
+    """Исполнитель массовых операций из админки
+
+    Выполняет операции в очереди и продолжает прерванные (процесс,
+    который их выполнял, перезапущен). Запускается из cron с --once
+    или работает постоянно, проверяя очередь раз в --poll-interval секунд.
+    """
+    help = "Выполняет и продолжает массовые операции над вакансиями"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Один проход по очереди и выход")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Сколько вакансий обрабатывать за одну транзакцию")
+        parser.add_argument('--poll-interval', type=int, default=10,
+                            help="Пауза между проверками очереди (сек.)")
+
+    def handle(self, *args, **options):
+        while True:
+            batch_ops.run_pending(options['batch_size'], progress=self.show_result)
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+    def show_result(self, operation):
+        message = f"№{operation.pk} {operation.get_action_display()}: обработано {operation.processed}"
+        if operation.status == 'failed':
+            self.stderr.write(self.style.ERROR(f"{message}, ошибка: {operation.error}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from vacancies import harvest_queue, services
+
+
+class Command(BaseCommand):
+    """Воркер распределенного импорта
+
+    Воркеры на разных хостах работают с одной базой и захватывают
+    единицы задания по очереди. --processes N запускает N воркеров на
+    этом хосте (отдельные процессы, у каждого свой лимит --rps).
+    """
+    help = "Загружает единицы задания, спланированного plan_harvest"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', required=True, help="Имя задания")
+        parser.add_argument('--processes', type=int, default=1, help="Сколько воркеров запустить на этом хосте")
+        parser.add_argument('--workers', type=int, default=settings.SYNC_WORKERS,
+                            help="Сколько деталей вакансий загружать параллельно в одном воркере")
+        parser.add_argument('--rps', type=float, default=settings.HH_REQUESTS_PER_SECOND,
+                            help="Лимит запросов к HH API в секунду на один воркер")
+        parser.add_argument('--lease', type=int, default=settings.HARVEST_LEASE_SECONDS,
+                            help="Срок аренды единицы (сек.)")
+        parser.add_argument('--max-attempts', type=int, default=settings.HARVEST_MAX_ATTEMPTS,
+                            help="Сколько раз пробовать загрузить единицу")
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help="Пауза, когда свободных единиц нет, но другие воркеры еще работают (сек.)")
+
+    def handle(self, *args, **options):
+        if options['processes'] > 1:
+            self.run_processes(options)
+            return
+
+        services.use_process_pool()
+        stats = harvest_queue.run_worker(
+            options['job'],
+            workers=options['workers'],
+            rate=options['rps'],
+            lease_seconds=options['lease'],
+            max_attempts=options['max_attempts'],
+            poll_interval=options['poll_interval'],
+            progress=self.show_progress,
+        )
+        for error in stats['errors'][:10]:
+            self.stderr.write(self.style.WARNING(error))
+        self.stderr.write(self.style.SUCCESS(
+            f"{stats['owner']}: единиц {stats['units']}, загружено {stats['fetched']} "
+            f"(новых {stats['created']}, обновлено {stats['updated']}), "
+            f"ошибок {stats['failed']}, перехвачено {stats['lost']}, {stats['rate']:.1f} вак./с"
+        ))
+
+    def run_processes(self, options):
+        # Через python -m django, а не sys.argv[0]: команду могли запустить
+        # и через manage.py, и через django-admin или python -m django
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'hh_vacancies_project.settings'),
+            'PYTHONPATH': os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.environ.get('PYTHONPATH')])),
+        }
+        command = [
+            sys.executable, '-m', 'django', 'run_harvest_worker',
+            '--job', options['job'],
+            '--workers', str(options['workers']),
+            '--rps', str(options['rps']),
+            '--lease', str(options['lease']),
+            '--max-attempts', str(options['max_attempts']),
+            '--poll-interval', str(options['poll_interval']),
+        ]
+        started = time.monotonic()
+        processes = [subprocess.Popen(command, env=env) for _ in range(options['processes'])]
+        codes = [process.wait() for process in processes]
+        elapsed = time.monotonic() - started
+
+        status = harvest_queue.job_status(options['job'])
+        status['elapsed_seconds'] = round(elapsed, 2)
+        status['vacancies_per_second'] = round(status['fetched'] / elapsed, 2) if elapsed else 0.0
+        self.stdout.write(json.dumps(status, ensure_ascii=False, indent=2))
+        if any(codes):
+            sys.exit(1)
+
+    def show_progress(self, stats):
+        self.stderr.write(
+            f"[{stats['owner']}] единиц {stats['units']}, загружено {stats['fetched']}, "
+            f"{stats['rate']:.1f} вак./с"
+        )
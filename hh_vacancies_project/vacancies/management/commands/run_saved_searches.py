@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from vacancies import sync
+
+
+class Command(BaseCommand):
+    """Планировщик сохраненных поисков
+
+    Запускается из cron с --once или работает постоянно, проверяя
+    раз в --poll-interval секунд, каким поискам пора обновиться.
+    """
+    help = "Синхронизирует сохраненные поиски с HH API по расписанию"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Один проход по подошедшим поискам и выход")
+        parser.add_argument('--workers', type=int, default=settings.SYNC_WORKERS,
+                            help="Сколько поисков выполнять параллельно")
+        parser.add_argument('--rps', type=float, default=settings.HH_REQUESTS_PER_SECOND,
+                            help="Общий лимит запросов к HH API в секунду")
+        parser.add_argument('--poll-interval', type=int, default=60,
+                            help="Пауза между проверками расписания (сек.)")
+
+    def handle(self, *args, **options):
+        while True:
+            for result in sync.run_due(workers=options['workers'], rate=options['rps']):
+                if result['error']:
+                    self.stderr.write(self.style.ERROR(f"{result['name']}: {result['error']}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{result['name']}: новых вакансий {result['count']}"))
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import requests
+
+from vacancies import areas
+from vacancies.cache import bump_data_version
+from vacancies.services import HHApiService
+
+
+class Command(BaseCommand):
+    """Загрузка справочника регионов HH и перестройка замыкания дерева
+
+    Справочник меняется редко, достаточно запускать из cron раз в сутки.
+    """
+    help = "Обновляет справочник регионов (Area, AreaClosure) из HH API"
+
+    def handle(self, *args, **options):
+        try:
+            tree = HHApiService().get_area_tree()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise CommandError(f"Не удалось загрузить регионы HH: {e}")
+
+        stats = areas.sync_tree(tree)
+        linked = areas.link_vacancies()
+        bump_data_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Регионов: {stats['areas']} (удалено {stats['removed']}), "
+            f"пар в замыкании: {stats['closure']}, привязано вакансий: {linked}"
+        ))
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Копирование основной SQLite-базы в файлы реплик
+
+    Используется для локальной проверки маршрутизации чтения на реплики:
+    настоящую репликацию заменяет онлайн-копирование через backup API.
+    """
+    help = "Копирует основную SQLite-базу во все реплики из DB_REPLICAS"
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if 'sqlite' not in primary['ENGINE']:
+            raise CommandError("Команда работает только с SQLite")
+        if not settings.REPLICA_DATABASES:
+            raise CommandError("Реплики не настроены (переменная DB_REPLICAS)")
+
+        source = sqlite3.connect(str(primary['NAME']))
+        try:
+            for alias in settings.REPLICA_DATABASES:
+                target_name = str(settings.DATABASES[alias]['NAME'])
+                target = sqlite3.connect(target_name)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f"{alias}: скопировано в {target_name}"))
+        finally:
+            source.close()
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from vacancies import warmup
+
+STEP_LABELS = {
+    'modules': "Представления и зависимости",
+    'templates': "Шаблоны",
+    'data': "Справочные данные и счетчики",
+    'match_index': "Индекс подбора по навыкам",
+}
+
+
+class Command(BaseCommand):
+    """Прогрев: импорт модулей, компиляция шаблонов, заполнение кэша"""
+    help = "Предзагружает шаблоны, справочные данные и кэш (например, после деплоя)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-templates', action='store_true', help="Не компилировать шаблоны")
+        parser.add_argument('--no-data', action='store_true', help="Не заполнять кэш данными")
+        parser.add_argument('--match-index', action='store_true', help="Построить индекс подбора по навыкам")
+
+    def handle(self, *args, **options):
+        def progress(name, count, seconds):
+            self.stdout.write(f"{STEP_LABELS[name]}: {count} за {seconds * 1000:.0f} мс")
+
+        timings = warmup.run(
+            templates=not options['no_templates'],
+            data=not options['no_data'],
+            match_index=options['match_index'],
+            progress=progress,
+        )
+        # Кэш общий (Redis, файлы) — прогрев из команды пригодится серверу; LocMemCache — нет
+        self.stdout.write(self.style.SUCCESS(f"Прогрев завершен за {sum(timings.values()) * 1000:.0f} мс"))
@@ -0,0 +1,256 @@
+import re
+import threading
+from array import array
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .cache import get_data_version
+from .models import Vacancy, Skill
+from . import areas
+
+# Разделители навыков во вставленном тексте
+SKILL_SPLIT_RE = re.compile(r'[,;\n\r\t]+')
+
+MAX_QUERY_SKILLS = 50
+
+
+def parse_skills(text: str) -> List[str]:
+    """Навыки из вставленного текста: через запятую, точку с запятой или с новой строки"""
+    seen, names = set(), []
+    for name in SKILL_SPLIT_RE.split(text or ''):
+        name = name.strip()
+        key = Skill.make_key(name)
+        if key and key not in seen:
+            seen.add(key)
+            names.append(name)
+    return names[:MAX_QUERY_SKILLS]
+
+
+class MatchIndex:
+    """Инвертированный индекс навыков в памяти процесса
+
+    Вакансии пронумерованы плотно (0..n-1) в порядке pk. Для каждого
+    навыка хранится отсортированный массив номеров вакансий (posting
+    list), для вакансий — массивы зарплат, региона и нормы вектора
+    навыков. Вес навыка — IDF: редкие навыки важнее частых. Название
+    региона хранится номером в списке area_names: по нему фильтруются
+    вакансии без привязки к справочнику.
+    """
+
+    def __init__(self, pks: np.ndarray, salary_from: np.ndarray, salary_to: np.ndarray,
+                 area_ids: np.ndarray, skill_ids: np.ndarray, vacancy_index: np.ndarray,
+                 area_codes: Optional[np.ndarray] = None, area_names: List[str] = ()):
+        self.pks = pks
+        self.salary_from = salary_from
+        self.salary_to = salary_to
+        self.area_ids = area_ids
+        self.area_codes = area_codes if area_codes is not None else np.full(len(pks), -1, dtype=np.int32)
+        self.area_names = list(area_names)
+        self.built_at = time.monotonic()
+
+        order = np.lexsort((vacancy_index, skill_ids))
+        skill_ids, vacancy_index = skill_ids[order], vacancy_index[order]
+        unique, starts, counts = np.unique(skill_ids, return_index=True, return_counts=True)
+        self.postings = {
+            int(skill_id): vacancy_index[start:start + count]
+            for skill_id, start, count in zip(unique, starts, counts)
+        }
+
+        size = max(len(pks), 1)
+        self.weights = {skill_id: float(np.log1p(size / len(posting))) for skill_id, posting in self.postings.items()}
+        squared = np.zeros(len(pks), dtype=np.float32)
+        for skill_id, posting in self.postings.items():
+            squared[posting] += self.weights[skill_id] ** 2
+        self.norms = np.sqrt(squared)
+
+    def __len__(self):
+        return len(self.pks)
+
+    @classmethod
+    def from_db(cls) -> 'MatchIndex':
+        """Построение индекса по вакансиям без дубликатов и таблице связей навыков"""
+        rows = Vacancy.objects.filter(is_duplicate=False).order_by('pk').values_list(
+            'pk', 'salary_from', 'salary_to', 'area_ref_id', 'area'
+        )
+        # array вместо list: миллион вакансий — мегабайты, а не сотни мегабайт объектов int
+        pks, salary_from, salary_to, area_ids = array('q'), array('i'), array('i'), array('i')
+        area_codes, area_names = array('i'), {}
+        for pk, low, high, area_id, area in rows.iterator(chunk_size=5000):
+            pks.append(pk)
+            salary_from.append(low or 0)
+            salary_to.append(high or 0)
+            area_ids.append(area_id or -1)
+            area_codes.append(area_names.setdefault(area, len(area_names)))
+        pks = np.frombuffer(pks, dtype=np.int64)
+
+        links = Vacancy.skills.through.objects.filter(vacancy__is_duplicate=False).values_list('skill_id', 'vacancy_id')
+        skill_ids, vacancy_pks = array('i'), array('q')
+        for skill_id, vacancy_id in links.iterator(chunk_size=20000):
+            skill_ids.append(skill_id)
+            vacancy_pks.append(vacancy_id)
+        vacancy_pks = np.frombuffer(vacancy_pks, dtype=np.int64)
+
+        # Связь могла появиться после чтения вакансий: такие пропускаем
+        positions = np.searchsorted(pks, vacancy_pks)
+        positions = np.minimum(positions, max(len(pks) - 1, 0))
+        known = pks[positions] == vacancy_pks if len(pks) else np.zeros(len(vacancy_pks), dtype=bool)
+
+        return cls(
+            pks,
+            np.array(salary_from, dtype=np.int32),
+            np.array(salary_to, dtype=np.int32),
+            np.array(area_ids, dtype=np.int32),
+            np.array(skill_ids, dtype=np.int32)[known],
+            positions[known].astype(np.int32),
+            np.array(area_codes, dtype=np.int32),
+            list(area_names),
+        )
+
+    def area_mask(self, candidates: np.ndarray, area_ids: List[int], area_name: str = '') -> np.ndarray:
+        """Кандидаты в регионах area_ids или, как в areas.area_q, без привязки к справочнику и с регионом area_name"""
+        mask = np.isin(self.area_ids[candidates], np.array(area_ids, dtype=np.int32))
+        if area_name:
+            needle = area_name.lower()
+            codes = [code for code, name in enumerate(self.area_names) if (name or '').lower() == needle]
+            mask |= (self.area_ids[candidates] == -1) & np.isin(self.area_codes[candidates], np.array(codes, dtype=np.int32))
+        return mask
+
+    def search(self, skill_ids: List[int], limit: int = 20, salary_min: Optional[int] = None,
+               area_ids: Optional[List[int]] = None, area_name: str = '') -> List[Dict]:
+        """Top-k вакансий по взвешенному совпадению навыков (косинусная мера)
+
+        Счет накапливается только по posting list навыков запроса,
+        ограничения по зарплате и региону применяются к кандидатам
+        векторно, лучшие k выбираются через argpartition.
+        """
+        skill_ids = [skill_id for skill_id in dict.fromkeys(skill_ids) if skill_id in self.postings]
+        if not skill_ids or not len(self.pks):
+            return []
+
+        scores = np.zeros(len(self.pks), dtype=np.float32)
+        for skill_id in skill_ids:
+            scores[self.postings[skill_id]] += self.weights[skill_id] ** 2
+        candidates = np.flatnonzero(scores)
+
+        if salary_min:
+            candidates = candidates[
+                (self.salary_from[candidates] >= salary_min) | (self.salary_to[candidates] >= salary_min)
+            ]
+        if area_ids is not None:
+            candidates = candidates[self.area_mask(candidates, area_ids, area_name)]
+        if not len(candidates):
+            return []
+
+        query_norm = np.sqrt(sum(self.weights[skill_id] ** 2 for skill_id in skill_ids))
+        candidate_scores = scores[candidates] / (self.norms[candidates] * query_norm)
+        if len(candidates) > limit:
+            top = np.argpartition(-candidate_scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-candidate_scores[top], kind='stable')]
+
+        results = []
+        for position in top:
+            index = candidates[position]
+            matched = [
+                skill_id for skill_id in skill_ids
+                if _contains(self.postings[skill_id], index)
+            ]
+            results.append({
+                'pk': int(self.pks[index]),
+                'score': round(float(candidate_scores[position]), 4),
+                'matched': matched,
+            })
+        return results
+
+
+def _contains(posting: np.ndarray, index: int) -> bool:
+    position = np.searchsorted(posting, index)
+    return position < len(posting) and posting[position] == index
+
+
+_index = None
+_index_version = None
+_building = False
+_lock = threading.Lock()
+
+
+def _rebuild(version):
+    """Построение нового индекса в фоновом потоке; до замены запросы читают старый"""
+    global _index, _index_version, _building
+    try:
+        index = MatchIndex.from_db()
+        with _lock:
+            _index, _index_version = index, version
+    except Exception as e:
+        print(f"Индекс подбора не перестроен: {e}")
+    finally:
+        with _lock:
+            _building = False
+        connection.close()
+
+
+def get_index() -> MatchIndex:
+    """Индекс процесса; перестраивается после импорта, но не чаще раза в MATCH_INDEX_MIN_AGE секунд
+
+    Только первый индекс строится в запросе. Устаревший индекс
+    перестраивается в фоновом потоке, а запросы тем временем
+    получают прежний.
+    """
+    global _index, _index_version, _building
+    version = get_data_version()
+    with _lock:
+        if _index is None:
+            _index, _index_version = MatchIndex.from_db(), version
+        elif (
+            _index_version != version and not _building
+            and time.monotonic() - _index.built_at >= settings.MATCH_INDEX_MIN_AGE
+        ):
+            _building = True
+            threading.Thread(target=_rebuild, args=(version,), name='match-index', daemon=True).start()
+        return _index
+
+
+def match(skills_text: str, limit: int = 20, salary_min: Optional[int] = None,
+          area: str = '', fields: List[str] = None) -> Dict:
+    """Подбор вакансий по вставленному списку навыков"""
+    started = time.perf_counter()
+    names = parse_skills(skills_text)
+    keys = {Skill.make_key(name): name for name in names}
+    known = {skill.key: skill for skill in Skill.objects.filter(key__in=keys)}
+
+    area = area.strip()
+    area_ids = areas.region_ids(area) if area else None
+    # Вакансии без привязки к справочнику ищутся по названию региона, как в areas.area_q
+    area_name = area if not area.isdigit() else ''
+    index = get_index()
+    results = index.search([skill.pk for skill in known.values()], limit, salary_min, area_ids, area_name)
+
+    names_by_id = {skill.pk: skill.name for skill in known.values()}
+    vacancies = {
+        row['pk']: row
+        for row in Vacancy.objects.filter(pk__in=[result['pk'] for result in results]).values('pk', *(fields or ['hh_id', 'name']))
+    }
+    items = []
+    for result in results:
+        vacancy = vacancies.get(result['pk'])
+        if vacancy is None:
+            continue
+        vacancy.pop('pk')
+        items.append({
+            'score': result['score'],
+            'matched_skills': [names_by_id[skill_id] for skill_id in result['matched']],
+            'vacancy': vacancy,
+        })
+
+    return {
+        'skills': [known[key].name for key in keys if key in known],
+        'unknown_skills': [name for key, name in keys.items() if key not in known],
+        'items': items,
+        'indexed': len(index),
+        'took_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -0,0 +1,39 @@
+from django.conf import settings
+
+from . import routers
+
+# Cookie, закрепляющая клиента за основной базой после записи
+PIN_COOKIE = 'db_primary_pin'
+
+
+class ReplicaRoutingMiddleware:
+    """Включает чтение с реплик для представлений из REPLICA_READ_VIEWS"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.begin_request(use_replica=False)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request()
+
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        use_replica = (
+            request.method in ('GET', 'HEAD')
+            and url_name in settings.REPLICA_READ_VIEWS
+            and PIN_COOKIE not in request.COOKIES
+        )
+        routers.begin_request(use_replica=use_replica)
+        return None
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+# Поля, по которым идет поиск подстроки (icontains)
+TRIGRAM_FIELDS = ['name', 'employer_name', 'key_skills', 'description']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """GIN-индексы pg_trgm для icontains-поиска (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS vacancies_vacancy_{field}_trgm '
+            f'ON vacancies_vacancy USING gin (UPPER("{field}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS vacancies_vacancy_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0002_remove_vacancy_response_count_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-19 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0003_postgres_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VacancyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'День'), ('week', 'Неделя')], max_length=10, verbose_name='Период')),
+                ('period_start', models.DateField(verbose_name='Начало периода')),
+                ('dimension', models.CharField(choices=[('skill', 'Навык'), ('area', 'Регион'), ('experience', 'Опыт'), ('employer', 'Работодатель')], max_length=20, verbose_name='Измерение')),
+                ('value', models.CharField(max_length=255, verbose_name='Значение')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество вакансий')),
+                ('salary_count', models.IntegerField(default=0, verbose_name='Вакансий с зарплатой')),
+                ('salary_sum', models.BigIntegerField(default=0, verbose_name='Сумма зарплат')),
+                ('salary_histogram', models.JSONField(default=dict, verbose_name='Гистограмма зарплат')),
+            ],
+            options={
+                'verbose_name': 'Агрегат статистики',
+                'verbose_name_plural': 'Агрегаты статистики',
+                'ordering': ['period_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='vacancyrollup',
+            index=models.Index(fields=['period', 'dimension', 'period_start'], name='rollup_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='vacancyrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'dimension', 'value', 'period_start'), name='unique_vacancy_rollup'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-19 03:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0004_vacancy_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Ключ (нижний регистр)')),
+                ('name', models.CharField(max_length=255, verbose_name='Навык')),
+                ('vacancy_count', models.IntegerField(default=0, verbose_name='Количество вакансий')),
+            ],
+            options={
+                'verbose_name': 'Навык',
+                'verbose_name_plural': 'Навыки',
+                'ordering': ['-vacancy_count'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SkillPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='Совместных вакансий')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vacancies.skill', verbose_name='Связанный навык')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pairs', to='vacancies.skill', verbose_name='Навык')),
+            ],
+            options={
+                'verbose_name': 'Пара навыков',
+                'verbose_name_plural': 'Пары навыков',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(fields=['-vacancy_count'], name='skill_vacancy_count_idx'),
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='skills',
+            field=models.ManyToManyField(blank=True, related_name='vacancies', to='vacancies.skill', verbose_name='Навыки'),
+        ),
+        migrations.AddIndex(
+            model_name='skillpair',
+            index=models.Index(fields=['skill', '-count'], name='skill_pair_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='skillpair',
+            constraint=models.UniqueConstraint(fields=('skill', 'related'), name='unique_skill_pair'),
+        ),
+    ]
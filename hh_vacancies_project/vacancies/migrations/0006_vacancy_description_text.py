@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-19 03:57
+
+from django.db import migrations, models
+
+from vacancies.sanitizer import process_description
+
+
+def sanitize_existing_descriptions(apps, schema_editor):
+    """Очистка HTML и заполнение текста у уже импортированных вакансий"""
+    Vacancy = apps.get_model('vacancies', 'Vacancy')
+    batch = []
+    for vacancy in Vacancy.objects.only('pk', 'description').iterator(chunk_size=1000):
+        vacancy.description, vacancy.description_text = process_description(vacancy.description)
+        batch.append(vacancy)
+        if len(batch) >= 1000:
+            Vacancy.objects.bulk_update(batch, ['description', 'description_text'])
+            batch = []
+    Vacancy.objects.bulk_update(batch, ['description', 'description_text'])
+
+
+def create_trigram_index(apps, schema_editor):
+    """Поиск теперь идет по тексту описания вместо HTML (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS vacancies_vacancy_description_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS vacancies_vacancy_description_text_trgm '
+        'ON vacancies_vacancy USING gin (UPPER("description_text"::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS vacancies_vacancy_description_text_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0005_skill_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='description_text',
+            field=models.TextField(blank=True, verbose_name='Описание (текст)'),
+        ),
+        migrations.RunPython(sanitize_existing_descriptions, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-19 03:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0006_vacancy_description_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='cluster_id',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True, verbose_name='Кластер дубликатов'),
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='is_duplicate',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Дубликат'),
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True, verbose_name='MinHash-сигнатура'),
+        ),
+        migrations.CreateModel(
+            name='LshBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.SmallIntegerField(verbose_name='Номер полосы')),
+                ('bucket_hash', models.BigIntegerField(verbose_name='Хэш полосы')),
+                ('vacancy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='vacancies.vacancy', verbose_name='Вакансия')),
+            ],
+            options={
+                'verbose_name': 'Корзина LSH',
+                'verbose_name_plural': 'Корзины LSH',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lshbucket',
+            index=models.Index(fields=['band', 'bucket_hash'], name='lsh_bucket_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-19 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0007_vacancy_dedup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Название')),
+                ('query', models.CharField(max_length=255, verbose_name='Поисковый запрос')),
+                ('area', models.CharField(default='113', max_length=20, verbose_name='Регион (ID на HH)')),
+                ('experience', models.CharField(blank=True, default='', max_length=50, verbose_name='Опыт (ID на HH)')),
+                ('employment', models.CharField(blank=True, default='', max_length=50, verbose_name='Занятость (ID на HH)')),
+                ('max_vacancies', models.IntegerField(default=100, verbose_name='Максимум вакансий за запуск')),
+                ('interval_minutes', models.IntegerField(default=60, verbose_name='Интервал запуска (мин.)')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активен')),
+                ('watermark', models.DateTimeField(blank=True, null=True, verbose_name='Загружено до')),
+                ('next_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Следующий запуск')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний запуск')),
+                ('last_status', models.CharField(blank=True, default='', max_length=255, verbose_name='Результат последнего запуска')),
+                ('last_count', models.IntegerField(default=0, verbose_name='Новых вакансий за последний запуск')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+            options={
+                'verbose_name': 'Сохраненный поиск',
+                'verbose_name_plural': 'Сохраненные поиски',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['is_active', 'next_run_at'], name='saved_search_due_idx'),
+        ),
+    ]
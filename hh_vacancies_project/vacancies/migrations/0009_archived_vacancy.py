@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-19 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0008_saved_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedVacancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hh_id', models.IntegerField(unique=True, verbose_name='ID вакансии на HH')),
+                ('name', models.CharField(max_length=255, verbose_name='Название вакансии')),
+                ('employer_name', models.CharField(max_length=255, verbose_name='Название работодателя')),
+                ('area', models.CharField(max_length=100, verbose_name='Регион')),
+                ('experience', models.CharField(blank=True, max_length=100, verbose_name='Требуемый опыт')),
+                ('salary_from', models.IntegerField(blank=True, null=True, verbose_name='Зарплата от')),
+                ('salary_to', models.IntegerField(blank=True, null=True, verbose_name='Зарплата до')),
+                ('currency', models.CharField(blank=True, max_length=10, null=True, verbose_name='Валюта')),
+                ('published_at', models.DateTimeField(verbose_name='Дата публикации')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата архивирования')),
+                ('reason', models.CharField(choices=[('archived', 'Закрыта на HH'), ('expired', 'Устарела'), ('manual', 'Вручную')], max_length=20, verbose_name='Причина')),
+                ('payload', models.BinaryField(verbose_name='Полная запись (zlib + JSON)')),
+            ],
+            options={
+                'verbose_name': 'Архивная вакансия',
+                'verbose_name_plural': 'Архив вакансий',
+                'ordering': ['-archived_at'],
+            },
+        ),
+    ]
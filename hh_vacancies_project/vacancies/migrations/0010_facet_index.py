@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-19 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0009_archived_vacancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('area', 'Регион'), ('experience', 'Опыт'), ('employment', 'Занятость'), ('schedule', 'График'), ('salary', 'Зарплата')], max_length=20, verbose_name='Фасет')),
+                ('value', models.CharField(max_length=100, verbose_name='Значение')),
+                ('vacancy_count', models.IntegerField(default=0, verbose_name='Количество вакансий')),
+            ],
+            options={
+                'verbose_name': 'Значение фасета',
+                'verbose_name_plural': 'Значения фасетов',
+                'ordering': ['facet', '-vacancy_count'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='facetvalue',
+            constraint=models.UniqueConstraint(fields=('facet', 'value'), name='unique_facet_value'),
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='facets',
+            field=models.ManyToManyField(blank=True, related_name='vacancies', to='vacancies.facetvalue', verbose_name='Значения фасетов'),
+        ),
+    ]
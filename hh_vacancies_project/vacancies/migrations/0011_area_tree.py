@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-19 04:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0010_facet_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Area',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID региона на HH')),
+                ('name', models.CharField(db_index=True, max_length=255, verbose_name='Название')),
+                ('depth', models.PositiveSmallIntegerField(default=0, verbose_name='Уровень вложенности')),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='vacancies.area', verbose_name='Родительский регион')),
+            ],
+            options={
+                'verbose_name': 'Регион',
+                'verbose_name_plural': 'Регионы',
+                'ordering': ['depth', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AreaClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(verbose_name='Расстояние')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='vacancies.area', verbose_name='Предок')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='vacancies.area', verbose_name='Потомок')),
+            ],
+            options={
+                'verbose_name': 'Связь регионов',
+                'verbose_name_plural': 'Замыкание дерева регионов',
+            },
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='area_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vacancies', to='vacancies.area', verbose_name='Регион (справочник HH)'),
+        ),
+        migrations.AddIndex(
+            model_name='areaclosure',
+            index=models.Index(fields=['descendant', 'ancestor'], name='area_closure_descendant_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='areaclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_area_closure'),
+        ),
+    ]
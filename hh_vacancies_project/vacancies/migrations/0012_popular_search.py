@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-19 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0011_area_tree'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=32, unique=True, verbose_name='Ключ (хэш запроса и фильтров)')),
+                ('kind', models.CharField(choices=[('search', 'Поиск'), ('import', 'Импорт')], default='search', max_length=10, verbose_name='Тип')),
+                ('query', models.CharField(max_length=255, verbose_name='Поисковый запрос')),
+                ('area', models.CharField(blank=True, default='', max_length=100, verbose_name='Регион')),
+                ('experience', models.CharField(blank=True, default='', max_length=50, verbose_name='Опыт')),
+                ('employment', models.CharField(blank=True, default='', max_length=50, verbose_name='Занятость')),
+                ('hit_count', models.IntegerField(default=0, verbose_name='Количество запросов')),
+                ('results_count', models.IntegerField(default=0, verbose_name='Результатов (последний раз)')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Первый запрос')),
+                ('last_seen', models.DateTimeField(db_index=True, verbose_name='Последний запрос')),
+            ],
+            options={
+                'verbose_name': 'Популярный запрос',
+                'verbose_name_plural': 'Популярные запросы',
+                'ordering': ['-hit_count'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='popularsearch',
+            index=models.Index(fields=['kind', '-hit_count'], name='popular_search_hits_idx'),
+        ),
+    ]
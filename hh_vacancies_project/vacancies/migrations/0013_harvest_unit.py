@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-19 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0012_popular_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HarvestUnit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(db_index=True, max_length=100, verbose_name='Задание')),
+                ('params', models.JSONField(default=dict, verbose_name='Параметры поиска HH')),
+                ('page', models.IntegerField(default=0, verbose_name='Страница')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('leased', 'В работе'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('lease_owner', models.CharField(blank=True, default='', max_length=100, verbose_name='Воркер')),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Аренда до')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Попыток')),
+                ('fetched', models.IntegerField(default=0, verbose_name='Загружено')),
+                ('created', models.IntegerField(default=0, verbose_name='Новых')),
+                ('updated', models.IntegerField(default=0, verbose_name='Обновлено')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+            ],
+            options={
+                'verbose_name': 'Единица импорта',
+                'verbose_name_plural': 'Единицы импорта',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='harvestunit',
+            index=models.Index(fields=['job', 'status', 'lease_expires_at'], name='harvest_unit_claim_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-19 04:22
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0013_harvest_unit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VacancyChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hh_id', models.IntegerField(blank=True, null=True, verbose_name='ID вакансии на HH')),
+                ('op', models.CharField(choices=[('insert', 'Добавлена'), ('update', 'Изменена'), ('delete', 'Удалена'), ('reset', 'База очищена')], max_length=10, verbose_name='Операция')),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение вакансии',
+                'verbose_name_plural': 'Изменения вакансий',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменена'),
+        ),
+        migrations.AlterField(
+            model_name='vacancy',
+            name='published_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата публикации'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-19 04:27
+
+from django.db import migrations, models
+
+
+def create_search_query_index(apps, schema_editor):
+    """GIN-индекс pg_trgm для поиска по истории запросов в админке (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS vacancies_searchquery_query_trgm '
+        'ON vacancies_searchquery USING gin (UPPER("query"::text) gin_trgm_ops)'
+    )
+
+
+def drop_search_query_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS vacancies_searchquery_query_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0014_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('archive', 'Архивирование'), ('delete', 'Удаление')], max_length=10, verbose_name='Действие')),
+                ('description', models.TextField(blank=True, default='', verbose_name='Условие отбора')),
+                ('user', models.CharField(blank=True, default='', max_length=150, verbose_name='Пользователь')),
+                ('status', models.CharField(choices=[('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='running', max_length=10, verbose_name='Статус')),
+                ('total', models.IntegerField(default=0, verbose_name='Примерно вакансий')),
+                ('processed', models.IntegerField(default=0, verbose_name='Обработано')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Запущена')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+            ],
+            options={
+                'verbose_name': 'Массовая операция',
+                'verbose_name_plural': 'Массовые операции',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='searchquery',
+            name='search_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата поиска'),
+        ),
+        migrations.RunPython(create_search_query_index, drop_search_query_index),
+    ]
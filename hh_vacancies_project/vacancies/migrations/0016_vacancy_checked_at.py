@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0015_admin_batch_operations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='checked_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Проверена на HH'),
+        ),
+    ]
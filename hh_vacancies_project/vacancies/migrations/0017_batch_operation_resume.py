@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0016_vacancy_checked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchoperation',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя пачка'),
+        ),
+        migrations.AddField(
+            model_name='batchoperation',
+            name='query',
+            field=models.BinaryField(null=True, verbose_name='Отбор (сериализованный запрос)'),
+        ),
+        migrations.AlterField(
+            model_name='batchoperation',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус'),
+        ),
+    ]
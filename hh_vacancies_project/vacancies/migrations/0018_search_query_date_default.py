@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-19 04:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacancies', '0017_batch_operation_resume'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchquery',
+            name='search_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата поиска'),
+        ),
+    ]
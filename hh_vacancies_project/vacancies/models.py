@@ -1,4 +1,9 @@
+import json
+import zlib
+from urllib.parse import urlencode
+
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -7,6 +12,10 @@ class Vacancy(models.Model):
     hh_id = models.IntegerField(unique=True, verbose_name="ID вакансии на HH")
     name = models.CharField(max_length=255, verbose_name="Название вакансии")
     area = models.CharField(max_length=100, verbose_name="Регион", default="Москва")
+    area_ref = models.ForeignKey(
+        'Area', null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='vacancies', verbose_name="Регион (справочник HH)"
+    )
     
     # Информация о зарплате
     salary_from = models.IntegerField(null=True, blank=True, verbose_name="Зарплата от")
@@ -19,7 +28,10 @@ class Vacancy(models.Model):
     
     # Описание
     description = models.TextField(verbose_name="Описание вакансии", blank=True)
+    description_text = models.TextField(verbose_name="Описание (текст)", blank=True)
     key_skills = models.TextField(verbose_name="Ключевые навыки", blank=True)
+    skills = models.ManyToManyField('Skill', related_name='vacancies', blank=True, verbose_name="Навыки")
+    facets = models.ManyToManyField('FacetValue', related_name='vacancies', blank=True, verbose_name="Значения фасетов")
     
     # Детали вакансии
     experience = models.CharField(max_length=100, verbose_name="Требуемый опыт", blank=True)
@@ -28,7 +40,15 @@ class Vacancy(models.Model):
     
     # Ссылки и даты
     alternate_url = models.URLField(verbose_name="Ссылка на вакансию на HH", blank=True)
-    published_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата публикации")
+    published_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Дата публикации")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Изменена")
+    # Когда вакансия последний раз проверялась на HH (archive_vacancies --check-hh)
+    checked_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Проверена на HH")
+    
+    # Поиск дубликатов (см. vacancies.dedup)
+    minhash = models.BinaryField(null=True, blank=True, editable=False, verbose_name="MinHash-сигнатура")
+    cluster_id = models.BigIntegerField(null=True, blank=True, db_index=True, verbose_name="Кластер дубликатов")
+    is_duplicate = models.BooleanField(default=False, db_index=True, verbose_name="Дубликат")
     
     class Meta:
         verbose_name = "Вакансия"
@@ -47,6 +67,156 @@ class Vacancy(models.Model):
         elif self.salary_to:
             return f"до {self.salary_to:,} {self.currency}"
         return "Не указана"
+    
+    def get_skills_list(self):
+        """Список ключевых навыков"""
+        return [skill.strip() for skill in self.key_skills.split(',') if skill.strip()]
+    
+    def get_salary_value(self):
+        """Зарплата в рублях одним числом (середина вилки) или None"""
+        if self.currency not in ('RUR', 'RUB'):
+            return None
+        if self.salary_from and self.salary_to:
+            return (self.salary_from + self.salary_to) // 2
+        return self.salary_from or self.salary_to
+
+
+class Skill(models.Model):
+    """Ключевой навык (нормализованный справочник из key_skills)"""
+    key = models.CharField(max_length=255, unique=True, verbose_name="Ключ (нижний регистр)")
+    name = models.CharField(max_length=255, verbose_name="Навык")
+    vacancy_count = models.IntegerField(default=0, verbose_name="Количество вакансий")
+    
+    class Meta:
+        verbose_name = "Навык"
+        verbose_name_plural = "Навыки"
+        ordering = ['-vacancy_count']
+        indexes = [
+            models.Index(fields=['-vacancy_count'], name='skill_vacancy_count_idx'),
+        ]
+    
+    def __str__(self):
+        return self.name
+    
+    @staticmethod
+    def make_key(name):
+        return name.strip().casefold()[:255]
+
+
+class SkillPair(models.Model):
+    """Сколько вакансий содержат оба навыка
+
+    Хранится разреженно и в обе стороны (A→B и B→A), поэтому похожие
+    навыки для любого навыка читаются одним индексным запросом.
+    """
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='pairs', verbose_name="Навык")
+    related = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='+', verbose_name="Связанный навык")
+    count = models.IntegerField(default=0, verbose_name="Совместных вакансий")
+    
+    class Meta:
+        verbose_name = "Пара навыков"
+        verbose_name_plural = "Пары навыков"
+        constraints = [
+            models.UniqueConstraint(fields=['skill', 'related'], name='unique_skill_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', '-count'], name='skill_pair_top_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.skill} + {self.related}: {self.count}"
+
+
+class Area(models.Model):
+    """Регион из справочника HH (/areas), id совпадает с id на HH"""
+    id = models.IntegerField(primary_key=True, verbose_name="ID региона на HH")
+    name = models.CharField(max_length=255, db_index=True, verbose_name="Название")
+    parent = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.CASCADE,
+        related_name='children', verbose_name="Родительский регион"
+    )
+    depth = models.PositiveSmallIntegerField(default=0, verbose_name="Уровень вложенности")
+    
+    class Meta:
+        verbose_name = "Регион"
+        verbose_name_plural = "Регионы"
+        ordering = ['depth', 'name']
+    
+    def __str__(self):
+        return self.name
+
+
+class AreaClosure(models.Model):
+    """Замыкание дерева регионов: пара (предок, потомок) для каждого уровня
+
+    Каждый регион — предок самого себя (depth = 0), поэтому «все вакансии
+    в регионе X с подрегионами» — это один индексный join независимо от
+    глубины дерева (см. vacancies.areas).
+    """
+    ancestor = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='descendant_links', verbose_name="Предок")
+    descendant = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='ancestor_links', verbose_name="Потомок")
+    depth = models.PositiveSmallIntegerField(verbose_name="Расстояние")
+    
+    class Meta:
+        verbose_name = "Связь регионов"
+        verbose_name_plural = "Замыкание дерева регионов"
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_area_closure'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'ancestor'], name='area_closure_descendant_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} → {self.descendant_id}"
+
+
+class FacetValue(models.Model):
+    """Значение фасета фильтра (регион, опыт, занятость, график, зарплата)
+
+    Связь Vacancy.facets — это списки вакансий для каждого значения:
+    счетчики всех фасетов для текущего поиска считаются одним запросом
+    по таблице связей (см. vacancies.facets).
+    """
+    FACET_CHOICES = [
+        ('area', 'Регион'),
+        ('experience', 'Опыт'),
+        ('employment', 'Занятость'),
+        ('schedule', 'График'),
+        ('salary', 'Зарплата'),
+    ]
+    
+    facet = models.CharField(max_length=20, choices=FACET_CHOICES, verbose_name="Фасет")
+    value = models.CharField(max_length=100, verbose_name="Значение")
+    vacancy_count = models.IntegerField(default=0, verbose_name="Количество вакансий")
+    
+    class Meta:
+        verbose_name = "Значение фасета"
+        verbose_name_plural = "Значения фасетов"
+        ordering = ['facet', '-vacancy_count']
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_facet_value'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_facet_display()}: {self.value}"
+
+
+class LshBucket(models.Model):
+    """Корзина LSH: вакансии с совпадающей полосой MinHash-сигнатуры"""
+    band = models.SmallIntegerField(verbose_name="Номер полосы")
+    bucket_hash = models.BigIntegerField(verbose_name="Хэш полосы")
+    vacancy = models.ForeignKey(Vacancy, on_delete=models.CASCADE, related_name='lsh_buckets', verbose_name="Вакансия")
+    
+    class Meta:
+        verbose_name = "Корзина LSH"
+        verbose_name_plural = "Корзины LSH"
+        indexes = [
+            models.Index(fields=['band', 'bucket_hash'], name='lsh_bucket_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.band}:{self.bucket_hash} → {self.vacancy_id}"
 
 
 class SearchQuery(models.Model):
@@ -55,7 +225,8 @@ class SearchQuery(models.Model):
     area = models.CharField(max_length=100, blank=True, verbose_name="Регион", default="")
     experience = models.CharField(max_length=50, blank=True, verbose_name="Опыт", default="")
     employment = models.CharField(max_length=50, blank=True, verbose_name="Занятость", default="")
-    search_date = models.DateTimeField(auto_now_add=True, verbose_name="Дата поиска")
+    # default, а не auto_now_add: записи из буфера search_log сохраняются со временем запроса
+    search_date = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Дата поиска")
     results_count = models.IntegerField(default=0, verbose_name="Количество результатов")
     
     class Meta:
@@ -64,4 +235,287 @@ class SearchQuery(models.Model):
         ordering = ['-search_date']
     
     def __str__(self):
-        return f"{self.query} - {self.search_date.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.query} - {self.search_date.strftime('%Y-%m-%d %H:%M')}"
+
+
+class PopularSearch(models.Model):
+    """Сводка одинаковых поисковых запросов: сколько раз и когда последний раз
+
+    Пополняется пачками из буфера vacancies.search_log, а не при каждом
+    запросе. Одинаковыми считаются запросы с тем же текстом (без учета
+    регистра) и фильтрами.
+    """
+    KIND_CHOICES = [
+        ('search', 'Поиск'),
+        ('import', 'Импорт'),
+    ]
+    
+    key = models.CharField(max_length=32, unique=True, verbose_name="Ключ (хэш запроса и фильтров)")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='search', verbose_name="Тип")
+    query = models.CharField(max_length=255, verbose_name="Поисковый запрос")
+    area = models.CharField(max_length=100, blank=True, default="", verbose_name="Регион")
+    experience = models.CharField(max_length=50, blank=True, default="", verbose_name="Опыт")
+    employment = models.CharField(max_length=50, blank=True, default="", verbose_name="Занятость")
+    hit_count = models.IntegerField(default=0, verbose_name="Количество запросов")
+    results_count = models.IntegerField(default=0, verbose_name="Результатов (последний раз)")
+    first_seen = models.DateTimeField(auto_now_add=True, verbose_name="Первый запрос")
+    last_seen = models.DateTimeField(db_index=True, verbose_name="Последний запрос")
+    
+    class Meta:
+        verbose_name = "Популярный запрос"
+        verbose_name_plural = "Популярные запросы"
+        ordering = ['-hit_count']
+        indexes = [
+            models.Index(fields=['kind', '-hit_count'], name='popular_search_hits_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.query} ({self.hit_count})"
+    
+    def get_search_url(self):
+        """Ссылка на список вакансий с параметрами этого запроса"""
+        params = {'q': self.query, 'area': self.area, 'experience': self.experience, 'employment': self.employment}
+        return f"/vacancies/?{urlencode({key: value for key, value in params.items() if value})}"
+
+
+class VacancyRollup(models.Model):
+    """Предагрегированная статистика вакансий за день или неделю
+
+    Одна строка — один период и одно значение измерения (навык, регион,
+    опыт или работодатель). Зарплаты хранятся гистограммой, по которой
+    считаются перцентили (см. vacancies.rollups).
+    """
+    PERIOD_CHOICES = [
+        ('day', 'День'),
+        ('week', 'Неделя'),
+    ]
+    DIMENSION_CHOICES = [
+        ('skill', 'Навык'),
+        ('area', 'Регион'),
+        ('experience', 'Опыт'),
+        ('employer', 'Работодатель'),
+    ]
+    
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES, verbose_name="Период")
+    period_start = models.DateField(verbose_name="Начало периода")
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES, verbose_name="Измерение")
+    value = models.CharField(max_length=255, verbose_name="Значение")
+    
+    count = models.IntegerField(default=0, verbose_name="Количество вакансий")
+    salary_count = models.IntegerField(default=0, verbose_name="Вакансий с зарплатой")
+    salary_sum = models.BigIntegerField(default=0, verbose_name="Сумма зарплат")
+    salary_histogram = models.JSONField(default=dict, verbose_name="Гистограмма зарплат")
+    
+    class Meta:
+        verbose_name = "Агрегат статистики"
+        verbose_name_plural = "Агрегаты статистики"
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'dimension', 'value', 'period_start'],
+                name='unique_vacancy_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'dimension', 'period_start'], name='rollup_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.dimension}={self.value} ({self.period} {self.period_start})"
+
+
+class SavedSearch(models.Model):
+    """Сохраненный поиск, который периодически синхронизируется с HH
+
+    watermark — момент начала последнего успешного запуска: следующий
+    запуск запрашивает только вакансии, опубликованные после него
+    (параметр HH date_from).
+    """
+    name = models.CharField(max_length=255, verbose_name="Название")
+    query = models.CharField(max_length=255, verbose_name="Поисковый запрос")
+    area = models.CharField(max_length=20, default='113', verbose_name="Регион (ID на HH)")
+    experience = models.CharField(max_length=50, blank=True, default='', verbose_name="Опыт (ID на HH)")
+    employment = models.CharField(max_length=50, blank=True, default='', verbose_name="Занятость (ID на HH)")
+    max_vacancies = models.IntegerField(default=100, verbose_name="Максимум вакансий за запуск")
+    interval_minutes = models.IntegerField(default=60, verbose_name="Интервал запуска (мин.)")
+    is_active = models.BooleanField(default=True, verbose_name="Активен")
+    
+    watermark = models.DateTimeField(null=True, blank=True, verbose_name="Загружено до")
+    next_run_at = models.DateTimeField(null=True, blank=True, verbose_name="Следующий запуск")
+    last_run_at = models.DateTimeField(null=True, blank=True, verbose_name="Последний запуск")
+    last_status = models.CharField(max_length=255, blank=True, default='', verbose_name="Результат последнего запуска")
+    last_count = models.IntegerField(default=0, verbose_name="Новых вакансий за последний запуск")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создан")
+    
+    class Meta:
+        verbose_name = "Сохраненный поиск"
+        verbose_name_plural = "Сохраненные поиски"
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['is_active', 'next_run_at'], name='saved_search_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.query})"
+    
+    def get_search_params(self):
+        """Параметры для HHApiService.import_vacancies"""
+        params = {
+            'text': self.query,
+            'area': self.area,
+            'order_by': 'publication_time',
+        }
+        if self.experience:
+            params['experience'] = self.experience
+        if self.employment:
+            params['employment'] = self.employment
+        return params
+
+
+class VacancyChange(models.Model):
+    """Журнал изменений вакансий для внешних потребителей (/api/changes/)
+
+    Пишется при импорте (только если вакансия действительно изменилась)
+    и архивировании. Первичный ключ служит курсором: потребитель
+    запоминает id последнего обработанного изменения.
+    """
+    OP_CHOICES = [
+        ('insert', 'Добавлена'),
+        ('update', 'Изменена'),
+        ('delete', 'Удалена'),
+        ('reset', 'База очищена'),
+    ]
+    
+    hh_id = models.IntegerField(null=True, blank=True, verbose_name="ID вакансии на HH")
+    op = models.CharField(max_length=10, choices=OP_CHOICES, verbose_name="Операция")
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Время изменения")
+    
+    class Meta:
+        verbose_name = "Изменение вакансии"
+        verbose_name_plural = "Изменения вакансий"
+        ordering = ['pk']
+    
+    def __str__(self):
+        return f"{self.op} {self.hh_id or ''}"
+
+
+class HarvestUnit(models.Model):
+    """Единица распределенного импорта: одна страница поиска HH
+
+    Координатор (plan_harvest) делит задание на запрос × регион ×
+    интервал дат × страницу. Воркеры (run_harvest_worker) захватывают
+    единицы арендой до lease_expires_at и продлевают ее, пока работают.
+    Единица с истекшей арендой (воркер упал) снова доступна для захвата.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает'),
+        ('leased', 'В работе'),
+        ('done', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+    
+    job = models.CharField(max_length=100, db_index=True, verbose_name="Задание")
+    params = models.JSONField(default=dict, verbose_name="Параметры поиска HH")
+    page = models.IntegerField(default=0, verbose_name="Страница")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Статус")
+    lease_owner = models.CharField(max_length=100, blank=True, default='', verbose_name="Воркер")
+    lease_expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Аренда до")
+    attempts = models.IntegerField(default=0, verbose_name="Попыток")
+    fetched = models.IntegerField(default=0, verbose_name="Загружено")
+    created = models.IntegerField(default=0, verbose_name="Новых")
+    updated = models.IntegerField(default=0, verbose_name="Обновлено")
+    error = models.TextField(blank=True, default='', verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создана")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершена")
+    
+    class Meta:
+        verbose_name = "Единица импорта"
+        verbose_name_plural = "Единицы импорта"
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['job', 'status', 'lease_expires_at'], name='harvest_unit_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.job}: {self.params.get('area', '')} стр. {self.page} ({self.status})"
+
+
+class BatchOperation(models.Model):
+    """Массовая операция над вакансиями из админки, выполняемая в фоне пачками
+
+    Отбор хранится сериализованным запросом (query), поэтому операцию,
+    прерванную перезапуском процесса (heartbeat_at давно не обновлялся),
+    можно продолжить: run_batch_operations снова выбирает оставшиеся строки.
+    """
+    ACTION_CHOICES = [
+        ('archive', 'Архивирование'),
+        ('delete', 'Удаление'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+    
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name="Действие")
+    description = models.TextField(blank=True, default='', verbose_name="Условие отбора")
+    user = models.CharField(max_length=150, blank=True, default='', verbose_name="Пользователь")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Статус")
+    query = models.BinaryField(null=True, editable=False, verbose_name="Отбор (сериализованный запрос)")
+    total = models.IntegerField(default=0, verbose_name="Примерно вакансий")
+    processed = models.IntegerField(default=0, verbose_name="Обработано")
+    error = models.TextField(blank=True, default='', verbose_name="Ошибка")
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name="Запущена")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Последняя пачка")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершена")
+    
+    class Meta:
+        verbose_name = "Массовая операция"
+        verbose_name_plural = "Массовые операции"
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.get_action_display()}: {self.processed} ({self.get_status_display()})"
+
+
+class ArchivedVacancy(models.Model):
+    """Закрытая или устаревшая вакансия, вынесенная из основной таблицы
+
+    Поля для аналитики хранятся как есть, полная запись (описание,
+    навыки и т.д.) — сжатым JSON в payload.
+    """
+    REASON_CHOICES = [
+        ('archived', 'Закрыта на HH'),
+        ('expired', 'Устарела'),
+        ('manual', 'Вручную'),
+    ]
+    
+    hh_id = models.IntegerField(unique=True, verbose_name="ID вакансии на HH")
+    name = models.CharField(max_length=255, verbose_name="Название вакансии")
+    employer_name = models.CharField(max_length=255, verbose_name="Название работодателя")
+    area = models.CharField(max_length=100, verbose_name="Регион")
+    experience = models.CharField(max_length=100, blank=True, verbose_name="Требуемый опыт")
+    salary_from = models.IntegerField(null=True, blank=True, verbose_name="Зарплата от")
+    salary_to = models.IntegerField(null=True, blank=True, verbose_name="Зарплата до")
+    currency = models.CharField(max_length=10, null=True, blank=True, verbose_name="Валюта")
+    published_at = models.DateTimeField(verbose_name="Дата публикации")
+    archived_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Дата архивирования")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name="Причина")
+    payload = models.BinaryField(verbose_name="Полная запись (zlib + JSON)")
+    
+    class Meta:
+        verbose_name = "Архивная вакансия"
+        verbose_name_plural = "Архив вакансий"
+        ordering = ['-archived_at']
+    
+    def __str__(self):
+        return f"{self.name} ({self.employer_name})"
+    
+    @staticmethod
+    def pack(data):
+        return zlib.compress(json.dumps(data, ensure_ascii=False, default=str).encode('utf-8'), 6)
+    
+    def get_payload(self):
+        """Полная запись вакансии на момент архивирования"""
+        return json.loads(zlib.decompress(bytes(self.payload)).decode('utf-8'))
@@ -0,0 +1,93 @@
+import gzip
+import json
+from functools import wraps
+
+from django.core import checks
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Ответы меньше этого размера не сжимаются: выигрыш меньше накладных расходов
+MIN_COMPRESS_SIZE = 512
+
+
+def check_codecs(app_configs, **kwargs):
+    """Предупреждение при запуске, если orjson или brotli не установлены"""
+    missing = [name for name, module in (('orjson', orjson), ('brotli', brotli)) if module is None]
+    if not missing:
+        return []
+    return [checks.Warning(
+        f"Не установлены пакеты: {', '.join(missing)}",
+        hint="API работает на json и gzip; установите зависимости из requirements.txt",
+        id='vacancies.W001',
+    )]
+
+
+def dumps(data) -> bytes:
+    """Сериализация в JSON: orjson, если установлен, иначе json с DjangoJSONEncoder"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(data, status: int = 200) -> HttpResponse:
+    """JSON-ответ без промежуточной строки и без экранирования кириллицы"""
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def _accepted_encodings(request) -> set:
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    encodings = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def compress(view):
+    """Сжатие ответа brotli (если установлен пакет brotli) или gzip
+
+    ETag становится слабым, как в django.middleware.gzip: сжатое
+    и несжатое представления отличаются побайтно, но не по смыслу.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.streaming or response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < MIN_COMPRESS_SIZE:
+            return response
+
+        encodings = _accepted_encodings(request)
+        if brotli is not None and 'br' in encodings:
+            content, encoding = brotli.compress(response.content, quality=5), 'br'
+        elif 'gzip' in encodings:
+            content, encoding = gzip.compress(response.content, compresslevel=6, mtime=0), 'gzip'
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    return wrapper
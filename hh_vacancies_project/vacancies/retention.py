@@ -0,0 +1,166 @@
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from .models import Vacancy, ArchivedVacancy
+from .services import HHApiService
+from . import changes, dedup, facets, skills
+
+# Поля, которые сохраняются в архиве без сжатия (для аналитики)
+ANALYTICS_FIELDS = [
+    'hh_id', 'name', 'employer_name', 'area', 'experience',
+    'salary_from', 'salary_to', 'currency', 'published_at',
+]
+
+# Служебные поля, которые не нужны в архивной записи
+EXCLUDED_FIELDS = ['id', 'minhash', 'skills', 'facets']
+
+
+def expired_vacancies(max_age_days: int):
+    """Вакансии, опубликованные раньше max_age_days дней назад"""
+    return Vacancy.objects.filter(published_at__lt=timezone.now() - timedelta(days=max_age_days))
+
+
+def closed_on_hh(hh_ids: Iterable[int], service: HHApiService = None) -> Tuple[List[int], List[int]]:
+    """Проверка вакансий на HH: (закрытые, проверенные)
+
+    Закрытой считается вакансия с флагом archived или удаленная (ответ
+    404). Вакансии, запрос по которым не удался (таймаут, 5xx, 429),
+    не считаются ни закрытыми, ни проверенными.
+    """
+    service = service or HHApiService()
+    closed, checked = [], []
+    for hh_id in hh_ids:
+        status, details = service.get_vacancy(hh_id)
+        if status == 'error':
+            continue
+        checked.append(hh_id)
+        if status == 'not_found' or details.get('archived'):
+            closed.append(hh_id)
+    return closed, checked
+
+
+def check_candidates(limit: int) -> List[int]:
+    """hh_id вакансий для проверки на HH: сначала не проверявшиеся, затем давно проверенные"""
+    return list(
+        Vacancy.objects.order_by(F('checked_at').asc(nulls_first=True), 'published_at')
+        .values_list('hh_id', flat=True)[:limit]
+    )
+
+
+def mark_checked(hh_ids: List[int]):
+    """Отметка о проверке: следующий запуск возьмет другие вакансии"""
+    Vacancy.objects.filter(hh_id__in=hh_ids).update(checked_at=timezone.now())
+
+
+def _detach(batch: List[Vacancy]):
+    """Удаление пачки вакансий вместе с их вкладом в индексы (внутри транзакции)"""
+    skills.index_vacancies(batch, remove=True)
+    facets.index_vacancies(batch, remove=True)
+    Vacancy.objects.filter(pk__in=[vacancy.pk for vacancy in batch]).delete()
+    changes.log([vacancy.hh_id for vacancy in batch], 'delete')
+    dedup.reassign_heads(vacancy.cluster_id for vacancy in batch if vacancy.cluster_id)
+
+
+def archive(queryset, reason: str, batch_size: int = 500,
+            progress: Optional[Callable[[int], None]] = None) -> int:
+    """Перенос вакансий в архив пачками
+
+    Каждая пачка — отдельная транзакция: запись в ArchivedVacancy,
+    удаление вклада в индексы навыков и фасетов, удаление из основной
+    таблицы и запись об удалении в журнал изменений. После каждой
+    пачки вызывается progress(перенесено).
+    """
+    archived = 0
+    while True:
+        batch = list(queryset.order_by('pk')[:batch_size])
+        if not batch:
+            break
+
+        with transaction.atomic():
+            ArchivedVacancy.objects.bulk_create([
+                ArchivedVacancy(
+                    reason=reason,
+                    payload=ArchivedVacancy.pack(model_to_dict(vacancy, exclude=EXCLUDED_FIELDS)),
+                    **{field: getattr(vacancy, field) for field in ANALYTICS_FIELDS}
+                )
+                for vacancy in batch
+            ], ignore_conflicts=True)
+            _detach(batch)
+
+        archived += len(batch)
+        if progress:
+            progress(archived)
+    return archived
+
+
+def remove(queryset, batch_size: int = 500, progress: Optional[Callable[[int], None]] = None) -> int:
+    """Удаление вакансий пачками без архива (индексы и журнал обновляются, как при архивировании)"""
+    removed = 0
+    while True:
+        batch = list(queryset.order_by('pk')[:batch_size])
+        if not batch:
+            break
+
+        with transaction.atomic():
+            _detach(batch)
+
+        removed += len(batch)
+        if progress:
+            progress(removed)
+    return removed
+
+
+def _incremental_vacuum(cursor, pages: int):
+    """PRAGMA incremental_vacuum до освобождения pages страниц
+
+    Модуль sqlite3 выполняет один шаг инструкции, а каждый шаг
+    incremental_vacuum освобождает одну страницу, поэтому прагма
+    повторяется, пока список свободных страниц уменьшается.
+    """
+    cursor.execute("PRAGMA freelist_count")
+    free = cursor.fetchone()[0]
+    for _ in range(pages):
+        if not free:
+            break
+        cursor.execute("PRAGMA incremental_vacuum(1)")
+        cursor.execute("PRAGMA freelist_count")
+        left = cursor.fetchone()[0]
+        if left >= free:
+            break
+        free = left
+
+
+def compact(full: bool = False, pages: int = 0) -> Dict:
+    """Возврат свободного места после архивирования
+
+    SQLite: PRAGMA incremental_vacuum (нужен auto_vacuum=INCREMENTAL;
+    full=True один раз переводит базу в этот режим через VACUUM).
+    PostgreSQL: VACUUM (ANALYZE) таблицы вакансий.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("PRAGMA freelist_count")
+            free_before = cursor.fetchone()[0]
+            cursor.execute("PRAGMA auto_vacuum")
+            mode = cursor.fetchone()[0]
+
+            if mode != 2 and full:
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                cursor.execute("VACUUM")
+            elif mode == 2:
+                _incremental_vacuum(cursor, pages or free_before)
+            cursor.execute("PRAGMA optimize")
+
+            cursor.execute("PRAGMA freelist_count")
+            free_after = cursor.fetchone()[0]
+            return {'free_pages_before': free_before, 'free_pages_after': free_after}
+
+        if connection.vendor == 'postgresql':
+            for table in (Vacancy._meta.db_table, Vacancy.skills.through._meta.db_table):
+                cursor.execute(f'VACUUM (ANALYZE) "{table}"')
+    return {}
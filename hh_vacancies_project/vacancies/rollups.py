@@ -0,0 +1,191 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .db import chunked
+from .models import Vacancy, VacancyRollup
+
+# Ширина корзины гистограммы зарплат (руб.) и число корзин;
+# все, что выше 1 000 000, попадает в последнюю корзину
+SALARY_BUCKET_SIZE = 5000
+SALARY_BUCKETS = 200
+
+PERIODS = ('day', 'week')
+
+
+def period_start(day: date, period: str) -> date:
+    """Начало дня или недели (понедельник)"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def salary_bucket(salary: int) -> int:
+    return min(max(salary, 0) // SALARY_BUCKET_SIZE, SALARY_BUCKETS - 1)
+
+
+def histogram_percentile(histogram: Dict, q: float) -> Optional[int]:
+    """Перцентиль по гистограмме с интерполяцией внутри корзины"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+
+    target = q * total
+    seen = 0
+    for bucket in sorted(histogram, key=int):
+        count = histogram[bucket]
+        if seen + count >= target:
+            fraction = (target - seen) / count
+            return int((int(bucket) + fraction) * SALARY_BUCKET_SIZE)
+        seen += count
+    return (SALARY_BUCKETS - 1) * SALARY_BUCKET_SIZE
+
+
+def _dimension_values(vacancy: Vacancy) -> List[tuple]:
+    values = [
+        ('area', vacancy.area),
+        ('experience', vacancy.experience),
+        ('employer', vacancy.employer_name),
+    ]
+    values.extend(('skill', skill) for skill in vacancy.get_skills_list())
+    # Повторяющийся навык в одной вакансии учитывается один раз
+    return list(dict.fromkeys((dimension, value[:255]) for dimension, value in values if value))
+
+
+# Поля вакансии, от которых зависит ее вклад в агрегаты
+ROLLUP_FIELDS = (
+    'hh_id', 'published_at', 'area', 'experience', 'employer_name', 'key_skills',
+    'salary_from', 'salary_to', 'currency', 'is_duplicate',
+)
+
+
+def _new_delta() -> Dict:
+    return {'count': 0, 'salary_count': 0, 'salary_sum': 0, 'histogram': defaultdict(int)}
+
+
+def _accumulate(deltas: Dict, vacancy: Vacancy, sign: int):
+    """Вклад вакансии в агрегаты со знаком: +1 — учесть, -1 — убрать"""
+    published = timezone.localtime(vacancy.published_at).date()
+    salary = vacancy.get_salary_value()
+    for dimension, value in _dimension_values(vacancy):
+        for period in PERIODS:
+            delta = deltas[(period, period_start(published, period), dimension, value)]
+            delta['count'] += sign
+            if salary:
+                delta['salary_count'] += sign
+                delta['salary_sum'] += sign * salary
+                delta['histogram'][str(salary_bucket(salary))] += sign
+
+
+def _apply(deltas: Dict):
+    """Запись изменений агрегатов; строки, в которых не осталось вакансий, удаляются"""
+    deltas = {
+        key: delta for key, delta in deltas.items()
+        if delta['count'] or delta['salary_count'] or any(delta['histogram'].values())
+    }
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        for (period, start, dimension, value), delta in deltas.items():
+            rollup, _ = VacancyRollup.objects.select_for_update().get_or_create(
+                period=period,
+                period_start=start,
+                dimension=dimension,
+                value=value,
+            )
+            rollup.count += delta['count']
+            if rollup.count <= 0:
+                rollup.delete()
+                continue
+            rollup.salary_count += delta['salary_count']
+            rollup.salary_sum += delta['salary_sum']
+            histogram = rollup.salary_histogram
+            for bucket, count in delta['histogram'].items():
+                histogram[bucket] = histogram.get(bucket, 0) + count
+                if histogram[bucket] <= 0:
+                    del histogram[bucket]
+            rollup.save()
+
+
+def record_vacancies(vacancies: Iterable[Vacancy]):
+    """Учет вакансий в агрегатах (полный пересчет и вакансии, которых еще не было)"""
+    deltas = defaultdict(_new_delta)
+    for vacancy in vacancies:
+        _accumulate(deltas, vacancy, 1)
+    _apply(deltas)
+
+
+def snapshot(hh_ids: Iterable[int]) -> Dict[int, Vacancy]:
+    """Состояние вакансий до импорта: от него считается, какой вклад убрать"""
+    return {vacancy.hh_id: vacancy for vacancy in Vacancy.objects.filter(hh_id__in=list(hh_ids)).only(*ROLLUP_FIELDS)}
+
+
+def update_vacancies(previous: Dict[int, Vacancy], vacancies: Iterable[Vacancy]):
+    """Инкрементальное обновление агрегатов сохраненными при импорте вакансиями
+
+    Прежний вклад вакансии (из snapshot до записи) убирается, новый —
+    добавляется; дубликаты не учитываются. Поэтому изменение региона,
+    зарплаты или навыков при повторном импорте и отметка вакансии
+    дубликатом сдвигают агрегаты, а неизменная вакансия — нет.
+    """
+    deltas = defaultdict(_new_delta)
+    for vacancy in vacancies:
+        old = previous.get(vacancy.hh_id)
+        if old is not None and not old.is_duplicate:
+            _accumulate(deltas, old, -1)
+        if not vacancy.is_duplicate:
+            _accumulate(deltas, vacancy, 1)
+    _apply(deltas)
+
+
+def rebuild(chunk_size: int = 2000) -> int:
+    """Полный пересчет агрегатов по всей таблице вакансий"""
+    with transaction.atomic():
+        VacancyRollup.objects.all().delete()
+
+    processed = 0
+    for chunk in chunked(Vacancy.objects.filter(is_duplicate=False).only(*ROLLUP_FIELDS).order_by('pk'), chunk_size):
+        record_vacancies(chunk)
+        processed += len(chunk)
+    return processed
+
+
+def get_series(dimension: str, value: str, period: str = 'week',
+               date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[Dict]:
+    """Временной ряд для одного значения измерения"""
+    rollups = VacancyRollup.objects.filter(period=period, dimension=dimension, value=value)
+    if date_from:
+        rollups = rollups.filter(period_start__gte=period_start(date_from, period))
+    if date_to:
+        rollups = rollups.filter(period_start__lte=date_to)
+
+    series = []
+    for rollup in rollups.order_by('period_start'):
+        histogram = rollup.salary_histogram
+        series.append({
+            'period_start': rollup.period_start.isoformat(),
+            'count': rollup.count,
+            'salary_avg': rollup.salary_sum // rollup.salary_count if rollup.salary_count else None,
+            'salary_p25': histogram_percentile(histogram, 0.25),
+            'salary_p50': histogram_percentile(histogram, 0.50),
+            'salary_p75': histogram_percentile(histogram, 0.75),
+        })
+    return series
+
+
+def get_top_values(dimension: str, period: str = 'week', date_from: Optional[date] = None,
+                   limit: int = 10) -> List[Dict]:
+    """Самые частые значения измерения за период"""
+    rollups = VacancyRollup.objects.filter(period=period, dimension=dimension)
+    if date_from:
+        rollups = rollups.filter(period_start__gte=period_start(date_from, period))
+    return list(
+        rollups.values('value')
+        .annotate(total=Sum('count'))
+        .order_by('-total')[:limit]
+    )
@@ -0,0 +1,122 @@
+import random
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# Состояние маршрутизации текущего запроса (отдельно для каждого потока/корутины)
+_state = Local()
+
+# Кэш проверок отставания реплик: alias -> (время проверки, реплика пригодна)
+_health_cache = {}
+HEALTH_CHECK_INTERVAL = 5
+
+# Модели этих приложений всегда читаются с основной базы
+PRIMARY_ONLY_APPS = {'admin', 'auth', 'contenttypes', 'sessions'}
+
+
+def choose_replica() -> str:
+    """Случайная реплика среди тех, что не отстают, или основная база"""
+    replicas = [
+        alias for alias in getattr(settings, 'REPLICA_DATABASES', [])
+        if replica_is_healthy(alias)
+    ]
+    if not replicas:
+        return 'default'
+    return random.choice(replicas)
+
+
+def begin_request(use_replica: bool):
+    """Сброс состояния маршрутизации в начале запроса
+
+    Реплика выбирается один раз на запрос: все чтения запроса идут в одну
+    базу и видят согласованные данные, а выбор не повторяется на каждый SQL-запрос.
+    """
+    _state.replica = choose_replica() if use_replica else 'default'
+    _state.wrote = False
+
+
+def end_request() -> bool:
+    """Завершение запроса. Возвращает True, если в запросе была запись"""
+    wrote = getattr(_state, 'wrote', False)
+    _state.replica = 'default'
+    _state.wrote = False
+    return wrote
+
+
+def _latest_change(alias: str):
+    """Время последней записи журнала изменений вакансий в базе alias"""
+    from .models import VacancyChange
+
+    return VacancyChange.objects.using(alias).order_by('-pk').values_list('changed_at', flat=True).first()
+
+
+def replica_lag(alias: str) -> float:
+    """Отставание реплики в секундах"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        # SQLite-реплики — копии файла (sync_sqlite_replicas): отставание —
+        # разница между последними изменениями вакансий в основной базе и в копии
+        primary, replica = _latest_change('default'), _latest_change(alias)
+        if primary is None or primary == replica:
+            return 0.0
+        if replica is None:
+            return float('inf')
+        return max((primary - replica).total_seconds(), 0.0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE "
+            "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+            "END"
+        )
+        return float(cursor.fetchone()[0] or 0)
+
+
+def replica_is_healthy(alias: str) -> bool:
+    """Реплика доступна и отстает не больше REPLICA_MAX_LAG секунд"""
+    now = time.monotonic()
+    cached = _health_cache.get(alias)
+    if cached and now - cached[0] < HEALTH_CHECK_INTERVAL:
+        return cached[1]
+
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG
+    except DatabaseError as e:
+        print(f"Реплика {alias} недоступна: {e}")
+        healthy = False
+
+    _health_cache[alias] = (now, healthy)
+    return healthy
+
+
+class ReplicaRouter:
+    """Роутер: чтение в read-only представлениях идет на реплики
+
+    Реплика выбирается в начале запроса (begin_request) случайно среди
+    тех, что не отстают. После записи
+    в текущем запросе чтение переключается на основную базу
+    (read-your-writes), а ReplicaRoutingMiddleware закрепляет клиента
+    за основной базой еще на REPLICA_STICKY_SECONDS секунд.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return 'default'
+        if getattr(_state, 'wrote', False):
+            return 'default'
+        return getattr(_state, 'replica', 'default')
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in getattr(settings, 'REPLICA_DATABASES', [])
@@ -0,0 +1,124 @@
+import re
+from html import escape
+from html.parser import HTMLParser
+from typing import Tuple
+
+# Теги, которые остаются в описании (без атрибутов, кроме href у ссылок)
+ALLOWED_TAGS = {
+    'p', 'br', 'ul', 'ol', 'li', 'b', 'strong', 'i', 'em', 'u',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'a',
+}
+VOID_TAGS = {'br'}
+
+# Содержимое этих тегов выбрасывается целиком
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template'}
+
+# После этих тегов в текстовой версии начинается новая строка
+BLOCK_TAGS = {'p', 'br', 'ul', 'ol', 'li', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'tr'}
+
+SAFE_URL = re.compile(r'^(https?:|mailto:|/)', re.IGNORECASE)
+
+MAX_DESCRIPTION_LENGTH = 10000
+
+
+class _DescriptionParser(HTMLParser):
+    """Один проход по HTML: очищенная разметка и текст одновременно"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.skip_depth += 1
+            return
+        if self.skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag == 'li':
+            self.text.append('• ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        if tag == 'a':
+            href = dict(attrs).get('href') or ''
+            if SAFE_URL.match(href.strip()):
+                self.html.append(f'<a href="{escape(href.strip())}" rel="nofollow noopener" target="_blank">')
+            else:
+                self.html.append('<a>')
+        else:
+            self.html.append(f'<{tag}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in DROP_CONTENT_TAGS:
+            self.skip_depth -= 1
+        elif tag in self.open_tags and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+            return
+        if self.skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag in self.open_tags:
+            # Закрываем все незакрытые вложенные теги, чтобы разметка была валидной
+            while self.open_tags:
+                open_tag = self.open_tags.pop()
+                self.html.append(f'</{open_tag}>')
+                if open_tag == tag:
+                    break
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def result(self) -> Tuple[str, str]:
+        while self.open_tags:
+            self.html.append(f'</{self.open_tags.pop()}>')
+        return ''.join(self.html), ''.join(self.text)
+
+
+def _normalize_text(text: str) -> str:
+    lines = (re.sub(r'[ \t\r\f\v\xa0]+', ' ', line).strip() for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def process_description(raw_html: str) -> Tuple[str, str]:
+    """Очищенный HTML и текст описания вакансии
+
+    Функция не зависит от Django, поэтому ее можно запускать
+    в пуле процессов при массовом импорте.
+    """
+    if not raw_html:
+        return '', ''
+
+    parser = _DescriptionParser()
+    parser.feed(raw_html)
+    parser.close()
+    clean_html, text = parser.result()
+
+    if len(clean_html) > MAX_DESCRIPTION_LENGTH:
+        # Не оставляем оборванный тег и пересобираем, чтобы закрыть открытые
+        truncated = clean_html[:MAX_DESCRIPTION_LENGTH]
+        if truncated.rfind('<') > truncated.rfind('>'):
+            truncated = truncated[:truncated.rfind('<')]
+        # И оборванную ссылку на символ (&am от &amp;)
+        if truncated.rfind('&') > truncated.rfind(';'):
+            truncated = truncated[:truncated.rfind('&')]
+        parser = _DescriptionParser()
+        parser.feed(truncated)
+        parser.close()
+        clean_html, _ = parser.result()
+    return clean_html, _normalize_text(text)[:MAX_DESCRIPTION_LENGTH]
@@ -0,0 +1,189 @@
+import atexit
+import hashlib
+import threading
+import time
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SearchQuery, PopularSearch
+
+# Кэш виджетов «Недавние/Популярные запросы», сбрасывается после каждого сброса буфера
+WIDGET_CACHE_KEY = 'search_log:widgets'
+WIDGET_SIZE = 8
+
+
+def search_key(kind: str, query: str, area: str = '', experience: str = '', employment: str = '') -> str:
+    """Ключ сводки: одинаковые запросы с точностью до регистра и пробелов"""
+    parts = [kind] + [' '.join((value or '').split()).casefold() for value in (query, area, experience, employment)]
+    return hashlib.md5('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class SearchLogBuffer:
+    """Буфер истории запросов в памяти процесса
+
+    Запись в буфер не трогает базу. Строки SearchQuery копятся списком,
+    одинаковые запросы сворачиваются в один счетчик. Фоновый поток
+    раз в SEARCH_LOG_FLUSH_INTERVAL секунд (или при заполнении буфера)
+    пишет все одной транзакцией. При падении процесса теряются записи
+    только за последний интервал. Если база недоступна, несохраненные
+    записи возвращаются в буфер (не больше SEARCH_LOG_MAX_PENDING).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._rows: List[SearchQuery] = []
+        self._hits: Dict[str, Dict] = {}
+        self._failed = False
+
+    def record(self, query: str, area: str = '', experience: str = '', employment: str = '',
+               results_count: int = 0, kind: str = 'search'):
+        """Добавление запроса в буфер"""
+        query = (query or '').strip()
+        if not query:
+            return
+        area, experience, employment = area or '', experience or '', employment or ''
+        now = timezone.now()
+        key = search_key(kind, query, area, experience, employment)
+
+        with self._lock:
+            self._rows.append(SearchQuery(
+                query=query, area=area, experience=experience, employment=employment,
+                search_date=now, results_count=results_count
+            ))
+            entry = self._hits.get(key)
+            if entry is None:
+                entry = self._hits[key] = {
+                    'kind': kind, 'query': query, 'area': area,
+                    'experience': experience, 'employment': employment, 'hits': 0,
+                }
+            entry['hits'] += 1
+            entry['results_count'] = results_count
+            entry['last_seen'] = now
+            size = len(self._rows)
+
+        if settings.SEARCH_LOG_FLUSH_INTERVAL <= 0:
+            self.flush()
+        elif size >= settings.SEARCH_LOG_MAX_BUFFER:
+            self._ensure_thread()
+            self._wakeup.set()
+        else:
+            self._ensure_thread()
+
+    def pending(self) -> int:
+        """Количество записей, еще не сохраненных в базу"""
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> int:
+        """Запись накопленного буфера в базу одной транзакцией"""
+        with self._lock:
+            rows, hits = self._rows, self._hits
+            self._rows, self._hits = [], {}
+        if not rows:
+            return 0
+
+        try:
+            with transaction.atomic():
+                SearchQuery.objects.bulk_create(rows)
+                # Новые ключи вставляются с нулевым счетчиком, затем все
+                # счетчики увеличиваются через F(): так параллельные процессы
+                # не теряют чужие приращения
+                PopularSearch.objects.bulk_create([
+                    PopularSearch(
+                        key=key, kind=entry['kind'], query=entry['query'], area=entry['area'],
+                        experience=entry['experience'], employment=entry['employment'],
+                        hit_count=0, last_seen=entry['last_seen']
+                    )
+                    for key, entry in hits.items()
+                ], ignore_conflicts=True)
+                for key, entry in hits.items():
+                    PopularSearch.objects.filter(key=key).update(
+                        hit_count=F('hit_count') + entry['hits'],
+                        results_count=entry['results_count'],
+                        last_seen=entry['last_seen'],
+                    )
+        except Exception as e:
+            kept = self._requeue(rows, hits)
+            print(f"Ошибка сохранения истории запросов ({len(rows)} записей, возвращено в буфер {kept}): {e}")
+            self._failed = True
+            return 0
+
+        self._failed = False
+        invalidate_widgets()
+        return len(rows)
+
+    def _requeue(self, rows: List[SearchQuery], hits: Dict[str, Dict]) -> int:
+        """Возврат несохраненной пачки в буфер перед новыми записями
+
+        Буфер ограничен SEARCH_LOG_MAX_PENDING строками: при долгой
+        недоступности базы отбрасываются самые старые записи, а не
+        растет память процесса.
+        """
+        limit = settings.SEARCH_LOG_MAX_PENDING
+        with self._lock:
+            self._rows = (rows + self._rows)[-limit:]
+            for key, entry in hits.items():
+                current = self._hits.get(key)
+                if current is not None:
+                    # В буфере запись новее: берем ее результаты и время, счетчики складываем
+                    current['hits'] += entry['hits']
+                elif len(self._hits) < limit:
+                    self._hits[key] = entry
+            return min(len(rows), len(self._rows))
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='search-log-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.SEARCH_LOG_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+            close_old_connections()
+            if self._failed:
+                # Полный буфер будит поток на каждом запросе: после ошибки
+                # следующая попытка — не раньше чем через интервал
+                time.sleep(settings.SEARCH_LOG_FLUSH_INTERVAL)
+
+
+_buffer = SearchLogBuffer()
+atexit.register(_buffer.flush)
+
+record = _buffer.record
+flush = _buffer.flush
+pending = _buffer.pending
+
+
+def invalidate_widgets():
+    """Сброс кэша виджетов после изменения истории запросов"""
+    cache.delete(WIDGET_CACHE_KEY)
+
+
+def _load_widgets() -> Dict[str, List[PopularSearch]]:
+    searches = PopularSearch.objects.filter(kind='search')
+    return {
+        'recent': list(searches.order_by('-last_seen')[:WIDGET_SIZE]),
+        'popular': list(searches.order_by('-hit_count', '-last_seen')[:WIDGET_SIZE]),
+    }
+
+
+def widgets() -> Dict[str, List[PopularSearch]]:
+    """Недавние и популярные запросы для шаблонов (из кэша)"""
+    data = cache.get(WIDGET_CACHE_KEY)
+    if data is None:
+        data = _load_widgets()
+        cache.set(WIDGET_CACHE_KEY, data, settings.SEARCH_LOG_WIDGET_TIMEOUT)
+    return data
@@ -1,10 +1,90 @@
+import multiprocessing
 import requests
+import threading
 import time
-from datetime import datetime
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
 from django.db import transaction
-from django.utils.timezone import make_aware
-from .models import Vacancy, SearchQuery
+from .models import Vacancy
+from .cache import bump_data_version
+from .db import is_postgresql, upsert_returning_inserted
+from . import areas, changes, dedup, facets, rollups, search_log, skills
+from .records import UPSERT_FIELDS, VacancyRecord, loads, parse_batch
+from .sanitizer import process_description
+
+
+_pool = None
+_pool_enabled = False
+_pool_lock = threading.Lock()
+
+
+def use_process_pool(enabled: bool = True):
+    """Разрешение пула процессов для очистки описаний
+
+    Вызывают management-команды массового импорта. В веб-запросах и
+    потоках синхронизации описания очищаются в текущем потоке: fork
+    многопоточного процесса с открытыми соединениями к базе небезопасен.
+    """
+    global _pool_enabled
+    _pool_enabled = enabled
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Один пул на процесс, создается при первой большой пачке
+
+    Процессы запускаются через forkserver (или spawn), а не fork:
+    дочерний процесс не наследует потоки и соединения Django.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.DESCRIPTION_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _pool
+
+
+def process_descriptions(descriptions: List[str]) -> List[Tuple[str, str]]:
+    """Очистка пачки описаний, для больших пачек в командах импорта — в пуле процессов"""
+    if (
+        _pool_enabled
+        and settings.DESCRIPTION_WORKERS > 1
+        and len(descriptions) >= settings.DESCRIPTION_POOL_MIN_BATCH
+        and threading.current_thread() is threading.main_thread()
+    ):
+        return list(_get_pool().map(process_description, descriptions, chunksize=16))
+    return [process_description(description) for description in descriptions]
+
+
+class RequestBudget:
+    """Общий лимит запросов к HH API (token bucket)
+
+    Один экземпляр можно передать нескольким HHApiService в разных
+    потоках: суммарно они не превысят rate запросов в секунду.
+    """
+    
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Ждет, пока в бюджете появится запрос"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
 
 class HHApiService:
@@ -12,15 +92,21 @@ class HHApiService:
     
     BASE_URL = "https://api.hh.ru"
     
-    def __init__(self):
+    def __init__(self, budget: Optional[RequestBudget] = None):
+        self.budget = budget
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'HH-Vacancies-Project/1.0 (contact@example.com)',
             'Accept': 'application/json'
         })
     
+    def _wait_budget(self):
+        if self.budget is not None:
+            self.budget.acquire()
+    
     def search_vacancies(self, params: Dict) -> Dict:
         """Поиск вакансий"""
+        self._wait_budget()
         try:
             response = self.session.get(
                 f"{self.BASE_URL}/vacancies",
@@ -31,20 +117,31 @@ class HHApiService:
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Ошибка при поиске вакансий: {e}")
-            return {"items": [], "found": 0, "pages": 0}
+            return {"items": [], "found": 0, "pages": 0, "error": str(e)}
     
-    def get_vacancy_details(self, vacancy_id: int) -> Optional[Dict]:
-        """Получение деталей вакансии"""
+    def get_vacancy(self, vacancy_id: int) -> Tuple[str, Optional[Dict]]:
+        """Вакансия с HH и результат запроса: ('ok', данные), ('not_found', None) или ('error', None)
+
+        'not_found' — только подтвержденный ответ 404; таймауты, 5xx
+        и 429 — это 'error', о судьбе вакансии они ничего не говорят.
+        """
+        self._wait_budget()
         try:
             response = self.session.get(
                 f"{self.BASE_URL}/vacancies/{vacancy_id}",
                 timeout=10
             )
+            if response.status_code == 404:
+                return 'not_found', None
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return 'ok', loads(response.content)
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Ошибка при получении вакансии {vacancy_id}: {e}")
-            return None
+            return 'error', None
+    
+    def get_vacancy_details(self, vacancy_id: int) -> Optional[Dict]:
+        """Получение деталей вакансии"""
+        return self.get_vacancy(vacancy_id)[1]
     
     def get_dictionaries(self):
         """Получение справочников HH"""
@@ -55,10 +152,132 @@ class HHApiService:
         except:
             return {}
     
-    def import_vacancies(self, search_params: Dict) -> Dict:
-        """Импорт вакансий с сохранением в БД"""
+    def fetch_vacancies(self, vacancy_ids: List, workers: int = 1) -> List[Tuple[int, str, Optional[Dict]]]:
+        """Вакансии по списку id с результатом запроса каждой: (id, статус, данные)
+
+        Статусы как в get_vacancy; порядок совпадает с vacancy_ids.
+        С workers > 1 запросы идут в пуле потоков; у каждого потока своя
+        сессия, общий лимит задает budget сервиса.
+        """
+        if workers <= 1 or len(vacancy_ids) <= 1:
+            results = []
+            for i, vacancy_id in enumerate(vacancy_ids):
+                # Небольшая задержка между запросами, если нет общего лимита
+                if self.budget is None and i > 0 and i % 5 == 0:
+                    time.sleep(0.5)
+                results.append((vacancy_id, *self.get_vacancy(vacancy_id)))
+            return results
         
-        # Подготавливаем параметры
+        local = threading.local()
+        
+        def fetch(vacancy_id):
+            if not hasattr(local, 'service'):
+                local.service = HHApiService(budget=self.budget)
+            return (vacancy_id, *local.service.get_vacancy(vacancy_id))
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(fetch, vacancy_ids))
+    
+    def fetch_details(self, vacancy_ids: List, workers: int = 1) -> List[Dict]:
+        """Детали вакансий по списку id (недоступные пропускаются)"""
+        return [details for _, _, details in self.fetch_vacancies(vacancy_ids, workers=workers) if details]
+    
+    def save_batch(self, details_list: List[Dict]) -> Dict:
+        """Сохранение пачки вакансий
+
+        Описания очищаются всей пачкой, детали разбираются в компактные
+        VacancyRecord, а вся пачка записывается одним INSERT ... ON CONFLICT
+        DO UPDATE. Вакансии, которые не изменились, не перезаписываются.
+        Если пачка не сохранилась целиком, вакансии сохраняются по одной,
+        чтобы отделить ошибочные.
+        """
+        result = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': [], 'vacancies': []}
+        if not details_list:
+            return result
+        
+        # Очищаем HTML описаний всей пачкой (в пуле процессов)
+        descriptions = process_descriptions([details.get('description') or '' for details in details_list])
+        records, result['errors'] = parse_batch(details_list, descriptions)
+        # Повторы внутри пачки: один INSERT не может обновить строку дважды
+        records = list({record.hh_id: record for record in records}.values())
+        
+        # Ссылка на справочник регионов только для известных id
+        known = areas.known_ids(record.area_ref_id for record in records)
+        for record in records:
+            if record.area_ref_id not in known:
+                record.area_ref_id = None
+        
+        # Прежнее состояние вакансий — чтобы убрать их старый вклад в агрегаты динамики
+        previous = rollups.snapshot(record.hh_id for record in records)
+        try:
+            created, updated = self._save_records(records)
+        except Exception as e:
+            print(f"Пачка не сохранена ({e}), сохраняем по одной")
+            created, updated = [], []
+            for record in records:
+                try:
+                    vacancy, op = self._save_vacancy(record)
+                    if op == 'insert':
+                        created.append(vacancy)
+                    elif op == 'update':
+                        updated.append(vacancy)
+                except Exception as e:
+                    result['errors'].append(f"Ошибка при сохранении вакансии {record.hh_id}: {str(e)}")
+        
+        imported = created + updated
+        # Отмечаем дубликаты, обновляем агрегаты динамики (без дубликатов),
+        # индексы навыков и фасетов
+        dedup.assign_clusters(imported)
+        rollups.update_vacancies(previous, imported)
+        skills.index_vacancies(imported)
+        facets.index_vacancies(imported)
+        
+        for error in result['errors']:
+            print(error)
+        unchanged = len(records) - len(created) - len(updated)
+        print(f"Сохранено: {len(created)} новых, {len(updated)} обновлено, {unchanged} без изменений")
+        
+        result.update(created=len(created), updated=len(updated), unchanged=unchanged, vacancies=imported)
+        return result
+    
+    def _save_records(self, records: List[VacancyRecord]) -> Tuple[List[Vacancy], List[Vacancy]]:
+        """Запись изменившихся вакансий пачки одним upsert и чтение сохраненных строк"""
+        hh_ids = [record.hh_id for record in records]
+        with transaction.atomic():
+            existing = {
+                row['hh_id']: row
+                for row in Vacancy.objects.filter(hh_id__in=hh_ids).values('hh_id', *UPSERT_FIELDS)
+            }
+            changed = [record for record in records if not record.matches(existing.get(record.hh_id))]
+            if not changed:
+                return [], []
+            objs = [record.to_model() for record in changed]
+            if is_postgresql():
+                # Вставку от обновления отличает сама база: параллельный импорт
+                # мог добавить вакансию уже после чтения existing
+                inserted = upsert_returning_inserted(objs, 'hh_id', UPSERT_FIELDS + ['updated_at'])
+            else:
+                # SQLite-бэкенд открывает транзакцию через BEGIN IMMEDIATE: блокировка
+                # на запись взята до чтения existing, и оно не устаревает до записи
+                Vacancy.objects.bulk_create(
+                    objs,
+                    update_conflicts=True,
+                    unique_fields=['hh_id'],
+                    update_fields=UPSERT_FIELDS + ['updated_at'],
+                    batch_size=500,
+                )
+                inserted = {record.hh_id for record in changed if record.hh_id not in existing}
+            # При update_conflicts Django не возвращает первичные ключи
+            saved = Vacancy.objects.filter(hh_id__in=[record.hh_id for record in changed]).order_by('pk')
+            created, updated = [], []
+            for vacancy in saved:
+                (created if vacancy.hh_id in inserted else updated).append(vacancy)
+            changes.log([vacancy.hh_id for vacancy in created], 'insert')
+            changes.log([vacancy.hh_id for vacancy in updated], 'update')
+        return created, updated
+    
+    def build_params(self, search_params: Dict) -> Dict:
+        """Параметры запроса к HH API из параметров поиска"""
         params = {
             'text': search_params.get('text', ''),
             'area': search_params.get('area', '113'),  # Россия по умолчанию
@@ -77,6 +296,19 @@ class HHApiService:
             params['schedule'] = search_params['schedule']
         if search_params.get('salary'):
             params['salary'] = search_params['salary']
+        if search_params.get('date_from'):
+            # Только вакансии, опубликованные после этой даты (ISO 8601)
+            params['date_from'] = search_params['date_from']
+        if search_params.get('date_to'):
+            params['date_to'] = search_params['date_to']
+        
+        return params
+    
+    def import_vacancies(self, search_params: Dict, workers: int = 1) -> Dict:
+        """Импорт вакансий с сохранением в БД"""
+        
+        # Подготавливаем параметры
+        params = self.build_params(search_params)
         
         print(f"Запрашиваем вакансии с параметрами: {params}")
         
@@ -84,6 +316,14 @@ class HHApiService:
             # Получаем вакансии
             vacancies_data = self.search_vacancies(params)
             
+            if vacancies_data.get('error'):
+                return {
+                    'success': False,
+                    'message': f"Ошибка HH API: {vacancies_data['error']}",
+                    'count': 0,
+                    'error': True
+                }
+            
             if not vacancies_data.get('items'):
                 return {
                     'success': False,
@@ -96,52 +336,27 @@ class HHApiService:
             
             print(f"Найдено {total_found} вакансий, {pages} страниц")
             
-            saved_count = 0
-            errors = []
-            
             # Ограничиваем количество для обработки
             max_to_process = min(len(vacancies_data['items']), params['per_page'])
+            vacancy_ids = [item['id'] for item in vacancies_data['items'][:max_to_process] if item.get('id')]
             
-            for i, vacancy_data in enumerate(vacancies_data['items'][:max_to_process]):
-                try:
-                    vacancy_id = vacancy_data.get('id')
-                    if not vacancy_id:
-                        continue
-                    
-                    # Небольшая задержка между запросами
-                    if i > 0 and i % 5 == 0:
-                        time.sleep(0.5)
-                    
-                    # Получаем детали
-                    details = self.get_vacancy_details(vacancy_id)
-                    if not details:
-                        continue
-                    
-                    # Обрабатываем данные
-                    processed_data = self._process_vacancy_data(details)
-                    
-                    # Сохраняем в БД
-                    vacancy, created = self._save_vacancy(processed_data)
-                    
-                    if created:
-                        saved_count += 1
-                    
-                    print(f"Обработано: {i+1}/{max_to_process} - {vacancy.name}")
-                    
-                except Exception as e:
-                    error_msg = f"Ошибка при обработке вакансии {vacancy_data.get('id')}: {str(e)}"
-                    print(error_msg)
-                    errors.append(error_msg)
-                    continue
+            details_list = self.fetch_details(vacancy_ids, workers=workers)
+            batch = self.save_batch(details_list)
+            saved_count = batch['created']
+            errors = batch['errors']
+            
+            # Сбрасываем кэш страниц и API: данные изменились
+            bump_data_version()
             
             # Сохраняем запрос в историю
             if saved_count > 0:
-                SearchQuery.objects.create(
-                    query=params['text'],
+                search_log.record(
+                    params['text'],
                     area=params.get('area', ''),
                     experience=params.get('experience', ''),
                     employment=params.get('employment', ''),
-                    results_count=saved_count
+                    results_count=saved_count,
+                    kind='import'
                 )
             
             result = {
@@ -161,88 +376,45 @@ class HHApiService:
             return {
                 'success': False,
                 'message': error_msg,
-                'count': 0
+                'count': 0,
+                'error': True
             }
     
-    def _process_vacancy_data(self, data: Dict) -> Dict:
-        """Обработка данных вакансии"""
-        
-        # Зарплата
-        salary = data.get('salary')
-        salary_from = salary.get('from') if salary else None
-        salary_to = salary.get('to') if salary else None
-        currency = salary.get('currency', 'RUR') if salary else None
-        salary_gross = salary.get('gross') if salary else None
-        
-        # Дата публикации
-        published_at_str = data.get('published_at', '').replace('Z', '+00:00')
-        try:
-            published_at = make_aware(datetime.fromisoformat(published_at_str))
-        except:
-            published_at = make_aware(datetime.now())
-        
-        # Навыки
-        key_skills = data.get('key_skills', [])
-        skills_text = ', '.join([skill['name'] for skill in key_skills])
-        
-        # Обработка HTML описания (упрощенная)
-        description = data.get('description', '')
-        # Можно добавить очистку HTML тегов здесь
-        
-        return {
-            'hh_id': data['id'],
-            'name': data.get('name', '')[:200],
-            'area': data.get('area', {}).get('name', 'Не указано')[:100],
-            'salary_from': salary_from,
-            'salary_to': salary_to,
-            'currency': currency,
-            'salary_gross': salary_gross,
-            'employer_name': data.get('employer', {}).get('name', '')[:200],
-            'employer_url': data.get('employer', {}).get('alternate_url', ''),
-            'description': description[:10000],
-            'key_skills': skills_text[:500],
-            'experience': data.get('experience', {}).get('name', 'Не указано')[:100],
-            'employment': data.get('employment', {}).get('name', 'Не указано')[:100],
-            'schedule': data.get('schedule', {}).get('name', 'Не указано')[:100],
-            'alternate_url': data.get('alternate_url', ''),
-            'published_at': published_at,
-        }
-    
-    def _save_vacancy(self, data: Dict):
-        """Сохранение вакансии в БД"""
+    def _save_vacancy(self, record: VacancyRecord):
+        """Сохранение одной вакансии в БД: (вакансия, 'insert' | 'update' | None)"""
         with transaction.atomic():
-            vacancy, created = Vacancy.objects.update_or_create(
-                hh_id=data['hh_id'],
-                defaults=data
-            )
-        return vacancy, created
+            vacancy = Vacancy.objects.select_for_update().filter(hh_id=record.hh_id).first()
+            if vacancy is None:
+                vacancy = record.to_model()
+                vacancy.save()
+                changes.log([vacancy.hh_id], 'insert')
+                return vacancy, 'insert'
+            if record.matches({name: getattr(vacancy, name) for name in UPSERT_FIELDS}):
+                return vacancy, None
+            for name in UPSERT_FIELDS:
+                setattr(vacancy, name, getattr(record, name))
+            vacancy.save(update_fields=UPSERT_FIELDS + ['updated_at'])
+            changes.log([vacancy.hh_id], 'update')
+        return vacancy, 'update'
+    
+    def get_area_tree(self) -> List[Dict]:
+        """Дерево регионов HH целиком (/areas)"""
+        self._wait_budget()
+        response = self.session.get(f"{self.BASE_URL}/areas", timeout=30)
+        response.raise_for_status()
+        return loads(response.content)
     
     def get_areas(self) -> List[Dict]:
-        """Получение списка регионов"""
-        try:
-            response = self.session.get(f"{self.BASE_URL}/areas", timeout=10)
-            response.raise_for_status()
-            areas = response.json()
-            
-            # Фильтруем только Россию и популярные города
-            russia = next((area for area in areas if area['name'] == 'Россия'), None)
-            if russia:
-                popular_cities = []
-                for region in russia.get('areas', []):
-                    if region['name'] in ['Москва', 'Санкт-Петербург']:
-                        popular_cities.append({'id': region['id'], 'name': region['name']})
-                    for city in region.get('areas', []):
-                        if city['name'] in ['Екатеринбург', 'Новосибирск', 'Казань', 'Нижний Новгород']:
-                            popular_cities.append({'id': city['id'], 'name': city['name']})
-                
-                return [
-                    {'id': '113', 'name': 'Вся Россия'},
-                    *popular_cities
-                ]
-        except:
-            pass
+        """Получение списка регионов
+
+        Берется из локального справочника (manage.py sync_areas), без
+        запроса к HH на каждое открытие формы.
+        """
+        popular = areas.popular_areas()
+        if popular:
+            return [{'id': '113', 'name': 'Вся Россия'}, *popular]
         
-        # Возвращаем статичный список если API не доступно
+        # Возвращаем статичный список если справочник еще не загружен
         return [
             {'id': '113', 'name': 'Вся Россия'},
             {'id': '1', 'name': 'Москва'},
@@ -0,0 +1,171 @@
+from collections import Counter, defaultdict
+from itertools import permutations
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+
+from .db import chunked
+from .models import Vacancy, Skill, SkillPair
+
+
+def _get_or_create_skills(names: Dict[str, str]) -> Dict[str, Skill]:
+    """Навыки по ключам, недостающие создаются одним запросом"""
+    skills = {skill.key: skill for skill in Skill.objects.filter(key__in=names)}
+    missing = [Skill(key=key, name=names[key][:255]) for key in names if key not in skills]
+    if missing:
+        Skill.objects.bulk_create(missing, ignore_conflicts=True)
+        skills.update({
+            skill.key: skill
+            for skill in Skill.objects.filter(key__in=[skill.key for skill in missing])
+        })
+    return skills
+
+
+def _increment_pairs(increments: List[Tuple[int, int, int]]):
+    """Атомарное увеличение счетчиков пар: INSERT ... ON CONFLICT DO UPDATE
+
+    Новая пара создается, существующей счетчик увеличивается в самой базе,
+    поэтому параллельные импорты не теряют приращения и не падают на
+    уникальном ограничении. Синтаксис поддерживают PostgreSQL и SQLite.
+    """
+    quote = connection.ops.quote_name
+    table = quote(SkillPair._meta.db_table)
+    for start in range(0, len(increments), 500):
+        batch = increments[start:start + 500]
+        values = ', '.join(['(%s, %s, %s)'] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (skill_id, related_id, {quote('count')}) VALUES {values} "
+                f"ON CONFLICT (skill_id, related_id) DO UPDATE "
+                f"SET {quote('count')} = {table}.{quote('count')} + excluded.{quote('count')}",
+                [value for row in batch for value in row]
+            )
+
+
+def _apply_pair_deltas(deltas: Counter):
+    """Изменение счетчиков пар навыков (создание, обновление, удаление)
+
+    Все изменения выполняются арифметикой в базе, без чтения текущих
+    значений: положительные — upsert, отрицательные — UPDATE count = count + delta.
+    Пары, счетчик которых дошел до нуля, удаляются.
+    """
+    deltas = {pair: delta for pair, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    _increment_pairs([
+        (skill_id, related_id, delta)
+        for (skill_id, related_id), delta in sorted(deltas.items()) if delta > 0
+    ])
+
+    decrements = defaultdict(list)
+    for (skill_id, related_id), delta in deltas.items():
+        if delta < 0:
+            decrements[skill_id, delta].append(related_id)
+    for (skill_id, delta), related_ids in sorted(decrements.items()):
+        SkillPair.objects.filter(skill_id=skill_id, related_id__in=related_ids).update(count=F('count') + delta)
+    if decrements:
+        SkillPair.objects.filter(skill_id__in={skill_id for skill_id, _ in decrements}, count__lte=0).delete()
+
+
+def index_vacancies(vacancies: Iterable[Vacancy], remove: bool = False):
+    """Инкрементальное обновление индекса навыков по импортированным вакансиям
+
+    Для каждой вакансии сравнивается текущий набор навыков с тем, что уже
+    учтен в индексе, и применяется только разница. Повторный импорт той
+    же вакансии ничего не меняет. С remove=True вклад вакансий в индекс
+    убирается (перед удалением или архивированием).
+    """
+    vacancies = list(vacancies)
+    if not vacancies:
+        return
+
+    parsed = {
+        vacancy.pk: {} if remove else {Skill.make_key(name): name for name in vacancy.get_skills_list()}
+        for vacancy in vacancies
+    }
+    indexed = {vacancy.pk: {} for vacancy in vacancies}
+    through = Vacancy.skills.through
+    for link in through.objects.filter(vacancy_id__in=indexed).select_related('skill'):
+        indexed[link.vacancy_id][link.skill.key] = link.skill
+
+    with transaction.atomic():
+        all_names = {}
+        for names in parsed.values():
+            all_names.update(names)
+        skills = _get_or_create_skills(all_names)
+
+        count_deltas = Counter()
+        pair_deltas = Counter()
+        links_to_add, links_to_remove = [], []
+
+        for vacancy_id, names in parsed.items():
+            new_ids = {skills[key].pk for key in names}
+            old_ids = {skill.pk for skill in indexed[vacancy_id].values()}
+            if new_ids == old_ids:
+                continue
+
+            for skill_id in new_ids - old_ids:
+                count_deltas[skill_id] += 1
+                links_to_add.append(through(vacancy_id=vacancy_id, skill_id=skill_id))
+            for skill_id in old_ids - new_ids:
+                count_deltas[skill_id] -= 1
+                links_to_remove.append((vacancy_id, skill_id))
+
+            pair_deltas.update(permutations(new_ids, 2))
+            pair_deltas.subtract(permutations(old_ids, 2))
+
+        through.objects.bulk_create(links_to_add, ignore_conflicts=True, batch_size=500)
+        for vacancy_id, skill_id in links_to_remove:
+            through.objects.filter(vacancy_id=vacancy_id, skill_id=skill_id).delete()
+
+        for skill_id, delta in count_deltas.items():
+            if delta:
+                Skill.objects.filter(pk=skill_id).update(vacancy_count=F('vacancy_count') + delta)
+
+        _apply_pair_deltas(pair_deltas)
+
+
+def rebuild(chunk_size: int = 1000) -> int:
+    """Полная перестройка индекса навыков"""
+    with transaction.atomic():
+        Vacancy.skills.through.objects.all().delete()
+        SkillPair.objects.all().delete()
+        Skill.objects.all().delete()
+
+    processed = 0
+    for chunk in chunked(Vacancy.objects.only('pk', 'key_skills').order_by('pk'), chunk_size):
+        index_vacancies(chunk)
+        processed += len(chunk)
+    return processed
+
+
+def related_skills(name: str, limit: int = 10) -> List[Dict]:
+    """Навыки, чаще всего встречающиеся вместе с данным"""
+    skill = Skill.objects.filter(key=Skill.make_key(name)).first()
+    if skill is None:
+        return []
+
+    pairs = SkillPair.objects.filter(skill=skill).select_related('related').order_by('-count')[:limit]
+    return [
+        {
+            'skill': pair.related.name,
+            'count': pair.count,
+            'share': round(pair.count / skill.vacancy_count, 3) if skill.vacancy_count else 0,
+        }
+        for pair in pairs
+    ]
+
+
+def related_skills_for_vacancy(vacancy: Vacancy, limit: int = 10) -> List[Dict]:
+    """Навыки, которых нет в вакансии, но которые часто идут с ее навыками"""
+    own_skills = vacancy.skills.values('pk')
+    rows = (
+        SkillPair.objects.filter(skill__in=own_skills)
+        .exclude(related__in=own_skills)
+        .values('related__name')
+        .annotate(score=Sum('count'))
+        .order_by('-score')[:limit]
+    )
+    return [{'skill': row['related__name'], 'score': row['score']} for row in rows]
@@ -0,0 +1,15 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite-бэкенд, который открывает транзакции через BEGIN IMMEDIATE
+
+    С обычным BEGIN транзакция сначала берет блокировку на чтение, и если
+    две транзакции одновременно пытаются перейти к записи, одна из них
+    сразу получает "database is locked" — busy_timeout тут не помогает.
+    BEGIN IMMEDIATE берет блокировку на запись в начале транзакции,
+    поэтому параллельные импорты просто ждут друг друга.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SavedSearch
+from .services import HHApiService, RequestBudget
+
+# Запас по времени для date_from: вакансии, проиндексированные HH
+# с задержкой, не теряются (повторные просто обновятся)
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+# HH отдает не больше 100 вакансий на страницу
+PAGE_SIZE = 100
+
+
+def due_searches(now=None):
+    """Активные сохраненные поиски, у которых подошло время запуска"""
+    now = now or timezone.now()
+    return SavedSearch.objects.filter(is_active=True).filter(
+        Q(next_run_at__isnull=True) | Q(next_run_at__lte=now)
+    ).order_by('next_run_at')
+
+
+def claim(saved_search: SavedSearch, now) -> bool:
+    """Захват поиска для запуска (защита от параллельных планировщиков)"""
+    next_run_at = now + timedelta(minutes=saved_search.interval_minutes)
+    claimed = SavedSearch.objects.filter(
+        pk=saved_search.pk, next_run_at=saved_search.next_run_at
+    ).update(next_run_at=next_run_at)
+    saved_search.next_run_at = next_run_at
+    return bool(claimed)
+
+
+def run_saved_search(saved_search: SavedSearch, budget: RequestBudget = None) -> Dict:
+    """Загрузка вакансий, опубликованных после водяного знака поиска"""
+    started_at = timezone.now()
+    service = HHApiService(budget=budget)
+    params = saved_search.get_search_params()
+    if saved_search.watermark:
+        params['date_from'] = (saved_search.watermark - WATERMARK_OVERLAP).isoformat(timespec='seconds')
+
+    # Размер страницы постоянный, иначе смещения страниц HH разъедутся
+    per_page = min(PAGE_SIZE, saved_search.max_vacancies)
+    max_pages = -(-saved_search.max_vacancies // per_page)
+
+    imported, failed, complete = 0, None, False
+    for page in range(max_pages):
+        result = service.import_vacancies({**params, 'page': page, 'per_page': per_page})
+        if result.get('error'):
+            failed = result.get('message', 'Неизвестная ошибка')
+            break
+        if not result['success']:
+            # Новых вакансий нет
+            complete = True
+            break
+        imported += result['count']
+        if page + 1 >= result.get('pages', 0):
+            complete = True
+            break
+
+    saved_search.last_run_at = started_at
+    saved_search.last_count = imported
+    if failed:
+        # Водяной знак не двигаем: в следующий раз загрузим пропущенное
+        saved_search.last_status = failed[:255]
+    elif not complete:
+        # Остановились на лимите max_vacancies, а HH отдает самые новые первыми:
+        # более старые вакансии после водяного знака еще не загружены
+        saved_search.last_status = 'Достигнут лимит вакансий, загружено не все'
+    else:
+        saved_search.watermark = started_at
+        saved_search.last_status = 'OK'
+    saved_search.save(update_fields=['last_run_at', 'last_count', 'last_status', 'watermark'])
+
+    return {'id': saved_search.pk, 'name': saved_search.name, 'count': imported, 'error': failed}
+
+
+def _run_in_thread(saved_search: SavedSearch, budget: RequestBudget) -> Dict:
+    try:
+        return run_saved_search(saved_search, budget)
+    finally:
+        # close_old_connections() не закрыл бы соединение при CONN_MAX_AGE > 0,
+        # а поток пула завершается вместе с ним
+        connection.close()
+
+
+def run_due(workers: int = None, rate: float = None) -> List[Dict]:
+    """Запуск всех подошедших поисков в пуле потоков с общим лимитом запросов"""
+    now = timezone.now()
+    budget = RequestBudget(rate or settings.HH_REQUESTS_PER_SECOND)
+    searches = [search for search in due_searches(now) if claim(search, now)]
+    if not searches:
+        return []
+
+    with ThreadPoolExecutor(max_workers=workers or settings.SYNC_WORKERS) as pool:
+        return list(pool.map(lambda search: _run_in_thread(search, budget), searches))
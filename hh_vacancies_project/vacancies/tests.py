@@ -1,3 +1,1215 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from . import (
+    analytics, areas, batch_ops, changes, db, dedup, events, facets, harvest_queue, lookup, matching,
+    responses, retention, rollups, routers, sanitizer, search_log, services, skills, sync, throttle, views, warmup,
+)
+from .cache import bump_data_version, is_cacheable
+from .middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from .models import Vacancy, ArchivedVacancy, SearchQuery, SavedSearch, Skill, SkillPair, VacancyChange, HarvestUnit, BatchOperation, PopularSearch, VacancyRollup
+from .records import FIELDS, VacancyRecord, parse_vacancy
+
+
+@override_settings(REPLICA_DATABASES=['replica_1', 'replica_2'])
+class ReplicaRouterTests(TestCase):
+    """Маршрутизация чтения между основной базой и репликами"""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+        routers._health_cache.clear()
+
+    def tearDown(self):
+        routers.end_request()
+
+    def run_view(self, path, method='get', cookies=None, view=None):
+        """Прогоняет запрос через middleware, возвращает (ответ, базы чтения)"""
+        request = getattr(self.factory, method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        read_dbs = []
+
+        def default_view(request):
+            read_dbs.append(self.router.db_for_read(Vacancy))
+            return HttpResponse()
+
+        def get_response(request):
+            middleware.process_view(request, view or default_view, (), {})
+            return (view or default_view)(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(request), read_dbs
+
+    @mock.patch.object(routers, 'replica_is_healthy', return_value=True)
+    def test_read_only_view_uses_replica(self, healthy):
+        response, read_dbs = self.run_view('/statistics/')
+        self.assertIn(read_dbs[0], ['replica_1', 'replica_2'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @mock.patch.object(routers, 'replica_is_healthy', return_value=True)
+    def test_write_view_uses_primary(self, healthy):
+        _, read_dbs = self.run_view('/import/')
+        self.assertEqual(read_dbs, ['default'])
+
+    @mock.patch.object(routers, 'replica_is_healthy', return_value=True)
+    def test_write_pins_client_to_primary(self, healthy):
+        def import_view(request):
+            self.router.db_for_write(SearchQuery)
+            return HttpResponse()
+
+        response, _ = self.run_view('/import/', method='post', view=import_view)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        _, read_dbs = self.run_view('/statistics/', cookies={PIN_COOKIE: '1'})
+        self.assertEqual(read_dbs, ['default'])
+
+    @mock.patch.object(routers, 'replica_is_healthy', side_effect=lambda alias: alias == 'replica_2')
+    def test_lagging_replica_is_skipped(self, healthy):
+        _, read_dbs = self.run_view('/statistics/')
+        self.assertEqual(read_dbs, ['replica_2'])
+
+    @mock.patch.object(routers, 'replica_lag', return_value=60.0)
+    def test_all_replicas_lagging_falls_back_to_primary(self, lag):
+        _, read_dbs = self.run_view('/statistics/')
+        self.assertEqual(read_dbs, ['default'])
+
+    @mock.patch.object(routers, 'replica_is_healthy', return_value=True)
+    def test_replica_is_chosen_once_per_request(self, healthy):
+        def view(request):
+            for _ in range(20):
+                read_dbs.append(self.router.db_for_read(Vacancy))
+            return HttpResponse()
+
+        read_dbs = []
+        with mock.patch.object(routers.random, 'choice', side_effect=lambda replicas: replicas[0]) as choice:
+            self.run_view('/statistics/', view=view)
+        self.assertEqual(choice.call_count, 1)
+        self.assertEqual(set(read_dbs), {'replica_1'})
+
+    def test_sqlite_replica_lag_from_change_log(self):
+        now = timezone.now()
+        latest = {'default': now, 'replica_1': now - timedelta(seconds=30), 'replica_2': now}
+        sqlite = mock.Mock(vendor='sqlite')
+        with mock.patch.object(routers, 'connections', {'replica_1': sqlite, 'replica_2': sqlite}), \
+                mock.patch.object(routers, '_latest_change', side_effect=latest.get):
+            self.assertEqual(routers.replica_lag('replica_1'), 30.0)
+            self.assertEqual(routers.replica_lag('replica_2'), 0.0)
+            latest['replica_2'] = None
+            self.assertEqual(routers.replica_lag('replica_2'), float('inf'))
+
+        # Копия совпадает с основной базой: журнал читается в обеих одинаково
+        changes.log([1], 'insert')
+        self.assertEqual(routers.replica_lag('default'), 0.0)
+
+    @override_settings(REPLICA_MAX_LAG=5)
+    def test_lagging_or_broken_replica_is_unhealthy(self):
+        with mock.patch.object(routers, 'replica_lag', side_effect={'replica_1': 30.0, 'replica_2': 1.0}.get):
+            self.assertFalse(routers.replica_is_healthy('replica_1'))
+            self.assertTrue(routers.replica_is_healthy('replica_2'))
+        routers._health_cache.clear()
+        with mock.patch.object(routers, 'replica_lag', side_effect=DatabaseError('нет файла')):
+            self.assertFalse(routers.replica_is_healthy('replica_2'))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica_1', 'vacancies'))
+        self.assertTrue(self.router.allow_migrate('default', 'vacancies'))
+
+
+
+class DatabaseHelperTests(TestCase):
+    """Настройка соединений SQLite и оценка количества строк"""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_new_sqlite_connections_get_pragmas(self):
+        # Тестовая база открыта уже после подключения обработчика connection_created
+        self.assertEqual(self.pragma('cache_size'), -64000)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -2000, 'temp_store': 'MEMORY'})
+    def test_pragmas_come_from_settings(self):
+        try:
+            db.configure_sqlite_connection(None, connection)
+            self.assertEqual(self.pragma('cache_size'), -2000)
+            self.assertEqual(self.pragma('temp_store'), 2)
+        finally:
+            db.configure_sqlite_connection(None, connection)
+
+    def test_other_vendors_are_skipped(self):
+        other = mock.Mock(vendor='postgresql')
+        db.configure_sqlite_connection(None, other)
+        other.cursor.assert_not_called()
+
+    def make_vacancies(self, count):
+        Vacancy.objects.bulk_create([
+            Vacancy(hh_id=hh_id, name='Вакансия', employer_name='Компания') for hh_id in range(1, count + 1)
+        ])
+
+    def test_chunked_sizes_at_boundary(self):
+        self.make_vacancies(6)
+        queryset = Vacancy.objects.order_by('hh_id').values_list('hh_id', flat=True)
+        self.assertEqual([len(chunk) for chunk in db.chunked(queryset, 3)], [3, 3])
+        self.assertEqual([len(chunk) for chunk in db.chunked(queryset, 4)], [4, 2])
+        self.assertEqual([len(chunk) for chunk in db.chunked(queryset, 6)], [6])
+        self.assertEqual([chunk for chunk in db.chunked(queryset, 5)], [[1, 2, 3, 4, 5], [6]])
+        self.assertEqual(list(db.chunked(queryset.none(), 3)), [])
+
+    def test_delete_in_batches(self):
+        self.make_vacancies(7)
+        # 6 строк пачками по 4: два DELETE (4 + 2), третья выборка пуста
+        with mock.patch.object(Vacancy._base_manager, 'using', wraps=Vacancy._base_manager.using) as using:
+            deleted = db.delete_in_batches(Vacancy.objects.filter(hh_id__gt=1), batch_size=4)
+        self.assertEqual(deleted, 6)
+        self.assertEqual(using.call_count, 2)
+        self.assertEqual(list(Vacancy.objects.values_list('hh_id', flat=True)), [1])
+
+    def test_delete_in_batches_exact_multiple(self):
+        self.make_vacancies(6)
+        self.assertEqual(db.delete_in_batches(Vacancy.objects.all(), batch_size=3), 6)
+        self.assertFalse(Vacancy.objects.exists())
+        self.assertEqual(db.delete_in_batches(Vacancy.objects.all(), batch_size=3), 0)
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=1000)
+    def test_estimated_count(self):
+        for hh_id in (1, 2, 3):
+            Vacancy.objects.create(hh_id=hh_id, name='Вакансия', employer_name='Компания')
+        # SQLite: всегда точный COUNT(*)
+        self.assertEqual(db.estimated_count(Vacancy.objects.all()), 3)
+
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value = cursor
+        postgres = mock.Mock(vendor='postgresql', cursor=mock.Mock(return_value=cursor))
+        with mock.patch.object(db, 'connections', {'default': postgres}):
+            cursor.fetchone.return_value = (250000,)
+            self.assertEqual(db.estimated_count(Vacancy.objects.all()), 250000)
+            # Маленькая таблица и фильтр — точный подсчет
+            cursor.fetchone.return_value = (10,)
+            self.assertEqual(db.estimated_count(Vacancy.objects.all()), 3)
+            cursor.fetchone.return_value = (250000,)
+            self.assertEqual(db.estimated_count(Vacancy.objects.filter(hh_id__lt=3)), 2)
+
+
+class CachedPageTests(TestCase):
+    """Кэш готовых страниц для анонимных пользователей"""
+
+    def setUp(self):
+        cache.clear()
+        self.vacancy = Vacancy.objects.create(hh_id=1, name='Аналитик', employer_name='Компания')
+        self.url = '/vacancies/1/'
+
+    def tearDown(self):
+        cache.clear()
+
+    def rename(self, name):
+        Vacancy.objects.filter(pk=self.vacancy.pk).update(name=name)
+
+    def test_anonymous_page_is_served_from_cache(self):
+        self.assertContains(self.client.get(self.url), 'Аналитик')
+        self.rename('Тестировщик')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Аналитик')
+
+    def test_data_version_bump_invalidates_pages(self):
+        self.client.get(self.url)
+        self.rename('Тестировщик')
+        bump_data_version()
+        self.assertContains(self.client.get(self.url), 'Тестировщик')
+
+    def test_authenticated_users_bypass_cache(self):
+        self.client.force_login(User.objects.create_user('admin'))
+        self.client.get(self.url)
+        self.rename('Тестировщик')
+        self.assertContains(self.client.get(self.url), 'Тестировщик')
+
+    def test_pending_messages_bypass_cache(self):
+        request = RequestFactory().get(self.url)
+        request.user = AnonymousUser()
+        request.session = {}
+        self.assertTrue(is_cacheable(request))
+        request.session = {'_messages': '[]'}
+        self.assertFalse(is_cacheable(request))
+        request.session, request.COOKIES['messages'] = {}, 'x'
+        self.assertFalse(is_cacheable(request))
+        self.assertFalse(is_cacheable(RequestFactory().post(self.url)))
+
+    def test_cached_pages_do_not_load_search_history(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(self.url)
+        self.assertFalse([query for query in captured.captured_queries if 'popularsearch' in query['sql']])
+
+    @mock.patch.object(services.HHApiService, 'test_connection', return_value=True)
+    @mock.patch.object(services.HHApiService, 'get_areas', return_value=[])
+    def test_search_page_shows_fresh_history(self, get_areas, test_connection):
+        buffer = search_log.SearchLogBuffer()
+        with mock.patch.object(buffer, '_ensure_thread'):
+            buffer.record('Kotlin')
+        buffer.flush()
+        self.assertContains(self.client.get('/search/'), 'Kotlin')
+
+
+@override_settings(DESCRIPTION_WORKERS=1)
+class ImportCommandTests(TestCase):
+    """Команда import_vacancies с подмененным HH API"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(services.use_process_pool, False)
+        patcher = mock.patch.object(search_log, 'record')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def details(self, vacancy_ids, workers=1):
+        return [{'id': vacancy_id, 'name': f'Вакансия {vacancy_id}', 'area': {'name': 'Москва'}} for vacancy_id in vacancy_ids]
+
+    def test_imports_all_pages(self):
+        pages = [
+            {'found': 3, 'pages': 2, 'items': [{'id': '1'}, {'id': '2'}]},
+            {'found': 3, 'pages': 2, 'items': [{'id': '3'}]},
+        ]
+        stdout = StringIO()
+        with mock.patch.object(services.HHApiService, 'search_vacancies', side_effect=pages), \
+                mock.patch.object(services.HHApiService, 'fetch_details', side_effect=self.details):
+            call_command('import_vacancies', '--text', 'python', '--per-page', '2', '--rps', '0',
+                         '--summary', '-', stdout=stdout, stderr=StringIO())
+
+        summary = json.loads(stdout.getvalue())
+        self.assertEqual((summary['found'], summary['pages'], summary['created']), (3, 2, 3))
+        self.assertEqual(sorted(Vacancy.objects.values_list('hh_id', flat=True)), [1, 2, 3])
+
+    def test_api_error_raises_command_error(self):
+        with mock.patch.object(services.HHApiService, 'search_vacancies', return_value={'error': 'HTTP 503'}):
+            with self.assertRaises(CommandError):
+                call_command('import_vacancies', '--rps', '0', stdout=StringIO(), stderr=StringIO())
+
+class SavedSearchWatermarkTests(TestCase):
+    """Водяной знак сохраненного поиска сдвигается только после полной загрузки"""
+
+    def setUp(self):
+        self.old_watermark = timezone.now() - timedelta(days=1)
+        self.search = SavedSearch.objects.create(
+            name='Python', query='python', max_vacancies=100, watermark=self.old_watermark
+        )
+
+    def run_search(self, **result):
+        response = {'success': True, 'count': 100, 'pages': 1, **result}
+        with mock.patch.object(sync.HHApiService, 'import_vacancies', return_value=response):
+            sync.run_saved_search(self.search)
+        self.search.refresh_from_db()
+
+    def test_complete_run_moves_watermark(self):
+        self.run_search(pages=1)
+        self.assertGreater(self.search.watermark, self.old_watermark)
+        self.assertEqual(self.search.last_status, 'OK')
+
+    def test_run_stopped_at_limit_keeps_watermark(self):
+        self.run_search(pages=3)
+        self.assertEqual(self.search.watermark, self.old_watermark)
+        self.assertEqual(self.search.last_count, 100)
+
+    def test_failed_run_keeps_watermark(self):
+        self.run_search(success=False, error=True, message='Ошибка HH API', count=0)
+        self.assertEqual(self.search.watermark, self.old_watermark)
+
+
+
+class RetentionTests(TestCase):
+    """Архивирование закрытых и устаревших вакансий"""
+
+    def make_vacancy(self, hh_id, days_ago=0, **fields):
+        return Vacancy.objects.create(
+            hh_id=hh_id, name='Вакансия', employer_name='Компания', area='Москва',
+            published_at=timezone.now() - timedelta(days=days_ago), **fields
+        )
+
+    def test_expired_vacancies(self):
+        self.make_vacancy(1, days_ago=40)
+        self.make_vacancy(2, days_ago=10)
+        self.assertEqual(list(retention.expired_vacancies(30).values_list('hh_id', flat=True)), [1])
+
+    def test_closed_on_hh(self):
+        responses = {
+            1: ('ok', {'archived': True}),
+            2: ('ok', {'archived': False}),
+            3: ('not_found', None),
+            4: ('error', None),
+        }
+        service = mock.Mock(get_vacancy=lambda hh_id: responses[hh_id])
+        closed, checked = retention.closed_on_hh([1, 2, 3, 4], service)
+        self.assertEqual(closed, [1, 3])
+        # Вакансия с ошибкой запроса не считается проверенной
+        self.assertEqual(checked, [1, 2, 3])
+
+    def test_archive_moves_vacancies_in_batches(self):
+        for hh_id in range(1, 6):
+            self.make_vacancy(hh_id, days_ago=40, salary_from=100000, key_skills='Python, Django')
+        skills.index_vacancies(list(Vacancy.objects.all()))
+        batches = []
+
+        archived = retention.archive(Vacancy.objects.all(), 'expired', batch_size=2, progress=batches.append)
+
+        self.assertEqual(archived, 5)
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertFalse(Vacancy.objects.exists())
+        self.assertFalse(SkillPair.objects.exists())
+        self.assertEqual(
+            set(VacancyChange.objects.filter(op='delete').values_list('hh_id', flat=True)), {1, 2, 3, 4, 5}
+        )
+        record = ArchivedVacancy.objects.get(hh_id=3)
+        self.assertEqual((record.reason, record.salary_from, record.area), ('expired', 100000, 'Москва'))
+        self.assertEqual(record.get_payload()['key_skills'], 'Python, Django')
+
+
+class CompactTests(TransactionTestCase):
+    """Сжатие SQLite после удаления вакансий"""
+
+    def test_incremental_vacuum_frees_all_pages(self):
+        # Переводим базу в режим auto_vacuum=INCREMENTAL
+        retention.compact(full=True)
+        Vacancy.objects.bulk_create([
+            Vacancy(hh_id=hh_id, name='Вакансия', employer_name='Компания', description='x' * 4000)
+            for hh_id in range(1, 301)
+        ])
+        retention.remove(Vacancy.objects.all(), batch_size=100)
+
+        stats = retention.compact()
+        self.assertGreater(stats['free_pages_before'], 100)
+        self.assertEqual(stats['free_pages_after'], 0)
+
+class SanitizerTests(TestCase):
+    """Очистка HTML описаний вакансий"""
+
+    def test_script_and_style_are_dropped_with_content(self):
+        html, text = sanitizer.process_description(
+            '<p>До<script>alert(1)</script><style>p{}</style> после</p>'
+        )
+        self.assertEqual(html, '<p>До после</p>')
+        self.assertNotIn('alert', text)
+
+    def test_event_handlers_and_attributes_are_removed(self):
+        html, _ = sanitizer.process_description('<p onclick="alert(1)" style="x">Текст<img src=x onerror=alert(1)></p>')
+        self.assertEqual(html, '<p>Текст</p>')
+
+    def test_javascript_links_lose_href(self):
+        html, _ = sanitizer.process_description(
+            '<a href=" JavaScript:alert(1)">раз</a><a href="https://hh.ru/?a=1&b=2">два</a>'
+        )
+        self.assertIn('<a>раз</a>', html)
+        self.assertIn('href="https://hh.ru/?a=1&amp;b=2"', html)
+        self.assertNotIn('javascript', html.lower())
+
+    def test_text_is_escaped(self):
+        html, text = sanitizer.process_description('<p>&lt;script&gt;x&lt;/script&gt;</p>')
+        self.assertEqual(html, '<p>&lt;script&gt;x&lt;/script&gt;</p>')
+        self.assertEqual(text, '<script>x</script>')
+
+    def test_truncation_does_not_break_entities(self):
+        limit = sanitizer.MAX_DESCRIPTION_LENGTH
+        for padding in range(limit - 8, limit - 2):
+            html, _ = sanitizer.process_description('<p>' + 'a' * padding + '&amp;&amp;&amp;</p>')
+            self.assertLessEqual(len(html), limit + len('</p>'))
+            self.assertNotRegex(html, r'&(?!amp;|lt;|gt;)')
+            self.assertTrue(html.endswith('</p>'))
+
+    def test_truncation_closes_open_tags(self):
+        html, _ = sanitizer.process_description('<ul>' + '<li><b>пункт</b></li>' * 2000 + '</ul>')
+        self.assertLessEqual(len(html), sanitizer.MAX_DESCRIPTION_LENGTH + len('</b></li></ul>'))
+        self.assertTrue(html.endswith('</ul>'))
+        self.assertEqual(html.count('<li>'), html.count('</li>'))
+
+
+@override_settings(DESCRIPTION_WORKERS=4, DESCRIPTION_POOL_MIN_BATCH=2)
+class DescriptionPoolTests(TestCase):
+    """Пул процессов для описаний — только в командах и только в главном потоке"""
+
+    def tearDown(self):
+        services.use_process_pool(False)
+
+    def test_inline_without_opt_in(self):
+        with mock.patch.object(services, '_get_pool') as get_pool:
+            result = services.process_descriptions(['<p>a</p>', '<p>b</p>'])
+        get_pool.assert_not_called()
+        self.assertEqual(result, [('<p>a</p>', 'a'), ('<p>b</p>', 'b')])
+
+    def test_inline_in_worker_threads(self):
+        services.use_process_pool()
+        with mock.patch.object(services, '_get_pool') as get_pool:
+            thread = threading.Thread(target=services.process_descriptions, args=(['<p>a</p>', '<p>b</p>'],))
+            thread.start()
+            thread.join()
+        get_pool.assert_not_called()
+
+
+class SkillPairIndexTests(TestCase):
+    """Счетчики пар навыков меняются арифметикой в базе"""
+
+    def make_vacancy(self, hh_id, key_skills):
+        return Vacancy.objects.create(hh_id=hh_id, name='Вакансия', employer_name='Компания', key_skills=key_skills)
+
+    def pair_counts(self):
+        return {
+            (pair.skill.key, pair.related.key): pair.count
+            for pair in SkillPair.objects.select_related('skill', 'related')
+        }
+
+    def test_index_and_remove(self):
+        first = self.make_vacancy(1, 'Python, Django')
+        second = self.make_vacancy(2, 'Python, Django, SQL')
+        skills.index_vacancies([first, second])
+        counts = self.pair_counts()
+        self.assertEqual(counts['python', 'django'], 2)
+        self.assertEqual(counts['sql', 'python'], 1)
+
+        skills.index_vacancies([second], remove=True)
+        self.assertEqual(self.pair_counts(), {('python', 'django'): 1, ('django', 'python'): 1})
+
+    def test_increment_of_pair_created_concurrently(self):
+        python, django = Skill.objects.create(key='python', name='Python'), Skill.objects.create(key='django', name='Django')
+        # Другой импорт успел создать пару между чтением и записью
+        SkillPair.objects.create(skill=python, related=django, count=3)
+        skills._apply_pair_deltas(Counter({(python.pk, django.pk): 2, (django.pk, python.pk): 1}))
+        self.assertEqual(SkillPair.objects.get(skill=python, related=django).count, 5)
+        self.assertEqual(SkillPair.objects.get(skill=django, related=python).count, 1)
+
+        skills._apply_pair_deltas(Counter({(python.pk, django.pk): -5, (django.pk, python.pk): -1}))
+        self.assertFalse(SkillPair.objects.exists())
+
+
+@override_settings(API_THROTTLE_ENABLED=False, SYNC_WORKERS=1)
+class VacancyLookupTests(TestCase):
+    """Поиск вакансий по hh_id: кэш отсутствия и проверка параметров"""
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_only_confirmed_404_is_cached_as_missing(self):
+        with mock.patch.object(services.HHApiService, 'get_vacancy', side_effect=[('not_found', None), ('error', None)]):
+            result = lookup.lookup_vacancies([1, 2], ['name'])
+        self.assertEqual(result['missing'], [1, 2])
+
+        with mock.patch.object(services.HHApiService, 'get_vacancy', return_value=('error', None)) as get_vacancy:
+            lookup.lookup_vacancies([1, 2], ['name'])
+        # 404 взят из кэша, после ошибки вакансия запрашивается снова
+        self.assertEqual([call.args[0] for call in get_vacancy.call_args_list], [2])
+
+    def test_fields_must_be_a_list_of_strings(self):
+        for fields in (5, 'name', ['name', 5]):
+            response = self.client.post(
+                '/api/vacancies/lookup/', {'ids': [1], 'fields': fields}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400, fields)
+
+    def test_ids_must_be_a_list(self):
+        response = self.client.post('/api/vacancies/lookup/', {'ids': '12'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+
+class AreaFilterTests(TestCase):
+    """Фильтр по региону: подрегионы по замыканию и название для вакансий без привязки"""
+
+    def setUp(self):
+        areas.sync_tree([
+            {'id': '113', 'name': 'Россия', 'areas': [
+                {'id': '1', 'name': 'Москва', 'areas': []},
+                {'id': '2019', 'name': 'Московская область', 'areas': [
+                    {'id': '2020', 'name': 'Химки', 'areas': []},
+                ]},
+                {'id': '88', 'name': 'Казань', 'areas': []},
+            ]},
+        ])
+        for hh_id, area, area_ref_id in (
+            (1, 'Москва', 1), (2, 'Химки', 2020), (3, 'Москва', None),
+            (4, 'Московская область', None), (5, 'Москва', 88),
+        ):
+            Vacancy.objects.create(hh_id=hh_id, name='Вакансия', employer_name='Компания', area=area, area_ref_id=area_ref_id)
+
+    def filtered(self, value):
+        return sorted(Vacancy.objects.filter(areas.area_q(value)).values_list('hh_id', flat=True))
+
+    def test_region_includes_subregions(self):
+        self.assertEqual(self.filtered('113'), [1, 2, 5])
+        self.assertEqual(self.filtered('2019'), [2])
+        self.assertEqual(sorted(areas.region_ids('Московская область')), [2019, 2020])
+
+    def test_name_matches_subtree_and_unlinked_vacancies(self):
+        # «Москва» не совпадает с «Московская область», а привязанная к Казани
+        # вакансия с «Москвой» в тексте региона не попадает в выдачу
+        self.assertEqual(self.filtered('Москва'), [1, 3])
+        self.assertEqual(self.filtered('Московская область'), [2, 4])
+        self.assertEqual(self.filtered('Химки'), [2])
+
+
+class DuplicateClusterTests(TestCase):
+    """Поиск повторных публикаций: MinHash, корзины LSH и кластеры"""
+
+    PYTHON = 'Разрабатываем сервисы на Python и Django, пишем тесты, проводим код-ревью и следим за качеством кода'
+    JAVA = 'Поддерживаем платежный шлюз на Java и Spring, проектируем очереди сообщений и отвечаем за отказоустойчивость'
+
+    def make_vacancy(self, hh_id, text, employer='Компания'):
+        vacancy = Vacancy.objects.create(
+            hh_id=hh_id, name='Разработчик', employer_name=employer, description_text=text
+        )
+        dedup.assign_clusters([vacancy])
+        vacancy.refresh_from_db()
+        return vacancy
+
+    def test_signature_similarity(self):
+        first = Vacancy(name='Разработчик', employer_name='Компания', description_text=self.PYTHON)
+        same = Vacancy(name='Разработчик', employer_name='Компания', description_text=self.PYTHON)
+        other = Vacancy(name='Разработчик', employer_name='Компания', description_text=self.JAVA)
+        self.assertEqual(dedup.similarity(dedup.signature(first), dedup.signature(same)), 1.0)
+        self.assertLess(dedup.similarity(dedup.signature(first), dedup.signature(other)), 0.3)
+        self.assertEqual(len(list(dedup.band_hashes(dedup.signature(first)))), dedup.BANDS)
+        self.assertIsNone(dedup.signature(Vacancy(name='', employer_name='', description_text='')))
+
+    def test_reposted_vacancy_joins_cluster(self):
+        first = self.make_vacancy(1, self.PYTHON)
+        repost = self.make_vacancy(2, self.PYTHON)
+        other = self.make_vacancy(3, self.JAVA)
+        self.assertEqual((first.cluster_id, first.is_duplicate), (first.pk, False))
+        self.assertEqual((repost.cluster_id, repost.is_duplicate), (first.pk, True))
+        self.assertEqual((other.cluster_id, other.is_duplicate), (other.pk, False))
+
+    def test_head_leaving_cluster_hands_it_over(self):
+        head = self.make_vacancy(1, self.PYTHON)
+        second = self.make_vacancy(2, self.PYTHON)
+        third = self.make_vacancy(3, self.PYTHON)
+        java = self.make_vacancy(4, self.JAVA)
+
+        # Работодатель переписал головную вакансию, теперь она повторяет java
+        Vacancy.objects.filter(pk=head.pk).update(description_text=self.JAVA)
+        dedup.assign_clusters([Vacancy.objects.get(pk=head.pk)])
+
+        clusters = dict(Vacancy.objects.values_list('pk', 'cluster_id'))
+        self.assertEqual(clusters[head.pk], java.pk)
+        self.assertEqual(clusters[second.pk], second.pk)
+        self.assertEqual(clusters[third.pk], second.pk)
+        self.assertEqual(
+            set(Vacancy.objects.filter(is_duplicate=False).values_list('pk', flat=True)), {second.pk, java.pk}
+        )
+
+    def test_rebuild_restores_clusters(self):
+        first = self.make_vacancy(1, self.PYTHON)
+        self.make_vacancy(2, self.PYTHON)
+        Vacancy.objects.update(cluster_id=None, is_duplicate=False)
+        self.assertEqual(dedup.rebuild(), 2)
+        self.assertEqual(list(Vacancy.objects.order_by('pk').values_list('cluster_id', 'is_duplicate')),
+                         [(first.pk, False), (first.pk, True)])
+
+
+class AnalyticsSummaryTests(TestCase):
+    """Показатели страницы статистики из векторных расчетов"""
+
+    def setUp(self):
+        cache.clear()
+        rows = [
+            (1, 'Яндекс', 100000, 150000, 'RUR', 'Python, Django'),
+            (2, 'Яндекс', 200000, None, 'RUR', 'Python, SQL'),
+            (3, 'Сбер', None, 300000, 'RUR', 'Java'),
+            (4, 'Сбер', 5000, 9000, 'USD', 'Python'),
+            (5, 'Озон', None, None, None, ''),
+        ]
+        for hh_id, employer, low, high, currency, key_skills in rows:
+            Vacancy.objects.create(
+                hh_id=hh_id, name='Вакансия', employer_name=employer, salary_from=low, salary_to=high,
+                currency=currency, key_skills=key_skills, experience='Нет опыта'
+            )
+        # Повторная публикация в статистике не учитывается
+        Vacancy.objects.create(hh_id=6, name='Вакансия', employer_name='Дубль', salary_to=900000,
+                               currency='RUR', is_duplicate=True)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_summary(self):
+        summary = analytics.compute_summary()
+        self.assertEqual(summary['vacancy_count'], 5)
+        self.assertEqual(summary['employer_count'], 3)
+        self.assertEqual(
+            [(item['employer_name'], item['count']) for item in summary['top_employers']],
+            [('Сбер', 2), ('Яндекс', 2), ('Озон', 1)]
+        )
+        # Зарплаты только в рублях: вилка в долларах не смешивается с рублевыми
+        self.assertEqual(summary['avg_salary'], 150000)
+        self.assertEqual(summary['max_salary'], 300000)
+        self.assertEqual(summary['salary_percentiles']['p50'], 200000)
+        self.assertEqual(sum(item['count'] for item in summary['salary_histogram']), 3)
+        self.assertEqual(summary['popular_skills'][0], ('Python', 3))
+        self.assertEqual(summary['salary_by_experience'][0]['count'], 3)
+        cooccurrence = summary['skill_cooccurrence']
+        python, django = cooccurrence['skills'].index('Python'), cooccurrence['skills'].index('Django')
+        self.assertEqual(cooccurrence['matrix'][python][django], 1)
+
+    def test_empty_table(self):
+        summary = analytics.compute_summary(Vacancy.objects.none())
+        self.assertEqual((summary['vacancy_count'], summary['avg_salary'], summary['top_employers']), (0, None, []))
+        self.assertEqual(summary['salary_percentiles'], {})
+
+    def test_statistics_page_uses_summary(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/statistics/')
+        self.assertEqual(response.context['unique_vacancies'], 5)
+        self.assertEqual(response.context['total_employers'], 3)
+        self.assertEqual(response.context['max_salary'], 300000)
+        self.assertFalse([query for query in captured.captured_queries if 'COUNT(DISTINCT' in query['sql'].upper()])
+
+class MatchIndexTests(TestCase):
+    """Индекс подбора по навыкам: фильтр региона и фоновая перестройка"""
+
+    def setUp(self):
+        matching._index, matching._index_version, matching._building = None, None, False
+
+    tearDown = setUp
+
+    def test_area_name_fallback_for_unlinked_vacancies(self):
+        python = Skill.objects.create(key='python', name='Python')
+        for hh_id, area in ((1, 'Москва'), (2, 'Московская область'), (3, 'Казань')):
+            vacancy = Vacancy.objects.create(hh_id=hh_id, name='Вакансия', employer_name='Компания', area=area)
+            vacancy.skills.add(python)
+
+        result = matching.match('Python', area='москва', fields=['hh_id'])
+        self.assertEqual([item['vacancy']['hh_id'] for item in result['items']], [1])
+        self.assertEqual(matching.match('Python', area='1', fields=['hh_id'])['items'], [])
+
+    @override_settings(MATCH_INDEX_MIN_AGE=0)
+    def test_stale_index_is_rebuilt_in_background(self):
+        old, new = mock.Mock(built_at=0), mock.Mock()
+        started, release = threading.Event(), threading.Event()
+
+        def build():
+            started.set()
+            release.wait(5)
+            return new
+
+        matching._index, matching._index_version = old, -1
+        with mock.patch.object(matching.MatchIndex, 'from_db', side_effect=build):
+            self.assertIs(matching.get_index(), old)
+            self.assertTrue(started.wait(5))
+            # Пока новый индекс строится, запросы получают прежний и не ждут
+            self.assertIs(matching.get_index(), old)
+            release.set()
+            for _ in range(100):
+                if not matching._building:
+                    break
+                time.sleep(0.01)
+        self.assertIs(matching.get_index(), new)
+
+    @override_settings(API_THROTTLE_ENABLED=False)
+    def test_api_fields_must_be_a_list_of_strings(self):
+        for fields in (5, 'name'):
+            response = self.client.post('/api/match/', {'skills': ['Python'], 'fields': fields}, content_type='application/json')
+            self.assertEqual(response.status_code, 400, fields)
+
+
+@override_settings(
+    API_THROTTLE_ENABLED=True, API_THROTTLE_RATE=1, API_THROTTLE_BURST=3,
+    API_MAX_CONCURRENT=1, API_SHED_RETRY_AFTER=2, API_THROTTLE_CLIENT_HEADER='HTTP_X_FORWARDED_FOR',
+)
+class ThrottleTests(TestCase):
+    """Корзина токенов, 429 с Retry-After и сброс нагрузки"""
+
+    def setUp(self):
+        caches[throttle.THROTTLE_CACHE].clear()
+        self.factory = RequestFactory()
+
+    def make_request(self, forwarded_for='10.0.0.1'):
+        request = self.factory.get('/api/test/', HTTP_X_FORWARDED_FOR=forwarded_for)
+        request.user = AnonymousUser()
+        return request
+
+    def test_client_is_rightmost_forwarded_address(self):
+        request = self.make_request('1.2.3.4, 10.0.0.1')
+        self.assertEqual(throttle.client_id(request), 'ip:10.0.0.1')
+
+    def test_spoofed_forwarded_for_shares_bucket(self):
+        view = throttle.throttle(cost=3)(lambda request: HttpResponse())
+        self.assertEqual(view(self.make_request('1.1.1.1, 10.0.0.1')).status_code, 200)
+        self.assertEqual(view(self.make_request('2.2.2.2, 10.0.0.1')).status_code, 429)
+
+    def test_bucket_refills_over_time(self):
+        limiter = throttle.TokenBucketLimiter()
+        with mock.patch.object(throttle.time, 'time', return_value=1000.0):
+            self.assertEqual(limiter.take('ip:a', 3), 0)
+            self.assertAlmostEqual(limiter.take('ip:a', 2), 2.0)
+        with mock.patch.object(throttle.time, 'time', return_value=1002.0):
+            # За 2 секунды при 1 токене в секунду набралось 2 токена
+            self.assertEqual(limiter.take('ip:a', 2), 0)
+        with mock.patch.object(throttle.time, 'time', return_value=1100.0):
+            # Корзина не переполняется сверх API_THROTTLE_BURST
+            self.assertEqual(limiter.take('ip:a', 3), 0)
+            self.assertGreater(limiter.take('ip:a', 1), 0)
+
+    def test_exhausted_bucket_returns_429_with_retry_after(self):
+        view = throttle.throttle(cost=2)(lambda request: HttpResponse())
+        with mock.patch.object(throttle.time, 'time', return_value=1000.0):
+            self.assertEqual(view(self.make_request()).status_code, 200)
+            response = view(self.make_request())
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_concurrent_requests_are_shed(self):
+        responses = []
+
+        def slow_view(request):
+            # Пока первый запрос выполняется, второй сверх API_MAX_CONCURRENT=1 сбрасывается
+            responses.append(inner(self.make_request('10.0.0.2')))
+            return HttpResponse()
+
+        outer = throttle.throttle(cost=1)(slow_view)
+        inner = throttle.throttle(cost=1)(lambda request: HttpResponse())
+        self.assertEqual(outer(self.make_request()).status_code, 200)
+        self.assertEqual(responses[0].status_code, 429)
+        self.assertEqual(responses[0]['Retry-After'], '2')
+        self.assertEqual(throttle._concurrency.active, 0)
+
+
+
+class VacancyRecordTests(TestCase):
+    """Записи вакансий из ответа HH"""
+
+    def test_record_has_no_instance_dict(self):
+        record = parse_vacancy({'id': '7', 'name': 'Разработчик', 'area': {'name': 'Москва'}}, ('', ''))
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(set(VacancyRecord.__slots__), set(FIELDS))
+        self.assertEqual((record.hh_id, record.name, record.area), (7, 'Разработчик', 'Москва'))
+
+
+@override_settings(API_THROTTLE_ENABLED=False, EVENTS_MAX_CLIENTS=2)
+class EventStreamTests(TestCase):
+    """/api/events/: поток только под ASGI и ограничение числа клиентов"""
+
+    def asgi_request(self):
+        return AsyncRequestFactory().get('/api/events/')
+
+    def test_wsgi_gets_no_content(self):
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.content, b'')
+
+    def test_asgi_gets_event_stream(self):
+        with mock.patch.object(type(events.publisher), 'subscribers', new_callable=mock.PropertyMock, return_value=1):
+            response = views.api_events(self.asgi_request())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    def test_too_many_streams(self):
+        with mock.patch.object(type(events.publisher), 'subscribers', new_callable=mock.PropertyMock, return_value=2):
+            response = views.api_events(self.asgi_request())
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+
+@override_settings(API_THROTTLE_ENABLED=False)
+class ChangeFeedTests(TestCase):
+    """Журнал изменений: классификация при импорте, курсор, 410 и схлопывание повторов"""
+
+    def make_record(self, hh_id, name='Разработчик'):
+        return VacancyRecord(
+            hh_id=hh_id, name=name, area='Москва', area_ref_id=None, salary_from=None, salary_to=None,
+            currency='RUR', employer_name='Компания', employer_url='', description='', description_text='',
+            key_skills='', experience='', employment='', schedule='', alternate_url='',
+            published_at=timezone.now(),
+        )
+
+    def get_changes(self, **params):
+        return self.client.get('/api/changes/', {'fields': 'hh_id,name', **params})
+
+    def test_import_logs_insert_then_update(self):
+        service = services.HHApiService()
+        created, updated = service._save_records([self.make_record(1)])
+        self.assertEqual(([v.hh_id for v in created], updated), ([1], []))
+        created, updated = service._save_records([self.make_record(1, 'Старший разработчик'), self.make_record(2)])
+        self.assertEqual([v.hh_id for v in created], [2])
+        self.assertEqual([v.hh_id for v in updated], [1])
+        self.assertEqual(
+            list(VacancyChange.objects.values_list('hh_id', 'op')),
+            [(1, 'insert'), (2, 'insert'), (1, 'update')]
+        )
+
+    def test_cursor_pages_and_latest_change_wins(self):
+        service = services.HHApiService()
+        service._save_records([self.make_record(1), self.make_record(2)])
+        service._save_records([self.make_record(1, 'Старший разработчик')])
+
+        data = self.get_changes(since=0).json()
+        # Вставка 1 пропущена: дальше в журнале ее обновление, отдается текущее состояние
+        self.assertEqual([(c['hh_id'], c['op']) for c in data['changes']], [(2, 'insert'), (1, 'update')])
+        self.assertEqual(data['changes'][1]['vacancy']['name'], 'Старший разработчик')
+
+        data = self.get_changes(since=0, limit=2).json()
+        self.assertEqual([(c['hh_id'], c['op']) for c in data['changes']], [(1, 'insert'), (2, 'insert')])
+        self.assertTrue(data['has_more'])
+        data = self.get_changes(since=data['next'], limit=2).json()
+        self.assertEqual([(c['hh_id'], c['op']) for c in data['changes']], [(1, 'update')])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.get_changes(since=data['next']).json()['changes'], [])
+
+    def test_cursor_older_than_log_is_gone(self):
+        changes.log([1, 2, 3], 'delete')
+        first = VacancyChange.objects.order_by('pk').values_list('pk', flat=True).first()
+        VacancyChange.objects.filter(pk=first).delete()
+        response = self.get_changes(since=0)
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()['oldest'], first)
+        self.assertEqual(self.get_changes(since=first).status_code, 200)
+
+
+class HarvestQueueTests(TestCase):
+    """Очередь распределенного импорта: захват, аренда, истечение и повтор"""
+
+    def setUp(self):
+        self.units = HarvestUnit.objects.bulk_create(
+            [HarvestUnit(job='job', params={'area': '1'}, page=page) for page in range(2)]
+        )
+
+    def test_unit_is_claimed_by_one_worker(self):
+        first = harvest_queue.claim('job', 'a', 60, 3)
+        second = harvest_queue.claim('job', 'b', 60, 3)
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual((first.status, first.lease_owner, first.attempts), ('leased', 'a', 1))
+        self.assertIsNone(harvest_queue.claim('job', 'c', 60, 3))
+
+    def test_expired_lease_is_reclaimed(self):
+        unit = harvest_queue.claim('job', 'a', 60, 3)
+        HarvestUnit.objects.exclude(pk=unit.pk).update(status='done')
+        HarvestUnit.objects.filter(pk=unit.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        reclaimed = harvest_queue.claim('job', 'b', 60, 3)
+        self.assertEqual((reclaimed.pk, reclaimed.lease_owner, reclaimed.attempts), (unit.pk, 'b', 2))
+        # Прежний владелец аренду потерял и отметить единицу не может
+        self.assertFalse(harvest_queue.complete(unit, 'a', {'fetched': 0, 'created': 0, 'updated': 0}))
+        self.assertTrue(harvest_queue.complete(reclaimed, 'b', {'fetched': 1, 'created': 1, 'updated': 0}))
+
+    def test_reap_fails_units_out_of_attempts(self):
+        HarvestUnit.objects.update(status='leased', attempts=3, lease_expires_at=timezone.now() - timedelta(seconds=1))
+        HarvestUnit.objects.filter(pk=self.units[1].pk).update(attempts=1)
+        self.assertEqual(harvest_queue.reap_expired('job', 3), 1)
+        self.assertEqual(HarvestUnit.objects.get(pk=self.units[0].pk).status, 'failed')
+        self.assertEqual(HarvestUnit.objects.get(pk=self.units[1].pk).status, 'leased')
+
+    def test_release_requeues_until_attempts_run_out(self):
+        unit = harvest_queue.claim('job', 'a', 60, 2)
+        harvest_queue.release(unit, 'a', 'ошибка', 2)
+        self.assertEqual(HarvestUnit.objects.get(pk=unit.pk).status, 'pending')
+        unit = HarvestUnit.objects.get(pk=unit.pk)
+        unit.attempts = 2
+        HarvestUnit.objects.filter(pk=unit.pk).update(status='leased', lease_owner='a', attempts=2)
+        harvest_queue.release(unit, 'a', 'ошибка', 2)
+        self.assertEqual(HarvestUnit.objects.get(pk=unit.pk).status, 'failed')
+
+    def test_unit_with_failed_details_is_not_done(self):
+        service = mock.Mock()
+        service.search_vacancies.return_value = {'items': [{'id': '1'}, {'id': '2'}, {'id': '3'}]}
+        service.fetch_vacancies.return_value = [
+            ('1', 'ok', {'id': '1'}), ('2', 'not_found', None), ('3', 'error', None),
+        ]
+        service.save_batch.return_value = {'created': 1, 'updated': 0, 'errors': []}
+        with self.assertRaisesRegex(RuntimeError, 'Не загружены детали 1 вакансий: 3'):
+            harvest_queue.process_unit(self.units[0], service)
+        service.save_batch.assert_called_once_with([{'id': '1'}])
+
+        service.fetch_vacancies.return_value = [('1', 'ok', {'id': '1'}), ('2', 'not_found', None)]
+        result = harvest_queue.process_unit(self.units[0], service)
+        self.assertEqual((result['fetched'], result['created']), (3, 1))
+
+
+@override_settings(BATCH_OPERATIONS_IN_WEB=False, BATCH_OPERATION_STALE_SECONDS=60)
+class BatchOperationTests(TestCase):
+    """Массовые операции: очередь, захват и продолжение после перезапуска"""
+
+    def setUp(self):
+        for hh_id in range(1, 6):
+            Vacancy.objects.create(hh_id=hh_id, name='Вакансия', employer_name='Компания' if hh_id < 5 else 'Другая')
+
+    def test_queued_operation_runs_from_command(self):
+        operation = batch_ops.start('delete', Vacancy.objects.filter(employer_name='Компания'), total=4)
+        self.assertEqual(operation.status, 'pending')
+        self.assertEqual(batch_ops.run_pending(batch_size=3), 1)
+
+        operation.refresh_from_db()
+        self.assertEqual((operation.status, operation.processed), ('done', 4))
+        self.assertEqual(list(Vacancy.objects.values_list('hh_id', flat=True)), [5])
+
+    def test_interrupted_operation_is_resumed(self):
+        operation = batch_ops.start('delete', Vacancy.objects.filter(employer_name='Компания'), total=4)
+        # Процесс взял операцию, удалил две вакансии и был перезапущен
+        Vacancy.objects.filter(hh_id__in=[1, 2]).delete()
+        BatchOperation.objects.filter(pk=operation.pk).update(
+            status='running', processed=2, heartbeat_at=timezone.now() - timedelta(seconds=120)
+        )
+        self.assertEqual(batch_ops.run_pending(), 1)
+
+        operation.refresh_from_db()
+        self.assertEqual((operation.status, operation.processed), ('done', 4))
+        self.assertEqual(Vacancy.objects.count(), 1)
+
+    def test_running_operation_is_not_claimed_twice(self):
+        operation = batch_ops.start('delete', Vacancy.objects.all())
+        self.assertIsNotNone(batch_ops.claim(operation.pk))
+        self.assertIsNone(batch_ops.claim(operation.pk))
+        self.assertEqual(batch_ops.run_pending(), 0)
+
+
+@override_settings(SEARCH_LOG_FLUSH_INTERVAL=3600, SEARCH_LOG_MAX_BUFFER=100, SEARCH_LOG_MAX_PENDING=3)
+class SearchLogBufferTests(TestCase):
+    """Буфер истории запросов: время запроса и повтор после ошибки записи"""
+
+    def setUp(self):
+        self.buffer = search_log.SearchLogBuffer()
+        patcher = mock.patch.object(self.buffer, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_search_date_is_time_of_request(self):
+        searched_at = timezone.now() - timedelta(minutes=10)
+        with mock.patch.object(search_log.timezone, 'now', return_value=searched_at):
+            self.buffer.record('Python')
+        self.buffer.flush()
+        self.assertEqual(SearchQuery.objects.get().search_date, searched_at)
+
+    def test_failed_flush_requeues_rows(self):
+        self.buffer.record('Python')
+        self.buffer.record('python')
+        with mock.patch.object(SearchQuery.objects, 'bulk_create', side_effect=RuntimeError('база недоступна')):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.pending(), 2)
+
+        self.buffer.record('Python')
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(SearchQuery.objects.count(), 3)
+        self.assertEqual(PopularSearch.objects.get().hit_count, 3)
+
+    def test_requeue_is_bounded(self):
+        for query in ('a', 'b', 'c'):
+            self.buffer.record(query)
+        with mock.patch.object(SearchQuery.objects, 'bulk_create', side_effect=RuntimeError):
+            self.buffer.flush()
+        self.buffer.record('d')
+        self.buffer.record('e')
+        self.assertEqual(self.buffer.pending(), 5)
+        with mock.patch.object(SearchQuery.objects, 'bulk_create', side_effect=RuntimeError):
+            self.buffer.flush()
+        # Остаются самые новые SEARCH_LOG_MAX_PENDING записей
+        self.assertEqual(self.buffer.pending(), 3)
+        self.buffer.flush()
+        self.assertEqual(sorted(SearchQuery.objects.values_list('query', flat=True)), ['c', 'd', 'e'])
+
+
+class FacetFilterTests(TestCase):
+    """Фильтры списка вакансий совпадают с количествами по фасетам"""
+
+    def setUp(self):
+        cache.clear()
+        vacancies = [
+            Vacancy.objects.create(hh_id=hh_id, name='Вакансия', employer_name='Компания', experience=experience)
+            for hh_id, experience in ((1, 'Нет опыта'), (2, 'Нет опыта'), (3, 'Нет опыта (стажировка)'))
+        ]
+        facets.index_vacancies(vacancies)
+
+    def test_selected_value_matches_its_count(self):
+        counts = {item['value']: item['count'] for item in facets.facet_counts(Vacancy.objects.all())['experience']}
+        queryset = facets.filter_by_value(Vacancy.objects.all(), 'experience', 'Нет опыта')
+        self.assertEqual(queryset.count(), counts['Нет опыта'])
+        self.assertEqual(sorted(queryset.values_list('hh_id', flat=True)), [1, 2])
+
+    def test_unknown_value_falls_back_to_substring(self):
+        queryset = facets.filter_by_value(Vacancy.objects.all(), 'experience', 'стажировка')
+        self.assertEqual(list(queryset.values_list('hh_id', flat=True)), [3])
+
+    def test_list_view_uses_facet_filter(self):
+        response = self.client.get('/vacancies/', {'experience': 'Нет опыта'})
+        self.assertEqual(response.context['paginator'].count, 2)
+        self.assertEqual(response.context['total_count'], 2)
+
+    def test_api_uses_facet_filter(self):
+        data = self.client.get('/api/vacancies/', {'experience': 'Нет опыта', 'fields': 'hh_id'}).json()
+        self.assertEqual(sorted(item['hh_id'] for item in data['items']), [1, 2])
+
+    def test_archive_payload_has_no_facets(self):
+        queries = []
+        for reason, hh_ids in (('expired', [1]), ('manual', [2, 3])):
+            with CaptureQueriesContext(connection) as captured:
+                retention.archive(Vacancy.objects.filter(hh_id__in=hh_ids), reason)
+            queries.append(sum(
+                query['sql'].startswith('SELECT') and 'vacancies_vacancy_facets' in query['sql']
+                for query in captured.captured_queries
+            ))
+        # Связи с фасетами читаются одним запросом на пачку, а не на вакансию
+        self.assertEqual(queries, [1, 1])
+        self.assertNotIn('facets', ArchivedVacancy.objects.get(hh_id=2).get_payload())
+
+
+class RollupTests(TestCase):
+    """Агрегаты динамики: перцентили гистограммы и инкрементальные изменения"""
+
+    def make_vacancy(self, hh_id, **fields):
+        fields = {'name': 'Вакансия', 'employer_name': 'Компания', 'area': 'Москва', 'currency': 'RUR', **fields}
+        return Vacancy.objects.create(hh_id=hh_id, **fields)
+
+    def rollup(self, dimension, value):
+        return VacancyRollup.objects.filter(period='day', dimension=dimension, value=value).first()
+
+    def test_percentile_interpolates_inside_bucket(self):
+        # 10 зарплат в корзине [100 000; 105 000)
+        histogram = {'20': 10}
+        self.assertEqual(rollups.histogram_percentile(histogram, 0.5), 102500)
+        self.assertEqual(rollups.histogram_percentile(histogram, 1.0), 105000)
+
+    def test_percentile_across_buckets(self):
+        histogram = {'10': 1, '20': 2, '30': 1}
+        self.assertEqual(rollups.histogram_percentile(histogram, 0.25), 55000)
+        self.assertEqual(rollups.histogram_percentile(histogram, 0.5), 102500)
+        self.assertEqual(rollups.histogram_percentile(histogram, 0.75), 105000)
+        self.assertIsNone(rollups.histogram_percentile({}, 0.5))
+
+    def test_salary_bucket_is_capped(self):
+        self.assertEqual(rollups.salary_bucket(10 ** 9), rollups.SALARY_BUCKETS - 1)
+        self.assertEqual(rollups.salary_bucket(-1), 0)
+
+    def test_update_moves_contribution(self):
+        vacancy = self.make_vacancy(1, salary_from=100000, salary_to=100000)
+        rollups.update_vacancies({}, [vacancy])
+        previous = rollups.snapshot([1])
+
+        Vacancy.objects.filter(pk=vacancy.pk).update(area='Казань', salary_from=200000, salary_to=200000)
+        vacancy.refresh_from_db()
+        rollups.update_vacancies(previous, [vacancy])
+
+        self.assertIsNone(self.rollup('area', 'Москва'))
+        kazan = self.rollup('area', 'Казань')
+        self.assertEqual((kazan.count, kazan.salary_sum, kazan.salary_histogram), (1, 200000, {'40': 1}))
+        employer = self.rollup('employer', 'Компания')
+        self.assertEqual((employer.count, employer.salary_count, employer.salary_sum), (1, 1, 200000))
+
+    def test_unchanged_reimport_is_not_counted_twice(self):
+        vacancy = self.make_vacancy(1)
+        rollups.update_vacancies({}, [vacancy])
+        rollups.update_vacancies(rollups.snapshot([1]), [vacancy])
+        self.assertEqual(self.rollup('area', 'Москва').count, 1)
+
+    def test_vacancy_marked_duplicate_is_removed(self):
+        vacancy = self.make_vacancy(1)
+        rollups.update_vacancies({}, [vacancy])
+        previous = rollups.snapshot([1])
+        Vacancy.objects.filter(pk=vacancy.pk).update(is_duplicate=True)
+        vacancy.refresh_from_db()
+        rollups.update_vacancies(previous, [vacancy])
+        self.assertFalse(VacancyRollup.objects.exists())
+
+
+@override_settings(API_THROTTLE_ENABLED=False)
+class VacancyBatchApiTests(TestCase):
+    """Пакетная выдача /api/vacancies/: границы limit и курсор"""
+
+    def setUp(self):
+        cache.clear()
+        for hh_id in (1, 2, 3):
+            Vacancy.objects.create(hh_id=hh_id, name='Вакансия', employer_name='Компания')
+
+    def test_limit_is_clamped(self):
+        for limit in ('0', '-5'):
+            data = self.client.get('/api/vacancies/', {'limit': limit, 'fields': 'hh_id'}).json()
+            self.assertEqual(data['count'], 1, limit)
+            self.assertIsNotNone(data['next'])
+
+    def test_response_is_brotli_compressed(self):
+        for hh_id in range(4, 40):
+            Vacancy.objects.create(hh_id=hh_id, name='Вакансия', employer_name='Компания')
+        response = self.client.get('/api/vacancies/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_missing_codecs_are_reported(self):
+        self.assertEqual(responses.check_codecs(None), [])
+        with mock.patch.object(responses, 'brotli', None):
+            self.assertEqual([warning.id for warning in responses.check_codecs(None)], ['vacancies.W001'])
+
+    def test_cursor_walks_all_rows(self):
+        seen, after = [], 0
+        while after is not None:
+            data = self.client.get('/api/vacancies/', {'after': after, 'limit': 2, 'fields': 'hh_id'}).json()
+            seen += [item['hh_id'] for item in data['items']]
+            after = data['next']
+        self.assertEqual(sorted(seen), [1, 2, 3])
+
+
+class WarmupTests(TestCase):
+    """Прогрев процесса при запуске"""
+
+    def setUp(self):
+        cache.clear()
+        # Внутри транзакции теста соединение закрывать нельзя
+        patcher = mock.patch.object(warmup, 'connections')
+        self.connections = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_template_names_are_project_templates(self):
+        names = warmup.template_names(engines['django'])
+        self.assertIn('vacancies/vacancy_list.html', names)
+        self.assertIn('vacancies/statistics.html', names)
+        self.assertIn('admin/vacancies/vacancy/batch_confirm.html', names)
+        # Шаблоны установленных пакетов (django.contrib.admin) компилируются через extends, а не по списку
+        self.assertNotIn('admin/base.html', names)
+
+    def test_run_times_enabled_steps(self):
+        steps = []
+        timings = warmup.run(progress=lambda name, count, seconds: steps.append((name, count)))
+        self.assertEqual(list(timings), ['modules', 'templates', 'data'])
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+        self.assertEqual([name for name, _ in steps], ['modules', 'templates', 'data'])
+        self.assertTrue(all(count > 0 for _, count in steps))
+        self.connections.close_all.assert_called_once()
+
+    def test_run_skips_disabled_steps(self):
+        self.assertEqual(list(warmup.run(templates=False, data=False)), ['modules'])
+
+    @override_settings(WARMUP_ON_STARTUP=True)
+    def test_startup_survives_failed_warmup(self):
+        with mock.patch.object(warmup, 'run', side_effect=RuntimeError('база недоступна')) as run:
+            warmup.on_startup()
+        run.assert_called_once_with(data=settings.WARMUP_DATA, match_index=settings.WARMUP_MATCH_INDEX)
+
+
+class ProductionSettingsTests(TestCase):
+    """Профиль production без SECRET_KEY не запускается"""
+
+    def load_settings(self, **env):
+        environ = {key: value for key, value in os.environ.items() if key not in ('SECRET_KEY', 'DJANGO_PROFILE')}
+        return subprocess.run(
+            [sys.executable, '-c', 'import hh_vacancies_project.settings'],
+            cwd=settings.BASE_DIR, env={**environ, **env}, capture_output=True, text=True,
+        )
+
+    def test_production_requires_secret_key(self):
+        result = self.load_settings(DJANGO_PROFILE='production')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('ImproperlyConfigured', result.stderr)
+        self.assertEqual(self.load_settings(DJANGO_PROFILE='production', SECRET_KEY='x' * 50).returncode, 0)
+        self.assertEqual(self.load_settings().returncode, 0)
@@ -0,0 +1,182 @@
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .responses import json_response
+
+# Алиас кэша с корзинами токенов (см. CACHES в settings)
+THROTTLE_CACHE = 'throttle'
+
+
+def client_id(request) -> str:
+    """Идентификатор клиента: пользователь или IP-адрес
+
+    За прокси адрес берется из заголовка API_THROTTLE_CLIENT_HEADER
+    (например, HTTP_X_FORWARDED_FOR) — последний адрес в списке: его
+    дописал наш прокси. Начало списка присылает сам клиент, и по нему
+    можно было бы получать новую корзину на каждый запрос.
+    """
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    address = ''
+    if settings.API_THROTTLE_CLIENT_HEADER:
+        address = request.META.get(settings.API_THROTTLE_CLIENT_HEADER, '').split(',')[-1].strip()
+    return f"ip:{address or request.META.get('REMOTE_ADDR', '')}"
+
+
+class TokenBucketLimiter:
+    """Ограничение частоты запросов клиента корзиной токенов
+
+    Корзина вмещает API_THROTTLE_BURST токенов и пополняется со
+    скоростью API_THROTTLE_RATE токенов в секунду; запрос списывает
+    столько токенов, сколько стоит представление. Состояние корзин
+    лежит в кэше THROTTLE_CACHE (LocMemCache, общий для всех потоков
+    процесса), чтение и запись корзины выполняются под блокировкой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def take(self, client: str, cost: float) -> float:
+        """Списание cost токенов; 0 — запрос разрешен, иначе сколько секунд ждать"""
+        rate, burst = settings.API_THROTTLE_RATE, settings.API_THROTTLE_BURST
+        cost = min(cost, burst)
+        key = f'throttle:{client}'
+        cache = caches[THROTTLE_CACHE]
+
+        with self._lock:
+            now = time.time()
+            state = cache.get(key)
+            tokens, stamp = state if state else (burst, now)
+            tokens = min(burst, tokens + (now - stamp) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            # Полная корзина не отличается от отсутствующей: запись живет, пока пополняется
+            cache.set(key, (tokens, now), timeout=math.ceil(burst / rate) + 1)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Сброс нагрузки: не больше API_MAX_CONCURRENT запросов API одновременно в процессе"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.active >= settings.API_MAX_CONCURRENT:
+                return False
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+class ThrottleMetrics:
+    """Счетчики ограничений по представлениям (в памяти процесса)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {'allowed': 0, 'throttled': 0, 'shed': 0})
+        self.started_at = time.time()
+
+    def count(self, view: str, outcome: str):
+        with self._lock:
+            self._counters[view][outcome] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            views = {view: dict(counters) for view, counters in sorted(self._counters.items())}
+        totals = {'allowed': 0, 'throttled': 0, 'shed': 0}
+        for counters in views.values():
+            for outcome, value in counters.items():
+                totals[outcome] += value
+        return {
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started_at, 1),
+            'active': _concurrency.active,
+            'peak_active': _concurrency.peak,
+            'limits': {
+                'rate': settings.API_THROTTLE_RATE,
+                'burst': settings.API_THROTTLE_BURST,
+                'max_concurrent': settings.API_MAX_CONCURRENT,
+            },
+            'totals': totals,
+            'views': views,
+        }
+
+
+_buckets = TokenBucketLimiter()
+_concurrency = ConcurrencyLimiter()
+metrics = ThrottleMetrics()
+
+
+def _too_many(message: str, retry_after: float):
+    response = json_response({'error': message, 'retry_after': math.ceil(retry_after)}, status=429)
+    response['Retry-After'] = str(max(math.ceil(retry_after), 1))
+    return response
+
+
+def throttle(cost: float = 1):
+    """Декоратор представления API: корзина токенов клиента и лимит одновременных запросов
+
+    Превышение частоты и перегрузка процесса отдают 429 с заголовком
+    Retry-After. Потоковые ответы держат слот только до начала отдачи.
+    """
+    def decorator(view):
+        name = view.__name__
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.API_THROTTLE_ENABLED:
+                return view(request, *args, **kwargs)
+
+            wait = _buckets.take(client_id(request), cost)
+            if wait:
+                metrics.count(name, 'throttled')
+                return _too_many('Too many requests', wait)
+
+            if not _concurrency.acquire():
+                metrics.count(name, 'shed')
+                return _too_many('Server is busy, retry later', settings.API_SHED_RETRY_AFTER)
+
+            metrics.count(name, 'allowed')
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _concurrency.release()
+
+        return wrapper
+    return decorator
+
+
+def prometheus_text(snapshot: Dict) -> str:
+    """Метрики в текстовом формате Prometheus"""
+    lines = [
+        '# TYPE hh_api_requests_total counter',
+    ]
+    for view, counters in snapshot['views'].items():
+        for outcome, value in counters.items():
+            lines.append(f'hh_api_requests_total{{view="{view}",outcome="{outcome}",pid="{snapshot["pid"]}"}} {value}')
+    lines += [
+        '# TYPE hh_api_active_requests gauge',
+        f'hh_api_active_requests{{pid="{snapshot["pid"]}"}} {snapshot["active"]}',
+        '# TYPE hh_api_peak_active_requests gauge',
+        f'hh_api_peak_active_requests{{pid="{snapshot["pid"]}"}} {snapshot["peak_active"]}',
+    ]
+    return '\n'.join(lines) + '\n'
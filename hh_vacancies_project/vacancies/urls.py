@@ -9,10 +9,22 @@ urlpatterns = [
     path('search/', views.SearchView.as_view(), name='search'),
     path('import/', views.ImportVacanciesView.as_view(), name='import_vacancies'),
     path('statistics/', views.StatisticsView.as_view(), name='statistics'),
+    path('trends/', views.TrendsView.as_view(), name='trends'),
+    path('match/', views.MatchView.as_view(), name='match'),
     
     # API endpoints
     path('api/search/', views.api_vacancy_search, name='api_search'),
     path('api/stats/', views.api_get_statistics, name='api_stats'),
+    path('api/events/', views.api_events, name='api_events'),
+    path('api/vacancies/', views.api_vacancies, name='api_vacancies'),
+    path('api/vacancies/lookup/', views.api_vacancy_lookup, name='api_vacancy_lookup'),
+    path('api/changes/', views.api_changes, name='api_changes'),
+    path('api/match/', views.api_match, name='api_match'),
+    path('api/trends/', views.api_trends, name='api_trends'),
+    path('api/areas/', views.api_area_breakdown, name='api_area_breakdown'),
+    path('api/skills/related/', views.api_related_skills, name='api_related_skills'),
+    path('api/vacancies/<int:hh_id>/related-skills/', views.api_vacancy_related_skills, name='api_vacancy_related_skills'),
+    path('api/metrics/throttle/', views.api_throttle_metrics, name='api_throttle_metrics'),
     
     # Утилиты
     path('clear-db/', views.clear_database, name='clear_db'),
@@ -1,27 +1,37 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, TemplateView
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q, Count, Avg, Max, Min
+from django.db.models import Q, Avg
 from django.contrib import messages
-from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import etag, require_GET, require_http_methods
+from django.conf import settings
 from django.db import transaction
 from datetime import datetime, timedelta
 import json
 
-from .models import Vacancy, SearchQuery
+from .models import Vacancy, SearchQuery, VacancyRollup, Skill, SkillPair, LshBucket, FacetValue, PopularSearch
 from .forms import SearchForm, ImportForm
 from .services import HHApiService
+from .db import delete_in_batches, estimated_count, text_search_q
+from .cache import CachedPageMixin, bump_data_version, get_or_compute, json_etag
+from .responses import compress, dumps, json_response
+from .throttle import metrics as throttle_metrics, prometheus_text, throttle
+from . import analytics, areas, changes, events, facets, lookup, matching, rollups, search_log, skills
 
 
-class HomeView(TemplateView):
+class HomeView(CachedPageMixin, TemplateView):
     """Главная страница"""
+    cache_prefix = 'home'
     template_name = 'vacancies/home.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
         # Статистика для главной страницы
-        context['total_vacancies'] = Vacancy.objects.count()
+        context['total_vacancies'] = estimated_count(Vacancy.objects.all())
         
         # Количество уникальных работодателей
         context['total_employers'] = Vacancy.objects.values('employer_name').distinct().count()
@@ -42,8 +52,19 @@ class HomeView(TemplateView):
         return context
 
 
-class VacancyListView(ListView):
+# GET-параметры списка вакансий для каждого фасета
+FACET_PARAMS = {
+    'area': 'area',
+    'experience': 'experience',
+    'employment': 'employment',
+    'schedule': 'schedule',
+    'salary': 'salary_band',
+}
+
+
+class VacancyListView(CachedPageMixin, ListView):
     """Список всех вакансий с поиском и фильтрацией"""
+    cache_prefix = 'vacancy_list'
     model = Vacancy
     template_name = 'vacancies/vacancy_list.html'
     context_object_name = 'vacancies'
@@ -52,28 +73,33 @@ class VacancyListView(ListView):
     def get_queryset(self):
         queryset = Vacancy.objects.all()
         
-        # Поиск по ключевым словам
-        search_query = self.request.GET.get('q', '').strip()
+        # Повторные публикации одной вакансии показываем один раз
+        if not self.request.GET.get('duplicates'):
+            queryset = queryset.filter(is_duplicate=False)
+        
+        # Поиск по ключевым словам (q — из шапки, query — из формы фильтров)
+        search_query = (self.request.GET.get('q') or self.request.GET.get('query', '')).strip()
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(key_skills__icontains=search_query) |
-                Q(employer_name__icontains=search_query)
-            )
+            queryset = queryset.filter(text_search_q(
+                search_query, ['name', 'description_text', 'key_skills', 'employer_name']
+            ))
         
         # Фильтры
+        # Регион с подрегионами по справочнику (id или название)
         area = self.request.GET.get('area')
         if area:
-            queryset = queryset.filter(area__icontains=area)
+            queryset = queryset.filter(areas.area_q(area))
         
-        experience = self.request.GET.get('experience')
-        if experience:
-            queryset = queryset.filter(experience__icontains=experience)
+        # Опыт, занятость и график — по индексу фасетов, как и количества в форме
+        for facet in ('experience', 'employment', 'schedule'):
+            value = self.request.GET.get(facet)
+            if value:
+                queryset = facets.filter_by_value(queryset, facet, value)
         
-        employment = self.request.GET.get('employment')
-        if employment:
-            queryset = queryset.filter(employment__icontains=employment)
+        # Зарплатный диапазон из фасета (по индексу фасетов)
+        salary_band = self.request.GET.get('salary_band')
+        if salary_band:
+            queryset = queryset.filter(facets__facet='salary', facets__value=salary_band)
         
         # Фильтр по зарплате
         salary_from = self.request.GET.get('salary_from')
@@ -100,17 +126,53 @@ class VacancyListView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Форма поиска с текущими параметрами
-        context['search_form'] = SearchForm(self.request.GET or None)
+        # Количество вакансий по значениям фасетов для текущего поиска
+        counts = facets.facet_counts(self.object_list)
+        
+        # Форма поиска с текущими параметрами, варианты — с количеством вакансий
+        search_form = SearchForm(self.request.GET or None)
+        for name in ('area', 'experience', 'employment'):
+            field = search_form.fields[name]
+            selected = self.request.GET.get(name, '')
+            choices = [field.choices[0]] + [
+                (item['value'], f"{item['value']} ({item['count']})") for item in counts[name]
+            ]
+            if selected and selected not in dict(choices):
+                choices.append((selected, selected))
+            field.choices = choices
+        context['search_form'] = search_form
+        
+        context['facets'] = self.get_facet_links(counts)
         
-        # Общее количество отфильтрованных вакансий
-        context['total_count'] = self.get_queryset().count()
+        # Общее количество отфильтрованных вакансий (уже посчитано пагинатором)
+        context['total_count'] = context['paginator'].count
         
         return context
+    
+    def get_facet_links(self, counts):
+        """Значения фасетов со ссылками, включающими/снимающими фильтр"""
+        result = []
+        for facet, label in FacetValue.FACET_CHOICES:
+            param = FACET_PARAMS[facet]
+            selected = self.request.GET.get(param, '')
+            values = []
+            for item in counts[facet]:
+                params = self.request.GET.copy()
+                params.pop('page', None)
+                active = item['value'] == selected
+                if active:
+                    params.pop(param, None)
+                else:
+                    params[param] = item['value']
+                values.append({**item, 'active': active, 'url': f'?{params.urlencode()}'})
+            if values:
+                result.append({'facet': facet, 'label': label, 'values': values})
+        return result
 
 
-class VacancyDetailView(DetailView):
+class VacancyDetailView(CachedPageMixin, DetailView):
     """Детальная информация о вакансии"""
+    cache_prefix = 'vacancy_detail'
     model = Vacancy
     template_name = 'vacancies/vacancy_detail.html'
     context_object_name = 'vacancy'
@@ -127,10 +189,10 @@ class VacancyDetailView(DetailView):
         vacancy = self.object
         
         # Разбиваем ключевые навыки
-        if vacancy.key_skills:
-            context['key_skills'] = [skill.strip() for skill in vacancy.key_skills.split(',') if skill.strip()]
-        else:
-            context['key_skills'] = []
+        context['key_skills'] = vacancy.get_skills_list()
+        
+        # Навыки, которые часто требуют вместе с навыками этой вакансии
+        context['related_skills'] = skills.related_skills_for_vacancy(vacancy, limit=8)
         
         # Похожие вакансии
         similar_vacancies = Vacancy.objects.filter(
@@ -140,6 +202,12 @@ class VacancyDetailView(DetailView):
         
         context['similar_vacancies'] = similar_vacancies
         
+        # Повторные публикации этой же вакансии
+        if vacancy.cluster_id:
+            context['duplicates'] = Vacancy.objects.filter(
+                cluster_id=vacancy.cluster_id
+            ).exclude(id=vacancy.id).only('hh_id', 'name', 'employer_name', 'published_at')[:10]
+        
         return context
 
 
@@ -183,12 +251,11 @@ class SearchView(TemplateView):
             # Сохраняем поисковый запрос в историю
             search_data = form.cleaned_data
             
-            SearchQuery.objects.create(
-                query=search_data.get('query', ''),
+            search_log.record(
+                search_data.get('query', ''),
                 area=search_data.get('area', ''),
                 experience=search_data.get('experience', ''),
                 employment=search_data.get('employment', ''),
-                results_count=0  # Будет обновлено после поиска
             )
             
             # Формируем URL для редиректа
@@ -276,6 +343,8 @@ class ImportVacanciesView(TemplateView):
             
             # Запускаем импорт
             result = api_service.import_vacancies(search_params)
+            # Запись об импорте нужна в истории на этой же странице, не ждем фоновый сброс
+            search_log.flush()
             
             if result['success']:
                 messages.success(
@@ -298,121 +367,500 @@ class ImportVacanciesView(TemplateView):
         return self.render_to_response(context)
 
 
-class StatisticsView(TemplateView):
+class StatisticsView(CachedPageMixin, TemplateView):
     """Статистика по вакансиям"""
+    cache_prefix = 'statistics'
     template_name = 'vacancies/statistics.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Основная статистика
-        context['total_vacancies'] = Vacancy.objects.count()
-        context['total_employers'] = Vacancy.objects.values('employer_name').distinct().count()
-        
-        # Статистика по зарплате
-        salary_stats = Vacancy.objects.aggregate(
-            avg_salary_from=Avg('salary_from'),
-            avg_salary_to=Avg('salary_to'),
-            max_salary=Max('salary_to'),
-            min_salary=Min('salary_from')
-        )
-        context['salary_stats'] = salary_stats
-        
-        # Статистика по опыту
-        experience_stats = Vacancy.objects.values('experience').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        context['experience_stats'] = experience_stats
-        
-        # Статистика по регионам
-        area_stats = Vacancy.objects.values('area').annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
-        context['area_stats'] = area_stats
-        
-        # Топ работодателей
-        top_employers = Vacancy.objects.values('employer_name').annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
-        context['top_employers'] = top_employers
-        
-        # Популярные навыки
-        all_skills = []
-        vacancies = Vacancy.objects.exclude(key_skills='')
-        for vacancy in vacancies:
-            if vacancy.key_skills:
-                skills = [s.strip() for s in vacancy.key_skills.split(',') if s.strip()]
-                all_skills.extend(skills)
-        
-        from collections import Counter
-        skill_counter = Counter(all_skills)
-        popular_skills = skill_counter.most_common(15)
-        context['popular_skills'] = popular_skills
+        # Все показатели, кроме общего числа строк, считаются в analytics за один
+        # проход по таблице без дубликатов и кэшируются до следующего импорта
+        summary = analytics.get_summary()
+        context['total_vacancies'] = estimated_count(Vacancy.objects.all())
+        context['unique_vacancies'] = summary['vacancy_count']
+        context['total_employers'] = summary['employer_count']
+        context['top_employers'] = summary['top_employers']
+        context['avg_salary'] = summary['avg_salary']
+        context['max_salary'] = summary['max_salary']
+        
+        # Перцентили, гистограмма, зарплата по опыту и навыки
+        context['salary_percentiles'] = summary['salary_percentiles']
+        context['salary_histogram'] = summary['salary_histogram']
+        context['salary_by_experience'] = summary['salary_by_experience']
+        context['salary_bands'] = summary['salary_bands']
+        context['popular_skills'] = summary['popular_skills']
+        context['skill_cooccurrence'] = summary['skill_cooccurrence']
         
         return context
 
 
+class TrendsView(TemplateView):
+    """Динамика спроса и зарплат по предагрегированным данным"""
+    template_name = 'vacancies/trends.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['dimensions'] = VacancyRollup.DIMENSION_CHOICES
+        context['periods'] = VacancyRollup.PERIOD_CHOICES
+        context['top_skills'] = rollups.get_top_values('skill', limit=15)
+        return context
+
+
+class MatchView(TemplateView):
+    """Подбор вакансий по списку навыков пользователя"""
+    template_name = 'vacancies/match.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        skills_text = self.request.GET.get('skills', '')
+        area = self.request.GET.get('area', '')
+        salary_min = self.request.GET.get('salary_min', '')
+        context.update(skills_text=skills_text, area=area, salary_min=salary_min)
+        
+        if skills_text.strip():
+            context['result'] = matching.match(
+                skills_text,
+                limit=API_MAX_MATCH,
+                salary_min=int(salary_min) if salary_min.isdigit() else None,
+                area=area,
+                fields=['hh_id', 'name', 'employer_name', 'area', 'salary_from', 'salary_to', 'currency'],
+            )
+        return context
+
+
 # API Views для AJAX запросов
+@compress
+@throttle(cost=1)
+@etag(json_etag)
 def api_vacancy_search(request):
     """API для быстрого поиска вакансий (AJAX)"""
     if request.method == 'GET':
-        query = request.GET.get('q', '').strip()
-        limit = int(request.GET.get('limit', 10))
+        query = request.GET.get('q', '').strip()[:API_MAX_QUERY_LENGTH]
+        try:
+            limit = api_limit(request.GET.get('limit'), 10, API_MAX_LIMIT)
+        except ValueError:
+            return json_response({'error': 'Parameter "limit" must be an integer'}, status=400)
         
         if len(query) < 2:
-            return JsonResponse({'items': [], 'count': 0})
-        
-        vacancies = Vacancy.objects.filter(
-            Q(name__icontains=query) |
-            Q(employer_name__icontains=query) |
-            Q(key_skills__icontains=query)
-        ).order_by('-published_at')[:limit]
-        
-        results = []
-        for vacancy in vacancies:
-            results.append({
-                'id': vacancy.id,
-                'hh_id': vacancy.hh_id,
-                'name': vacancy.name,
-                'employer': vacancy.employer_name,
-                'area': vacancy.area,
-                'salary': f"{vacancy.salary_from or ''}-{vacancy.salary_to or ''} {vacancy.currency or '₽'}",
-                'url': f"/vacancies/{vacancy.hh_id}/",
-                'published_at': vacancy.published_at.strftime('%d.%m.%Y')
-            })
-        
-        return JsonResponse({
+            return json_response({'items': [], 'count': 0})
+        
+        # Только нужные колонки, без создания объектов моделей
+        rows = Vacancy.objects.filter(
+            text_search_q(query, ['name', 'employer_name', 'key_skills'])
+        ).order_by('-published_at').values(
+            'id', 'hh_id', 'name', 'employer_name', 'area',
+            'salary_from', 'salary_to', 'currency', 'published_at'
+        )[:limit]
+        
+        results = [
+            {
+                'id': row['id'],
+                'hh_id': row['hh_id'],
+                'name': row['name'],
+                'employer': row['employer_name'],
+                'area': row['area'],
+                'salary': f"{row['salary_from'] or ''}-{row['salary_to'] or ''} {row['currency'] or '₽'}",
+                'url': f"/vacancies/{row['hh_id']}/",
+                'published_at': f"{row['published_at'].day:02d}.{row['published_at'].month:02d}.{row['published_at'].year}"
+            }
+            for row in rows
+        ]
+        
+        return json_response({
             'items': results,
             'count': len(results),
             'query': query
         })
     
-    return JsonResponse({'error': 'Invalid request method'}, status=400)
+    return json_response({'error': 'Invalid request method'}, status=400)
+
+
+# Поля, которые можно запросить через /api/vacancies/?fields=...
+API_VACANCY_FIELDS = [
+    'hh_id', 'name', 'area', 'employer_name', 'employer_url',
+    'salary_from', 'salary_to', 'currency', 'experience', 'employment',
+    'schedule', 'key_skills', 'alternate_url', 'published_at', 'updated_at',
+    'description_text', 'cluster_id', 'is_duplicate',
+]
+API_VACANCY_DEFAULT_FIELDS = [field for field in API_VACANCY_FIELDS if field != 'description_text']
+API_MAX_LIMIT = 50
+API_MAX_BATCH = 500
+API_MAX_LOOKUP = 100
+API_MAX_CHANGES = 1000
+API_MAX_MATCH = 50
+API_MAX_CHANGES_STREAM = 100000
+API_MAX_RELATED = 50
+# Длиннее строки поиска обрезаются: LIKE по длинному шаблону дорог и бесполезен
+API_MAX_QUERY_LENGTH = 200
+
+
+def api_limit(value, default: int, maximum: int) -> int:
+    """Размер выдачи из параметра запроса: от 1 до maximum (ValueError, если не число)"""
+    return max(1, min(int(value or default), maximum))
+
+
+def is_string_list(value) -> bool:
+    """Список строк — формат параметра fields в теле POST-запросов API"""
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+@compress
+@throttle(cost=2)
+@etag(json_etag)
+def api_vacancies(request):
+    """Пакетная выдача вакансий: /api/vacancies/?after=0&limit=500&fields=hh_id,name
+
+    Постраничный обход по первичному ключу (after — курсор из поля next),
+    те же фильтры, что и в списке вакансий: q, area, experience,
+    salary_min, duplicates.
+    """
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = api_limit(request.GET.get('limit'), 100, API_MAX_BATCH)
+        salary_min = int(request.GET['salary_min']) if request.GET.get('salary_min') else None
+    except ValueError:
+        return json_response({'error': 'Parameters "after", "limit" and "salary_min" must be integers'}, status=400)
+    
+    fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+    unknown = [field for field in fields if field not in API_VACANCY_FIELDS]
+    if unknown:
+        return json_response({'error': f'Unknown fields: {", ".join(unknown)}'}, status=400)
+    fields = fields or API_VACANCY_DEFAULT_FIELDS
+    
+    vacancies = Vacancy.objects.filter(pk__gt=after)
+    if request.GET.get('duplicates') != '1':
+        vacancies = vacancies.filter(is_duplicate=False)
+    query = request.GET.get('q', '').strip()[:API_MAX_QUERY_LENGTH]
+    if query:
+        vacancies = vacancies.filter(text_search_q(query, ['name', 'description_text', 'key_skills', 'employer_name']))
+    if request.GET.get('area'):
+        vacancies = vacancies.filter(areas.area_q(request.GET['area']))
+    if request.GET.get('experience'):
+        vacancies = facets.filter_by_value(vacancies, 'experience', request.GET['experience'])
+    if salary_min is not None:
+        vacancies = vacancies.filter(Q(salary_from__gte=salary_min) | Q(salary_to__gte=salary_min))
+    
+    rows = list(vacancies.order_by('pk').values('pk', *fields)[:limit])
+    # limit ограничен снизу единицей в api_limit, но пустая выдача не должна давать курсор
+    next_after = rows[-1]['pk'] if rows and len(rows) == limit else None
+    for row in rows:
+        row.pop('pk')
+    
+    return json_response({
+        'items': rows,
+        'count': len(rows),
+        'next': next_after,
+    })
+
+
+@compress
+@throttle(cost=2)
+def api_changes(request):
+    """Журнал изменений вакансий: /api/changes/?since=0&limit=500&fields=hh_id,name
+
+    Изменения (insert, update, delete, reset) идут в порядке записи,
+    since — курсор из поля next предыдущего ответа. Для insert и update
+    в ответе текущее состояние вакансии. С format=ndjson все изменения
+    после курсора отдаются потоком, по одному JSON на строку, последней
+    строкой идет {"next": курсор}. Если курсор старше журнала
+    (записи удалены), ответ 410 — нужна полная синхронизация через
+    /api/vacancies/, после которой журнал читается с курсора latest,
+    запомненного до начала синхронизации.
+    """
+    stream = request.GET.get('format') == 'ndjson'
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = int(request.GET.get('limit', API_MAX_CHANGES_STREAM if stream else 500))
+    except ValueError:
+        return json_response({'error': 'Parameters "since" and "limit" must be integers'}, status=400)
+    limit = max(1, min(limit, API_MAX_CHANGES_STREAM if stream else API_MAX_CHANGES))
+    
+    fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+    unknown = [field for field in fields if field not in API_VACANCY_FIELDS]
+    if unknown:
+        return json_response({'error': f'Unknown fields: {", ".join(unknown)}'}, status=400)
+    fields = fields or API_VACANCY_DEFAULT_FIELDS
+    
+    oldest = changes.oldest_cursor()
+    if since < oldest:
+        return json_response({
+            'error': 'Cursor is older than the change log, resync required',
+            'oldest': oldest,
+            'latest': changes.latest_cursor(),
+        }, status=410)
+    
+    if stream:
+        lines = (dumps(change) + b'\n' for change in changes.iter_changes(since, limit, fields))
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    
+    items, next_since, has_more = changes.changes_since(since, limit, fields)
+    return json_response({
+        'changes': items,
+        'count': len(items),
+        'next': next_since,
+        'has_more': has_more,
+    })
 
 
 def my_view(request):
     queries = ['Python', 'JavaScript', 'Java', 'C#', 'PHP', 'Go', 'Data Science', 'DevOps']
     return render(request, 'home.html', {'queries': queries})
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+@compress
+@throttle(cost=5)
+def api_vacancy_lookup(request):
+    """Вакансии по списку hh_id за один запрос
+
+    GET /api/vacancies/lookup/?ids=1,2,3&fields=name,salary_from
+    POST /api/vacancies/lookup/ с телом {"ids": [1, 2, 3], "fields": [...]}
+    Недостающие в базе вакансии загружаются с HH (remote=0 — не загружать).
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body or b'{}')
+            raw_ids = body.get('ids', [])
+            fields = body.get('fields') or []
+            remote = body.get('remote', True)
+        except (ValueError, AttributeError):
+            return json_response({'error': 'Request body must be a JSON object'}, status=400)
+    else:
+        raw_ids = [value for value in request.GET.get('ids', '').split(',') if value.strip()]
+        fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+        remote = request.GET.get('remote') != '0'
+    
+    if not is_string_list(fields):
+        return json_response({'error': 'Parameter "fields" must be a list of strings'}, status=400)
+    try:
+        if not isinstance(raw_ids, list):
+            raise TypeError(raw_ids)
+        hh_ids = [int(value) for value in raw_ids]
+    except (TypeError, ValueError):
+        return json_response({'error': 'Parameter "ids" must be a list of integers'}, status=400)
+    if not hh_ids:
+        return json_response({'error': 'Parameter "ids" is required'}, status=400)
+    if len(hh_ids) > API_MAX_LOOKUP:
+        return json_response({'error': f'At most {API_MAX_LOOKUP} ids per request'}, status=400)
+    
+    unknown = [field for field in fields if field not in API_VACANCY_FIELDS]
+    if unknown:
+        return json_response({'error': f'Unknown fields: {", ".join(map(str, unknown))}'}, status=400)
+    
+    return json_response(lookup.lookup_vacancies(hh_ids, fields or API_VACANCY_DEFAULT_FIELDS, bool(remote)))
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+@compress
+@throttle(cost=2)
+def api_match(request):
+    """Подбор вакансий по навыкам
+
+    GET /api/match/?skills=Python,Django,SQL&salary_min=150000&area=1&limit=20
+    POST /api/match/ с телом {"skills": ["Python", "Django"], "area": "Москва", ...}
+    Вакансии упорядочены по взвешенному совпадению навыков (редкие
+    навыки весят больше), дубликаты не учитываются.
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body or b'{}')
+            skills_value = body.get('skills', '')
+            params = {key: body.get(key) for key in ('salary_min', 'area', 'limit')}
+            fields = body.get('fields') or []
+        except (ValueError, AttributeError):
+            return json_response({'error': 'Request body must be a JSON object'}, status=400)
+        skills_text = '\n'.join(map(str, skills_value)) if isinstance(skills_value, list) else str(skills_value)
+    else:
+        skills_text = request.GET.get('skills', '')
+        params = {key: request.GET.get(key) for key in ('salary_min', 'area', 'limit')}
+        fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+    
+    if not is_string_list(fields):
+        return json_response({'error': 'Parameter "fields" must be a list of strings'}, status=400)
+    try:
+        limit = api_limit(params['limit'], 20, API_MAX_MATCH)
+        salary_min = int(params['salary_min']) if params['salary_min'] else None
+    except (TypeError, ValueError):
+        return json_response({'error': 'Parameters "limit" and "salary_min" must be integers'}, status=400)
+    if not skills_text.strip():
+        return json_response({'error': 'Parameter "skills" is required'}, status=400)
+    
+    unknown = [field for field in fields if field not in API_VACANCY_FIELDS]
+    if unknown:
+        return json_response({'error': f'Unknown fields: {", ".join(map(str, unknown))}'}, status=400)
+    
+    return json_response(matching.match(
+        skills_text, limit=limit, salary_min=salary_min,
+        area=str(params['area'] or ''), fields=fields or API_VACANCY_DEFAULT_FIELDS,
+    ))
+
+
+@compress
+@throttle(cost=5)
+@etag(json_etag)
 def api_get_statistics(request):
     """API для получения статистики"""
-    stats = {
-        'total_vacancies': Vacancy.objects.count(),
-        'total_employers': Vacancy.objects.values('employer_name').distinct().count(),
-        'avg_salary': int(Vacancy.objects.filter(
-            salary_from__isnull=False
-        ).aggregate(avg=Avg('salary_from'))['avg'] or 0),
-        'recent_imports': SearchQuery.objects.count(),
-        'last_import': SearchQuery.objects.order_by('-search_date').first().search_date.strftime('%d.%m.%Y %H:%M') 
-            if SearchQuery.objects.exists() else 'Нет данных'
-    }
-    return JsonResponse(stats)
+    return json_response(get_or_compute('api_stats', events.site_stats))
+
+
+@throttle(cost=1)
+def api_events(request):
+    """Поток обновлений счетчиков и прогресса импорта (Server-Sent Events): /api/events/
+
+    Событие stats приходит только при изменении состояния; все клиенты
+    процесса получают его от одного общего издателя (vacancies.events).
+    Поток отдается только под ASGI: под WSGI каждый открытый поток занял
+    бы воркер сервера, поэтому ответ сразу 204 (EventSource после него
+    не переподключается), а страницы опрашивают /api/stats/.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    if events.publisher.subscribers >= settings.EVENTS_MAX_CLIENTS:
+        response = json_response({'error': 'Too many event streams'}, status=503)
+        response['Retry-After'] = '30'
+        return response
+    
+    stream = events.stream_async(request.headers.get('Last-Event-ID', ''))
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@compress
+@throttle(cost=2)
+@etag(json_etag)
+def api_area_breakdown(request):
+    """API вакансий по регионам: /api/areas/?parent=113
+
+    Количество уникальных вакансий в каждом дочернем регионе parent
+    вместе с подрегионами (без parent — по странам).
+    """
+    try:
+        parent_id = int(request.GET['parent']) if request.GET.get('parent') else None
+    except ValueError:
+        return json_response({'error': 'Parameter "parent" must be an integer'}, status=400)
+    
+    def compute():
+        return areas.region_counts(Vacancy.objects.filter(is_duplicate=False), parent_id)
+    
+    return json_response({
+        'parent': parent_id,
+        'regions': get_or_compute(f'area_breakdown:{parent_id}', compute),
+    })
+
+
+@compress
+@throttle(cost=2)
+@etag(json_etag)
+def api_trends(request):
+    """API временных рядов: /api/trends/?dimension=skill&value=Python&period=week
+
+    Без value возвращает самые частые значения измерения.
+    """
+    dimension = request.GET.get('dimension', 'skill')
+    period = request.GET.get('period', 'week')
+    if dimension not in dict(VacancyRollup.DIMENSION_CHOICES) or period not in dict(VacancyRollup.PERIOD_CHOICES):
+        return json_response({'error': 'Invalid dimension or period'}, status=400)
+    
+    try:
+        date_from = datetime.strptime(request.GET['from'], '%Y-%m-%d').date() if request.GET.get('from') else None
+        date_to = datetime.strptime(request.GET['to'], '%Y-%m-%d').date() if request.GET.get('to') else None
+    except ValueError:
+        return json_response({'error': 'Dates must be in YYYY-MM-DD format'}, status=400)
+    
+    value = request.GET.get('value', '').strip()
+    if not value:
+        return json_response({
+            'dimension': dimension,
+            'period': period,
+            'top': rollups.get_top_values(dimension, period, date_from),
+        })
+    
+    return json_response({
+        'dimension': dimension,
+        'value': value,
+        'period': period,
+        'series': rollups.get_series(dimension, value, period, date_from, date_to),
+    })
+
+
+@compress
+@throttle(cost=1)
+@etag(json_etag)
+def api_related_skills(request):
+    """API похожих навыков: /api/skills/related/?skill=Python&limit=10"""
+    name = request.GET.get('skill', '').strip()
+    if not name:
+        return json_response({'error': 'Parameter "skill" is required'}, status=400)
+    
+    try:
+        limit = api_limit(request.GET.get('limit'), 10, API_MAX_RELATED)
+    except ValueError:
+        return json_response({'error': 'Parameter "limit" must be an integer'}, status=400)
+    return json_response({
+        'skill': name,
+        'related': skills.related_skills(name, limit),
+    })
+
+
+@compress
+@throttle(cost=1)
+@etag(json_etag)
+def api_vacancy_related_skills(request, hh_id):
+    """API навыков, связанных с навыками вакансии"""
+    try:
+        limit = api_limit(request.GET.get('limit'), 10, API_MAX_RELATED)
+    except ValueError:
+        return json_response({'error': 'Parameter "limit" must be an integer'}, status=400)
+    vacancy = get_object_or_404(Vacancy, hh_id=hh_id)
+    return json_response({
+        'hh_id': vacancy.hh_id,
+        'skills': vacancy.get_skills_list(),
+        'related': skills.related_skills_for_vacancy(vacancy, limit),
+    })
+
+
+@require_GET
+def api_throttle_metrics(request):
+    """Счетчики ограничения нагрузки API этого процесса: /api/metrics/throttle/?format=prometheus
+
+    Доступны администраторам и адресам из INTERNAL_IPS (сборщик метрик).
+    """
+    if not request.user.is_staff and request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        return json_response({'error': 'Forbidden'}, status=403)
+    snapshot = throttle_metrics.snapshot()
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(prometheus_text(snapshot), content_type='text/plain; version=0.0.4')
+    return json_response(snapshot)
 
 
 def clear_database(request):
     """Очистка базы данных (только для разработки)"""
     if request.method == 'POST' and request.user.is_superuser:
-        Vacancy.objects.all().delete()
-        SearchQuery.objects.all().delete()
+        # Пачками: delete() целой таблицы собрал бы все объекты в памяти.
+        # Сначала зависимые таблицы, чтобы каскад не выбирал связанные строки
+        for queryset in (
+            LshBucket.objects.all(),
+            Vacancy.skills.through.objects.all(),
+            Vacancy.facets.through.objects.all(),
+            SkillPair.objects.all(),
+            Vacancy.objects.all(),
+            SearchQuery.objects.all(),
+            PopularSearch.objects.all(),
+            VacancyRollup.objects.all(),
+            Skill.objects.all(),
+            FacetValue.objects.all(),
+        ):
+            delete_in_batches(queryset)
+        changes.log_reset()
+        bump_data_version()
+        search_log.invalidate_widgets()
         messages.success(request, "✅ База данных успешно очищена")
         return redirect('home')
     
@@ -0,0 +1,113 @@
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+
+
+def _loader_dirs(loaders):
+    for loader in loaders:
+        if hasattr(loader, 'loaders'):
+            # Кэширующий загрузчик оборачивает файловый и app_directories
+            yield from _loader_dirs(loader.loaders)
+        elif hasattr(loader, 'get_dirs'):
+            yield from loader.get_dirs()
+
+
+def template_names(backend) -> List[str]:
+    """Шаблоны проекта (каталоги внутри BASE_DIR), без шаблонов установленных пакетов"""
+    base_dir = str(settings.BASE_DIR)
+    names = set()
+    for directory in _loader_dirs(backend.engine.template_loaders):
+        directory = str(directory)
+        if not directory.startswith(base_dir) or not os.path.isdir(directory):
+            continue
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    names.add(os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def compile_templates() -> int:
+    """Компиляция шаблонов проекта в кэширующий загрузчик
+
+    Вместе с шаблоном компилируются родительские и подключаемые
+    (extends, include), в том числе шаблоны админки.
+    """
+    compiled = 0
+    for backend in engines.all():
+        if not hasattr(backend, 'engine'):
+            continue
+        for name in template_names(backend):
+            backend.get_template(name)
+            compiled += 1
+    return compiled
+
+
+def import_modules() -> int:
+    """Загрузка URLconf: импорт представлений и всего, что они тянут (requests, numpy, сервисы)"""
+    return len(get_resolver().url_patterns)
+
+
+def fill_caches() -> int:
+    """Справочные данные и счетчики в кэш текущего поколения данных"""
+    from .analytics import get_summary
+    from .cache import get_or_compute
+    from .events import site_stats
+    from . import search_log
+
+    get_or_compute('api_stats', site_stats)
+    get_summary()
+    search_log.widgets()
+    return 3
+
+
+def build_match_index() -> int:
+    """Индекс подбора по навыкам (занимает память процесса, поэтому по запросу)"""
+    from . import matching
+    return len(matching.get_index())
+
+
+def run(templates: bool = True, modules: bool = True, data: bool = True, match_index: bool = False,
+        progress: Optional[Callable[[str, int, float], None]] = None) -> Dict[str, float]:
+    """Прогрев процесса; возвращает время каждого шага в секундах
+
+    Соединения с базой в конце закрываются: прогрев может идти в
+    главном процессе сервера до fork (gunicorn --preload).
+    """
+    steps = [
+        ('modules', modules, import_modules),
+        ('templates', templates, compile_templates),
+        ('data', data, fill_caches),
+        ('match_index', match_index, build_match_index),
+    ]
+    timings = {}
+    try:
+        for name, enabled, step in steps:
+            if not enabled:
+                continue
+            started = time.perf_counter()
+            count = step()
+            timings[name] = time.perf_counter() - started
+            if progress:
+                progress(name, count, timings[name])
+    finally:
+        connections.close_all()
+    return timings
+
+
+def on_startup():
+    """Прогрев при загрузке WSGI/ASGI-приложения, если включен WARMUP_ON_STARTUP"""
+    if not settings.WARMUP_ON_STARTUP:
+        return
+    try:
+        timings = run(data=settings.WARMUP_DATA, match_index=settings.WARMUP_MATCH_INDEX)
+    except Exception as e:
+        # Сервер должен подняться и без прогрева (например, база еще недоступна)
+        print(f"Прогрев не выполнен: {e}")
+        return
+    print(f"Прогрев: {', '.join(f'{name} {seconds * 1000:.0f} мс' for name, seconds in timings.items())}")